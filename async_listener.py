@@ -0,0 +1,646 @@
+"""
+Async Slack Bot Listener - asyncio variant of slack_listener.py built on Bolt's AsyncApp
+Run this script instead of slack_listener.py to keep many captures in flight on one event loop
+"""
+import asyncio
+import hmac
+import os
+import time
+import traceback
+
+from aiohttp import web
+from slack_bolt.async_app import AsyncApp
+from slack_bolt.adapter.socket_mode.async_handler import AsyncSocketModeHandler
+from dotenv import load_dotenv
+
+from notion_client_wrapper import AsyncNotionBrain, digest_text
+from chatgpt_processor import AsyncChatGPTProcessor
+from slack_client_wrapper import AsyncSlackBrain, AsyncSlackMessageStream
+from notion_sync import NotionSync
+from classifier import LocalClassifier
+from dedup import dedup_key, get_dedup_store
+from outbox import Outbox, QUEUED, ELSEWHERE
+from config import (
+    USER_CACHE_WARM, CAPTURE_MODE, CONTEXT_MAX_NOTES, ASYNC_MAX_IN_FLIGHT, LLM_CACHE_ENABLED, ADMIN_TOKEN,
+)
+from commands import (
+    HELP_TEXT, route_message, route_mention, strip_mention, capture_content, question_text, should_skip_auto_capture,
+    fallback_title, render_capture_reply, render_auto_capture_reply, render_queued_reply, render_sources,
+)
+from context_builder import build_context
+from metrics import EVENTS, timed, observe_delivery, register, exposition
+from tracing import trace, finish, recorder
+from lazy import Lazy
+from transport import warm_async
+from local_executor import run_local
+
+load_dotenv()
+
+# Shared clients, built on first use (or by warm_up() right after startup) so importing this module is cheap
+notion = Lazy(AsyncNotionBrain)
+ai = Lazy(AsyncChatGPTProcessor)
+sync = Lazy(lambda: NotionSync(notion.brain))
+classifier = Lazy(lambda: LocalClassifier(notion.brain.index))
+# Just a WebClient (no network), and Bolt needs it up front
+slack_helper = AsyncSlackBrain()
+
+# Initialize Slack Bolt AsyncApp (its client is the app-level one; events get theirs from use_shared_client below)
+app = AsyncApp(token=os.getenv("SLACK_BOT_TOKEN"), client=slack_helper.client)
+
+
+@app.middleware
+async def use_shared_client(context, next):
+    """Bolt builds a plain AsyncWebClient per event; give listeners and say() the rate-limited, pooled one instead"""
+    context["client"] = slack_helper.client
+    # Bolt's own middleware has already built say() on the old client; it's rebuilt on next use
+    context.pop("say", None)
+    await next()
+
+
+# Store for tracking processed events (bounded, survives restarts)
+processed_events = get_dedup_store()
+
+# Jobs currently running on the event loop
+in_flight = set()
+
+# Long-running startup tasks (outbox drain, warm-ups), held here so they aren't garbage-collected mid-run
+background_tasks = set()
+
+# Captures are written here before the handler returns, and retried from here until Notion has them
+outbox = Outbox()
+
+# Counters the components keep themselves, published on /metrics
+register("async_jobs", lambda: {"in_flight": len(in_flight), "max_in_flight": ASYNC_MAX_IN_FLIGHT},
+         gauges=("in_flight", "max_in_flight"))
+register("outbox", outbox.stats, gauges=("pending", "sending", "done", "failed", "oldest_pending_seconds"))
+register("user_cache", slack_helper.users.stats, gauges=("hit_rate", "entries"))
+# Scrapes before the clients are built report nothing rather than building them
+register("block_cache", lambda: notion.brain.blocks.stats() if notion.built else {})
+register("classifier", lambda: classifier.stats() if classifier.built else {},
+         gauges=("ignore_rate", "local_hit_rate", "tags_known"))
+if LLM_CACHE_ENABLED:
+    register("llm_cache", lambda: ai.cache.stats() if ai.built else {}, gauges=("hit_rate", "memory_entries"))
+
+# Set once connected to Slack; /ready reports it
+socket_handler = None
+
+
+@app.event("message")
+async def handle_message(event, say, body):
+    """Handle all incoming Slack messages with comprehensive error handling"""
+    observe_delivery(event)
+    recorder.record("message", body)
+    try:
+        with trace("message", body.get("event_id"), channel=event.get("channel"), ts=event.get("ts")), \
+                timed("receive"):
+            print(f"📨 Received message: {event}")
+
+            # Ignore bot messages and already processed messages
+            if event.get("bot_id") or event.get("subtype"):
+                print("   ↳ Skipping (bot message or subtype)")
+                EVENTS.labels("message", "skipped").inc()
+                return
+
+            if not await _is_new_event(event, body.get("event_id")):
+                EVENTS.labels("message", "duplicate").inc()
+                return
+
+            if not event.get("text", "").strip():
+                EVENTS.labels("message", "skipped").inc()
+                return
+
+            text = event["text"].strip()
+            entry_id = await _record_capture(event, route_message(text), text)
+            queued = await _spawn(say, _process_message, event, say, entry_id, entry_id=entry_id)
+            EVENTS.labels("message", "queued" if queued else "rejected").inc()
+    except Exception as e:
+        print(f"❌ Critical message handler error: {e}")
+        traceback.print_exc()
+        try:
+            await say(f"❌ An unexpected error occurred: {str(e)}")
+        except:
+            pass
+
+
+@app.event("app_mention")
+async def handle_mention(event, say, body):
+    """Handle @mentions of the bot"""
+    observe_delivery(event)
+    recorder.record("app_mention", body)
+    with trace("app_mention", body.get("event_id"), channel=event.get("channel"), ts=event.get("ts")), \
+            timed("receive"):
+        if not await _is_new_event(event, body.get("event_id")):
+            EVENTS.labels("app_mention", "duplicate").inc()
+            return
+        text = strip_mention(event.get("text", ""))
+        entry_id = await _record_capture(event, route_mention(text), text) if text else None
+        queued = await _spawn(say, _process_mention, event, say, entry_id, entry_id=entry_id)
+        EVENTS.labels("app_mention", "queued" if queued else "rejected").inc()
+
+
+async def _is_new_event(event, event_id=None) -> bool:
+    """Record an event and report whether it is the first delivery"""
+    try:
+        with timed("dedup"):
+            is_new = await run_local(processed_events.check_and_add,
+                                     dedup_key(event.get("channel"), event.get("ts"), event_id))
+        if is_new:
+            return True
+        print("   ↳ Skipping (duplicate delivery)")
+        return False
+    except Exception as e:
+        # Capturing twice is better than dropping a message
+        print(f"   ⚠️  Dedup store error (processing anyway): {e}")
+        return True
+
+
+async def _record_capture(event, command: str, text: str):
+    """Write a capture to the outbox before the handler returns, so it outlives a Notion outage or a restart"""
+    if command == "capture":
+        content, source = capture_content(text), "slack"
+    elif command == "auto" and not should_skip_auto_capture(text):
+        content, source = text, "slack-auto"
+    else:
+        return None
+    if not content:
+        return None
+    try:
+        with timed("outbox"):
+            # A mention is also delivered as a message and both record the same entry; an explicit capture's
+            # content (mention stripped) replaces what an auto-capture of the raw message put there
+            return await run_local(outbox.add, content, source, channel=event.get("channel"), ts=event.get("ts"),
+                                   replace=command == "capture")
+    except Exception as e:
+        print(f"   ⚠️  Outbox write failed (capturing without it): {e}")
+        return None
+
+
+async def _spawn(say, fn, *args, entry_id=None) -> bool:
+    """Run a job as a background task so the handler returns immediately, with a cap on jobs in flight"""
+    if len(in_flight) >= ASYNC_MAX_IN_FLIGHT:
+        if entry_id is not None:
+            # Already safe in the outbox, so the drain loop writes (and confirms) it instead
+            await run_local(outbox.release, entry_id)
+            print(f"   📥 {len(in_flight)} jobs in flight, left outbox entry {entry_id} to the drain loop")
+            return True
+        print(f"   ⚠️  {len(in_flight)} jobs in flight, rejecting job")
+        try:
+            await say("⏳ Second Brain is busy right now - please resend that in a minute.")
+        except:
+            pass
+        return False
+    task = asyncio.create_task(_run_job(say, fn, *args))
+    in_flight.add(task)
+    task.add_done_callback(in_flight.discard)
+    return True
+
+
+async def _run_job(say, fn, *args):
+    """Run a job, reporting unexpected errors back to Slack"""
+    try:
+        with timed("job"):
+            await fn(*args)
+    except Exception as e:
+        print(f"❌ Critical message handler error: {e}")
+        traceback.print_exc()
+        try:
+            await say(f"❌ An unexpected error occurred: {str(e)}")
+        except:
+            pass
+    finally:
+        # Logs the event's span breakdown if it was slow (the task inherited the handler's trace)
+        finish()
+
+
+async def _process_message(event, say, entry_id=None):
+    """Handle a message as a background task"""
+    text = event.get("text", "").strip()
+
+    # Get user info for context (cached)
+    user_name = await slack_helper.get_user_name(event.get("user"))
+
+    command = route_message(text)
+    if command == "capture":
+        await handle_capture(text, user_name, say, entry_id)
+    elif command == "question":
+        await handle_question(text, say)
+    elif command == "digest":
+        await handle_digest(say)
+    elif command == "help":
+        await handle_help(say)
+    else:
+        await handle_auto_capture(text, user_name, say, entry_id)
+
+
+async def _process_mention(event, say, entry_id=None):
+    """Handle a mention as a background task"""
+    text = strip_mention(event.get("text", ""))
+
+    print(f"📨 Mention received: {text}")
+
+    if not text:
+        await handle_help(say)
+        return
+
+    # Get user name for capture attribution (cached)
+    user_name = await slack_helper.get_user_name(event.get("user"))
+
+    command = route_mention(text)
+    if command == "question":
+        await handle_question(text, say)
+    elif command == "digest":
+        await handle_digest(say)
+    elif command == "help":
+        await handle_help(say)
+    else:
+        await handle_capture(f"capture: {capture_content(text)}", user_name, say, entry_id)
+
+
+async def handle_capture(text: str, user_name: str, say, entry_id: int = None):
+    """Capture a note explicitly"""
+    print(f"🔍 handle_capture called with text: {text}")
+
+    content = capture_content(text)
+
+    if not content:
+        await say("❌ Please provide content to capture. Example: `capture: my brilliant idea`")
+        return
+
+    if CAPTURE_MODE == "deferred":
+        await capture_deferred(content, "slack", say, render_capture_reply, "❌ Error capturing note", entry_id)
+        return
+
+    try:
+        # Hold the outbox entry from here, so the drain task doesn't write it too while the AI call runs
+        entry = await claim_capture(entry_id)
+        if entry == ELSEWHERE:
+            return
+        content = entry["content"] if entry else content
+        title, tags, follow_up = await _enrich(content)
+        result = await save_note(entry, content, "slack", title, tags, follow_up)
+        if result == ELSEWHERE:
+            return
+        if result == QUEUED:
+            await say(render_queued_reply(title))
+            return
+        print(f"   ✅ Saved to Notion! Page ID: {result.get('id')}")
+        await say(render_capture_reply(title, tags))
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+        traceback.print_exc()
+        await say(f"❌ Error capturing note: {str(e)}")
+
+
+async def handle_auto_capture(text: str, user_name: str, say, entry_id: int = None):
+    """Auto-capture any message to Notion (default behavior)"""
+    if await run_local(classifier.should_ignore, text):
+        if entry_id is not None:
+            await run_local(outbox.discard, entry_id)
+        return
+
+    print(f"🔍 Auto-capturing: {text}")
+
+    if CAPTURE_MODE == "deferred":
+        await capture_deferred(text, "slack-auto", say, render_auto_capture_reply, "❌ Error auto-capturing message",
+                               entry_id)
+        return
+
+    try:
+        entry = await claim_capture(entry_id)
+        if entry == ELSEWHERE:
+            return
+        text = entry["content"] if entry else text
+        title, tags, follow_up = await _enrich(text)
+        result = await save_note(entry, text, "slack-auto", title, tags, follow_up)
+        if result == ELSEWHERE:
+            return
+        if result != QUEUED:
+            print(f"   ✅ Saved to Notion! Page ID: {result.get('id')}")
+        try:
+            await say(render_auto_capture_reply(title, tags) if result != QUEUED else render_queued_reply(title))
+        except Exception as slack_err:
+            print(f"   ⚠️  Slack confirmation failed (but Notion save succeeded): {slack_err}")
+    except Exception as e:
+        print(f"   ❌ Auto-capture error: {e}")
+        traceback.print_exc()
+        try:
+            await say(f"❌ Error auto-capturing message: {str(e)}")
+        except:
+            pass
+
+
+async def claim_capture(entry_id):
+    """Claim a task's outbox entry; ELSEWHERE if the drain task or the task for another event about the same message
+    (a mention arrives as a message too) already has it, None if the capture isn't in the outbox. The entry's
+    content is what gets captured, which may be the other event's (see _record_capture)"""
+    if entry_id is None:
+        return None
+    entry = await run_local(outbox.claim, entry_id)
+    if entry is None:
+        print(f"   ↳ Outbox entry {entry_id} is already being captured by another task, leaving it to that one")
+        return ELSEWHERE
+    return entry
+
+
+async def save_note(entry, content: str, source: str, title: str, tags: list = None, follow_up_date: str = None):
+    """Write a capture to Notion through its claimed outbox entry (or a new one); returns what Outbox.deliver does"""
+    if entry is None:
+        try:
+            entry_id = await run_local(outbox.add, content, source)
+        except Exception as e:
+            print(f"   ⚠️  Outbox write failed (saving without it): {e}")
+            return await notion.add_note(title=title, content=content, tags=tags, source=source,
+                                         follow_up_date=follow_up_date)
+        return await outbox.deliver_async(entry_id, notion, title=title, tags=tags, follow_up_date=follow_up_date)
+    return await outbox.deliver_async(entry["id"], notion, title=title, tags=tags, follow_up_date=follow_up_date,
+                                      entry=entry)
+
+
+async def confirm_delivered(entry: dict):
+    """Confirm a capture in its channel once the outbox has written it"""
+    if entry and entry.get("channel"):
+        render = render_auto_capture_reply if entry["source"] == "slack-auto" else render_capture_reply
+        await slack_helper.client.chat_postMessage(channel=entry["channel"], text=render(entry["title"], entry["tags"]))
+
+
+async def drain_outbox():
+    """Retry captures Notion failed, and pick up any a restart interrupted, every OUTBOX_DRAIN_INTERVAL seconds"""
+    while True:
+        try:
+            delivered = await outbox.drain_async(notion, prepare=_enrich, on_delivered=confirm_delivered)
+            if delivered:
+                print(f"📤 Outbox delivered {delivered} captures to Notion")
+        except Exception as e:
+            print(f"⚠️  Outbox drain failed: {e}")
+        await asyncio.sleep(outbox.interval)
+
+
+async def _enrich(content: str):
+    """AI title/tags/follow-up for a note, falling back to a plain title if the AI call fails"""
+    try:
+        analysis = await analyze_note(content)
+        print(f"   AI title: {analysis.title}, tags: {analysis.tags}, follow_up: {analysis.follow_up_date}")
+        return analysis.title, analysis.tags, analysis.follow_up_date
+    except Exception as ai_err:
+        print(f"   AI error (using fallback): {ai_err}")
+        return fallback_title(content), [], None
+
+
+async def analyze_note(content: str):
+    """Tag locally when the classifier is confident, otherwise ask the LLM"""
+    # The tag model may retrain from the local index, so keep it off the event loop
+    return await run_local(classifier.analyze, content) or await ai.analyze_note(content)
+
+
+async def capture_deferred(content: str, source: str, say, render, error_prefix: str, entry_id: int = None):
+    """Phase 1: save the raw note and confirm instantly, then enrich in a background task"""
+    try:
+        entry = await claim_capture(entry_id)
+        if entry == ELSEWHERE:
+            return
+        content = entry["content"] if entry else content
+        title = fallback_title(content)
+        result = await save_note(entry, content, source, title)
+        if result == ELSEWHERE:
+            return
+        if result == QUEUED:
+            await say(render_queued_reply(title))
+            return
+        print(f"   ✅ Saved raw note to Notion! Page ID: {result.get('id')}")
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+        traceback.print_exc()
+        try:
+            await say(f"{error_prefix}: {str(e)}")
+        except:
+            pass
+        return
+
+    reply = None
+    try:
+        reply = await say(render(title, [], pending=True))
+    except Exception as slack_err:
+        print(f"   ⚠️  Slack confirmation failed (but Notion save succeeded): {slack_err}")
+
+    await enrich_saved_note(result["id"], content, title, reply, render)
+
+
+async def enrich_saved_note(page_id: str, content: str, title: str, reply, render):
+    """Phase 2: patch the saved page with AI title/tags/follow-up and edit the confirmation in place"""
+    tags = []
+    try:
+        analysis = await analyze_note(content)
+        await notion.enrich_note(page_id, analysis.title, tags=analysis.tags, follow_up_date=analysis.follow_up_date)
+        title, tags = analysis.title, analysis.tags
+        print(f"   ✅ Enriched {page_id}: {title}, tags: {tags}, follow_up: {analysis.follow_up_date}")
+    except Exception as ai_err:
+        print(f"   AI enrichment skipped (keeping simple title): {ai_err}")
+
+    if reply:
+        try:
+            await slack_helper.client.chat_update(channel=reply["channel"], ts=reply["ts"], text=render(title, tags))
+        except Exception as slack_err:
+            print(f"   ⚠️  Could not update Slack confirmation: {slack_err}")
+
+
+async def handle_question(text: str, say):
+    """Answer a question using the Second Brain"""
+    question = question_text(text)
+
+    if not question:
+        await say("❌ Please ask a question. Example: `ask: what did I note about project X?`")
+        return
+
+    stream = None
+    try:
+        reply = await say("🤔 Thinking...")
+
+        # Search the local note index, then pack the most relevant chunks into the token budget
+        context = build_context(question, await notion.find_notes(question, limit=CONTEXT_MAX_NOTES))
+        print(f"   Context: {context.tokens} tokens from {len(context.sources)} notes ({context.dropped_chunks} chunks dropped)")
+
+        # Stream the answer into the "Thinking..." message as it is generated
+        stream = AsyncSlackMessageStream(slack_helper.client, reply["channel"], reply["ts"], prefix="🧠 *Answer:*\n")
+        async for delta in ai.answer_question_stream(question, context):
+            await stream.write(delta)
+        await stream.write(render_sources(context.sources))
+        await stream.close()
+
+    except Exception as e:
+        if stream:
+            try:
+                await stream.close(f"❌ Error processing question: {str(e)}")
+                return
+            except Exception:
+                pass
+        await say(f"❌ Error processing question: {str(e)}")
+
+
+async def handle_digest(say):
+    """Generate and send daily digest"""
+    try:
+        print("📊 Generating digest...")
+        await say("📊 Generating digest...")
+
+        recent_notes = await notion.find_recent_notes(limit=10)
+        note_titles = [note["title"] for note in recent_notes if note["title"]]
+
+        if not note_titles:
+            await say("📭 No recent notes found in your Second Brain.")
+            return
+
+        # Try AI summary, but fallback to simple list
+        try:
+            summary = await ai.generate_daily_summary([
+                digest_text(note["title"], note["body"]) for note in recent_notes if note["title"]
+            ])
+            await say(f"📊 *Daily Digest:*\n\n{summary}")
+        except Exception as ai_err:
+            print(f"   AI failed, using simple list: {ai_err}")
+            notes_list = "\n".join([f"• {title}" for title in note_titles])
+            await say(f"📊 *Recent Notes:*\n\n{notes_list}\n\n_({len(note_titles)} notes captured)_")
+
+    except Exception as e:
+        print(f"   ❌ Digest error: {e}")
+        traceback.print_exc()
+        await say(f"❌ Error generating digest: {str(e)}")
+
+
+async def handle_help(say):
+    """Show help message"""
+    await say(HELP_TEXT)
+
+
+def health_app() -> web.Application:
+    """Health check endpoints (required for Cloud Run), served from the same event loop"""
+    async def health_check(request):
+        return web.json_response({'status': 'healthy', 'service': 'second-brain-bot', 'in_flight': len(in_flight),
+                                  'classifier': classifier.stats() if classifier.built else None})
+
+    async def health(request):
+        return web.Response(text='OK')
+
+    async def ready(request):
+        """Readiness, as opposed to /health's liveness: 200 only while connected to Slack"""
+        if socket_handler is not None and await socket_handler.client.is_connected():
+            return web.Response(text='Ready')
+        return web.Response(text='Not ready', status=503)
+
+    async def metrics(request):
+        body, content_type = exposition()
+        return web.Response(body=body, headers={'Content-Type': content_type})
+
+    async def admin_outbox(request):
+        """GET lists entries (?state=&limit=), POST retries ?id=N (or every ?state=, default failed), DELETE purges"""
+        if not ADMIN_TOKEN:
+            return web.Response(text='Not found', status=404)
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+            return web.Response(text='Forbidden', status=403)
+        try:
+            entry_id = int(request.query['id']) if 'id' in request.query else None
+            state = request.query.get('state')
+            if request.method == 'POST':
+                return web.json_response({'retried': await run_local(outbox.retry, entry_id, state or 'failed')})
+            if request.method == 'DELETE':
+                return web.json_response({'purged': await run_local(outbox.purge, entry_id, state)})
+            return web.json_response({'stats': await run_local(outbox.stats),
+                                      'entries': await run_local(outbox.entries, state,
+                                                                 int(request.query.get('limit', 50)))})
+        except ValueError as e:
+            return web.Response(text=f'Bad request: {e}', status=400)
+
+    server = web.Application()
+    server.add_routes([web.get('/', health_check), web.get('/health', health), web.get('/ready', ready),
+                       web.get('/metrics', metrics),
+                       web.route('*', '/admin/outbox', admin_outbox)])
+    return server
+
+
+def warm_up():
+    """Build the shared clients and start Notion sync (on a worker thread: the constructors block)"""
+    start = time.perf_counter()
+    try:
+        notion.resolve()
+        ai.resolve()
+        classifier.resolve()
+        print(f"✅ Clients ready in {time.perf_counter() - start:.2f}s")
+
+        # Keep the local note mirror in sync with Notion (blocking client, so it stays on its own thread)
+        sync.start()
+        print(f"✅ Notion sync running every {sync.interval:.0f}s")
+    except Exception as e:
+        # Handlers build whatever is missing on first use
+        print(f"⚠️  Client warm-up failed: {e}")
+
+
+async def warm_connections():
+    """Open keep-alive connections to Notion, OpenAI and Slack before the first event needs them"""
+    try:
+        print(f"✅ {await warm_async()} upstream connections open")
+    except Exception as e:
+        print(f"⚠️  Connection warm-up failed: {e}")
+
+
+async def main_async():
+    """Start the async Slack bot listener with health check server for Cloud Run"""
+    global socket_handler
+    print("=" * 50)
+    print("🧠 SECOND BRAIN - Async Slack Listener")
+    print("=" * 50)
+    print("\n✅ Bot is starting...")
+
+    app_token = os.getenv("SLACK_APP_TOKEN")
+    if not app_token:
+        print("❌ No SLACK_APP_TOKEN found. The async listener requires Socket Mode.")
+        print("   Add SLACK_APP_TOKEN to your .env file, or run slack_listener.py for HTTP mode")
+        return
+
+    port = int(os.getenv("PORT", 8080))
+    runner = web.AppRunner(health_app())
+    await runner.setup()
+    await web.TCPSite(runner, '0.0.0.0', port).start()
+    print(f"✅ Health check server running on port {port}")
+
+    # Connect to Slack while the clients are built, rather than after
+    warming = _background(asyncio.to_thread(warm_up))
+    _background(warm_connections())
+
+    # Retries captures Notion failed, and picks up any a restart interrupted
+    _background(drain_outbox())
+    print(f"✅ Outbox draining every {outbox.interval:.0f}s ({outbox.stats()['pending']} captures pending)")
+
+    if USER_CACHE_WARM:
+        async def warm_users():
+            try:
+                print(f"✅ User cache warmed ({await slack_helper.users.warm_async()} users)")
+            except Exception as e:
+                print(f"⚠️  User cache warm-up failed: {e}")
+
+        _background(warm_users())
+
+    print(f"✅ Up to {ASYNC_MAX_IN_FLIGHT} jobs in flight")
+    print("📡 Listening for Slack messages...")
+    print("\nPress Ctrl+C to stop\n")
+
+    print("✅ Starting async Socket Mode handler...")
+    socket_handler = AsyncSocketModeHandler(app, app_token)
+    await socket_handler.connect_async()
+    print("✅ Connected to Slack")
+    await warming
+    await asyncio.Event().wait()
+
+
+def _background(coro) -> asyncio.Task:
+    """Start a task that runs alongside the listener, keeping a reference to it until it finishes"""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+def main():
+    asyncio.run(main_async())
+
+
+if __name__ == "__main__":
+    main()
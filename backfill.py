@@ -0,0 +1,329 @@
+"""
+Backfill importer - pipelines a channel's Slack history (and thread replies) into Notion, resumably
+Usage: python backfill.py --channel C0123 --since 2024-01-01 --until 2024-12-31   (days in local time)
+Messages that fail are retried the next time the same command runs.
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from notion_client_wrapper import NotionBrain
+from chatgpt_processor import ChatGPTProcessor
+from slack_client_wrapper import SlackBrain
+from classifier import LocalClassifier
+from commands import fallback_title
+from config import (
+    SLACK_CHANNEL_ID, BACKFILL_ENRICH_WORKERS, BACKFILL_WRITE_WORKERS, BACKFILL_QUEUE_SIZE, BACKFILL_CHECKPOINT_DIR,
+)
+
+# Marks the end of a stage's input
+DONE = object()
+
+
+class Checkpoint:
+    """Resume point: the history cursor below which every message is finished, plus finished ts beyond it
+    and the messages that failed (which stay unfinished until a retry succeeds). Saved after every import, and
+    after every `save_every` skips or failures"""
+    def __init__(self, path: str, channel: str, oldest: str = None, latest: str = None, save_every: int = 50):
+        self.path = path
+        self.save_every = save_every
+        self.state = {
+            "channel": channel, "oldest": oldest, "latest": latest, "cursor": None,
+            "done": [], "failed": [], "imported": 0, "skipped": 0, "finished": False,
+        }
+        self._done = set()
+        self._failed = {}  # ts -> thread_ts
+        self._pages = {}  # page_no -> {"next_cursor", "pending", "ts"}
+        self._lowest = 0  # Lowest page that isn't finished yet
+        self._unsaved = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> bool:
+        """Resume from the checkpoint file if it is for the same channel and date range"""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+        if any(state.get(k) != self.state[k] for k in ("channel", "oldest", "latest")):
+            print(f"⚠️  {self.path} is for a different channel or date range, starting over")
+            return False
+        self.state = state
+        self._done = set(state["done"])
+        # Older checkpoints kept bare timestamps
+        entries = [entry if isinstance(entry, dict) else {"ts": entry} for entry in state["failed"]]
+        self._failed = {entry["ts"]: entry.get("thread_ts") for entry in entries}
+        return True
+
+    def is_done(self, ts: str) -> bool:
+        """Finished, or failed and left to retry_failed()"""
+        return ts in self._done or ts in self._failed
+
+    def failed(self) -> list:
+        """(ts, thread_ts) of every message still to retry"""
+        with self._lock:
+            return list(self._failed.items())
+
+    def open_page(self, page_no: int, next_cursor: str, ts_list: list):
+        """Register a fetched history page and the messages from it still to be processed"""
+        with self._lock:
+            self._pages[page_no] = {"next_cursor": next_cursor, "pending": len(ts_list), "ts": []}
+            self._advance()
+
+    def finish(self, page_no: int, ts: str, outcome: str, thread_ts: str = None):
+        """Record one message as imported, skipped or failed (page_no is None for a retry)"""
+        with self._lock:
+            if outcome == "failed":
+                self._failed[ts] = thread_ts
+            else:
+                self._failed.pop(ts, None)
+                self._done.add(ts)
+                self.state[outcome] += 1
+            if page_no is not None:
+                page = self._pages[page_no]
+                page["pending"] -= 1
+                page["ts"].append(ts)
+                self._advance()
+            self._unsaved += 1
+            # An import created a Notion page, so it's on disk before anything else happens: resuming from a
+            # checkpoint without it would create the page again
+            if outcome == "imported" or self._unsaved >= self.save_every:
+                self._save()
+
+    def _advance(self):
+        # Move the cursor past every leading page whose messages are all finished
+        while self._lowest in self._pages and self._pages[self._lowest]["pending"] == 0:
+            page = self._pages.pop(self._lowest)
+            self._done.difference_update(page["ts"])
+            self.state["cursor"] = page["next_cursor"]
+            if not page["next_cursor"]:
+                self.state["finished"] = True
+            self._lowest += 1
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        self.state["done"] = sorted(self._done)
+        self.state["failed"] = [{"ts": ts, "thread_ts": thread_ts} for ts, thread_ts in sorted(self._failed.items())]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp, self.path)
+        self._unsaved = 0
+
+
+class Backfill:
+    """fetch -> filter -> enrich -> write, each stage on its own threads with bounded queues between them"""
+    def __init__(self, channel: str, oldest: str = None, latest: str = None, checkpoint_path: str = None,
+                 threads: bool = True, enrich_workers: int = BACKFILL_ENRICH_WORKERS,
+                 write_workers: int = BACKFILL_WRITE_WORKERS, queue_size: int = BACKFILL_QUEUE_SIZE,
+                 notion: NotionBrain = None, ai: ChatGPTProcessor = None, slack: SlackBrain = None,
+                 classifier: LocalClassifier = None):
+        self.channel = channel
+        self.oldest = oldest
+        self.latest = latest
+        self.threads = threads
+        self.enrich_workers = enrich_workers
+        self.write_workers = write_workers
+        self.queue_size = queue_size
+        self.notion = notion if notion is not None else NotionBrain()
+        self.ai = ai if ai is not None else ChatGPTProcessor()
+        self.slack = slack if slack is not None else SlackBrain()
+        self.classifier = classifier if classifier is not None else LocalClassifier(self.notion.index)
+        self.checkpoint = Checkpoint(
+            checkpoint_path or os.path.join(BACKFILL_CHECKPOINT_DIR, f"backfill_{channel}.json"),
+            channel, oldest, latest,
+        )
+        self.fetched = 0
+
+    def run(self, restart: bool = False):
+        """Import the channel, resuming from the checkpoint unless `restart`"""
+        if not restart and self.checkpoint.load():
+            self.retry_failed()
+            if self.checkpoint.state["finished"]:
+                print("✅ Backfill already finished (use --restart to import again)")
+                return self.checkpoint.state
+            print(f"↪️  Resuming backfill ({self.checkpoint.state['imported']} already imported)")
+
+        to_filter = queue.Queue(maxsize=self.queue_size)
+        to_enrich = queue.Queue(maxsize=self.queue_size)
+        to_write = queue.Queue(maxsize=self.queue_size)
+        finished = queue.Queue()
+        stages = [
+            threading.Thread(target=self._fetch, args=(to_filter,), name="backfill-fetch", daemon=True),
+            *self._stage("filter", self._filter, to_filter, to_enrich, 1),
+            *self._stage("enrich", self._enrich, to_enrich, to_write, self.enrich_workers),
+            *self._stage("write", self._write, to_write, finished, self.write_workers),
+        ]
+        started = time.time()
+        for thread in stages:
+            thread.start()
+
+        try:
+            while finished.get() is not DONE:
+                pass
+        except KeyboardInterrupt:
+            print("\n⏸️  Interrupted - saving checkpoint")
+            raise
+        finally:
+            self.checkpoint.save()
+            state = self.checkpoint.state
+            print(f"📥 Imported {state['imported']}, skipped {state['skipped']}, failed {len(self.checkpoint.failed())} "
+                  f"in {time.time() - started:.0f}s")
+        return state
+
+    def retry_failed(self):
+        """Run the messages that failed on an earlier run through filter, enrich and write again"""
+        failed = self.checkpoint.failed()
+        if not failed:
+            return
+        print(f"🔁 Retrying {len(failed)} failed messages")
+        for ts, thread_ts in failed:
+            try:
+                message = self.slack.get_message(ts, channel=self.channel, thread_ts=thread_ts)
+                if message is None:
+                    print(f"   ↳ {ts} no longer exists, skipping it")
+                    self.checkpoint.finish(None, ts, "skipped")
+                    continue
+                item = self._filter(None, message)
+                if item is not None:
+                    self._write(*self._enrich(*item))
+            except Exception as e:
+                print(f"   ❌ retry failed for {ts}: {e}")
+                self.checkpoint.finish(None, ts, "failed", thread_ts=thread_ts)
+        self.checkpoint.save()
+        print(f"🔁 {len(self.checkpoint.failed())} still failing")
+
+    def _stage(self, name: str, fn, inbox: queue.Queue, outbox: queue.Queue, workers: int) -> list:
+        """Worker threads that map `fn` over inbox into outbox; a None result means the item is finished"""
+        remaining = [workers]
+        lock = threading.Lock()
+
+        def work():
+            while True:
+                item = inbox.get()
+                if item is DONE:
+                    inbox.put(DONE)  # Let sibling workers see it too
+                    with lock:
+                        remaining[0] -= 1
+                        last = remaining[0] == 0
+                    if last:
+                        outbox.put(DONE)
+                    return
+                page_no, message = item[0], item[1]
+                try:
+                    result = fn(*item)
+                except Exception as e:
+                    print(f"   ❌ {name} failed for {message.get('ts')}: {e}")
+                    self.checkpoint.finish(page_no, message["ts"], "failed", thread_ts=message.get("thread_ts"))
+                    continue
+                if result is not None:
+                    outbox.put(result)
+
+        return [threading.Thread(target=work, name=f"backfill-{name}-{i}", daemon=True) for i in range(workers)]
+
+    def _fetch(self, outbox: queue.Queue):
+        """Page through history from the checkpoint cursor, expanding threads"""
+        try:
+            pages = self.slack.history_pages(self.channel, oldest=self.oldest, latest=self.latest,
+                                             cursor=self.checkpoint.state["cursor"])
+            for page_no, (messages, next_cursor) in enumerate(pages):
+                items = []
+                for message in messages:
+                    items.append(message)
+                    if self.threads and message.get("reply_count") and message.get("thread_ts") == message.get("ts"):
+                        items.extend(self.slack.thread_replies(message["ts"], channel=self.channel))
+                # Broadcast replies show up both in history and in their thread
+                unique = {m["ts"]: m for m in items}
+                todo = [m for m in unique.values() if not self.checkpoint.is_done(m["ts"])]
+                self.checkpoint.open_page(page_no, next_cursor, [m["ts"] for m in todo])
+                for message in todo:
+                    outbox.put((page_no, message))
+                self.fetched += len(items)
+                print(f"📄 Fetched page {page_no + 1} ({self.fetched} messages so far)")
+        except Exception as e:
+            print(f"❌ History fetch failed (re-run to resume): {e}")
+        finally:
+            outbox.put(DONE)
+
+    def _filter(self, page_no: int, message: dict):
+        """Drop bot messages, edits/joins and chatter, as the live listener would"""
+        text = (message.get("text") or "").strip()
+        if message.get("bot_id") or message.get("subtype") not in (None, "thread_broadcast") or not text \
+                or self.classifier.should_ignore(text):
+            self.checkpoint.finish(page_no, message["ts"], "skipped")
+            return None
+        return page_no, message, text
+
+    def _enrich(self, page_no: int, message: dict, text: str):
+        """Local tags when confident, otherwise the LLM; a plain title if both fail"""
+        try:
+            analysis = self.classifier.analyze(text) or self.ai.analyze_note(text)
+        except Exception as e:
+            print(f"   AI error for {message['ts']} (using fallback): {e}")
+            analysis = None
+        return page_no, message, text, analysis
+
+    def _write(self, page_no: int, message: dict, text: str, analysis):
+        """Create the Notion page, dated when the message was posted"""
+        created = datetime.fromtimestamp(float(message["ts"]), tz=timezone.utc).isoformat()
+        self.notion.add_note(
+            title=analysis.title if analysis else fallback_title(text),
+            content=text,
+            tags=analysis.tags if analysis else [],
+            source="slack-backfill",
+            follow_up_date=analysis.follow_up_date if analysis else None,
+            created=created,
+        )
+        self.checkpoint.finish(page_no, message["ts"], "imported")
+        return None
+
+
+def _epoch(day: str, end: bool = False) -> str:
+    """Slack timestamp for the start (or end) of a YYYY-MM-DD day in the machine's local time zone"""
+    # Checkpoints are keyed by these timestamps, so switching zones would restart (and re-import) a backfill
+    ts = datetime.fromisoformat(day).astimezone().timestamp()
+    return str(ts + 86400 if end else ts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import Slack channel history into the Second Brain")
+    parser.add_argument("--channel", default=SLACK_CHANNEL_ID, help="channel ID (default: SLACK_CHANNEL_ID)")
+    parser.add_argument("--since", help="first day to import (YYYY-MM-DD, local time)")
+    parser.add_argument("--until", help="last day to import (YYYY-MM-DD, local time)")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: data/backfill_<channel>.json)")
+    parser.add_argument("--restart", action="store_true", help="ignore any existing checkpoint")
+    parser.add_argument("--no-threads", action="store_true", help="skip thread replies")
+    parser.add_argument("--enrich-workers", type=int, default=BACKFILL_ENRICH_WORKERS)
+    parser.add_argument("--write-workers", type=int, default=BACKFILL_WRITE_WORKERS)
+    args = parser.parse_args()
+
+    if not args.channel:
+        parser.error("--channel is required when SLACK_CHANNEL_ID is not set")
+
+    print("=" * 50)
+    print(f"🧠 SECOND BRAIN - Backfill {args.channel}")
+    print("=" * 50)
+    backfill = Backfill(
+        args.channel,
+        oldest=_epoch(args.since) if args.since else None,
+        latest=_epoch(args.until, end=True) if args.until else None,
+        checkpoint_path=args.checkpoint,
+        threads=not args.no_threads,
+        enrich_workers=args.enrich_workers,
+        write_workers=args.write_workers,
+    )
+    try:
+        backfill.run(restart=args.restart)
+    except KeyboardInterrupt:
+        print("Re-run the same command to resume.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,707 @@
+"""
+Offline benchmark of the capture, question and digest paths against local Notion, OpenAI and Slack stand-ins
+Usage: python benchmark.py
+       python benchmark.py --profile realistic --paths capture,question --messages 500 --concurrency 16
+       python benchmark.py --startup          # cold start: fresh listener process to first handled event
+       python benchmark.py --update-baseline
+Regression gate (compares against benchmark_baseline.json): pytest test_benchmark.py
+
+The stand-ins are one local HTTP server speaking just enough of each API for the real SDK clients,
+so rate limiting, retries and (de)serialization are all measured. Each upstream has a lognormal
+latency, an error rate (500s), a throttle rate (429s with Retry-After) and a setup delay for each
+new connection (standing in for the TCP and TLS handshakes a real API costs).
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import io
+import itertools
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+
+from aiohttp import web
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+PATHS = ("capture", "auto_capture", "question", "digest")
+# The round trips a capture makes (Notion, OpenAI, Slack) over the same pools with none of our code around them:
+# it only gets slower when the machine does, so the gate measures it alongside each path and scales the baseline
+REFERENCE = "reference"
+
+
+@dataclass
+class Upstream:
+    """How one fake upstream behaves: lognormal latency, the share of calls that fail or get a 429,
+    and the extra delay on the first request over each new connection"""
+    median_ms: float
+    p99_ms: float = None
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: float = 0.05
+    connect_ms: float = 0.0
+
+    def latency(self, rng: random.Random) -> float:
+        p99 = self.p99_ms or self.median_ms
+        if self.median_ms <= 0:
+            return 0.0
+        sigma = math.log(p99 / self.median_ms) / 2.326 if p99 > self.median_ms else 0.0
+        return rng.lognormvariate(math.log(self.median_ms), sigma) / 1000
+
+    def outcome(self, rng: random.Random) -> str:
+        """"throttle", "error" or None for a normal response"""
+        roll = rng.random()
+        if roll < self.throttle_rate:
+            return "throttle"
+        if roll < self.throttle_rate + self.error_rate:
+            return "error"
+        return None
+
+
+PROFILES = {
+    # Small, tight latencies so the regression gate is quick and stable
+    "gate": {
+        "notion": Upstream(20, 30), "openai": Upstream(40, 60), "slack": Upstream(5, 8),
+    },
+    # The gate's latencies plus a setup cost per new connection, for the connection-reuse gate
+    "connect": {
+        "notion": Upstream(20, 30, connect_ms=20), "openai": Upstream(40, 60, connect_ms=20),
+        "slack": Upstream(5, 8, connect_ms=20),
+    },
+    # Roughly what production sees
+    "realistic": {
+        "notion": Upstream(300, 1500, connect_ms=120), "openai": Upstream(900, 4000, connect_ms=120),
+        "slack": Upstream(80, 400, connect_ms=100),
+    },
+    # Realistic latencies with 429s and 5xx from every upstream
+    "flaky": {
+        "notion": Upstream(300, 1500, error_rate=0.02, throttle_rate=0.05, retry_after=0.5, connect_ms=120),
+        "openai": Upstream(900, 4000, error_rate=0.02, throttle_rate=0.05, retry_after=1.0, connect_ms=120),
+        "slack": Upstream(80, 400, error_rate=0.01, throttle_rate=0.02, retry_after=1.0, connect_ms=100),
+    },
+}
+INSTANT = {name: Upstream(0) for name in ("notion", "openai", "slack")}
+
+TOPICS = ["roadmap", "hiring", "budget", "onboarding", "pricing", "migration", "launch", "retro",
+          "security", "analytics", "vendor", "offsite", "billing", "search", "mobile", "design"]
+ACTIONS = ["review", "follow up on", "draft", "finalize", "share", "schedule a call about", "double-check"]
+PEOPLE = ["Priya", "Marcus", "Lena", "Tomás", "Aiko", "Sam", "Noor", "Elliot"]
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "next week", "end of month"]
+
+
+def note_text(rng: random.Random) -> str:
+    topic = rng.choice(TOPICS)
+    return (f"Remember to {rng.choice(ACTIONS)} the {topic} plan with {rng.choice(PEOPLE)} before "
+            f"{rng.choice(DAYS)}. Key points: {rng.choice(TOPICS)} dependencies, {topic} owners, and "
+            f"the {rng.choice(TOPICS)} timeline we discussed.")
+
+
+def question_text(rng: random.Random) -> str:
+    return f"what did I note about the {rng.choice(TOPICS)} plan?"
+
+
+class FakeBackends:
+    """Local HTTP stand-ins for the Notion, OpenAI and Slack APIs, served from a background thread"""
+    def __init__(self, upstreams: dict = None, seed: int = 0):
+        self.upstreams = dict(upstreams or PROFILES["gate"])
+        self.rng = random.Random(seed)
+        self.stats = {name: {"requests": 0, "connections": 0, "throttled": 0, "errors": 0}
+                      for name in ("notion", "openai", "slack")}
+        self._connections = weakref.WeakSet()
+        self.pages = {}
+        self.blocks = {}
+        self._ids = itertools.count(1)
+        self._loop = None
+        self._runner = None
+        self.url = None
+
+    def configure(self, upstreams: dict):
+        self.upstreams = dict(upstreams)
+
+    def start(self) -> str:
+        """Start serving on a free local port; returns the base URL"""
+        ready = threading.Event()
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(self._app(), access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, "127.0.0.1", 0)
+            self._loop.run_until_complete(site.start())
+            port = self._runner.addresses[0][1]
+            self.url = f"http://127.0.0.1:{port}"
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=serve, name="benchmark-backends", daemon=True).start()
+        ready.wait()
+        return self.url
+
+    def stop(self):
+        if self._loop:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def _app(self) -> web.Application:
+        app = web.Application(middlewares=[self._behaviour])
+        app.add_routes([
+            web.get("/notion/v1/databases/{id}", self.notion_database),
+            web.post("/notion/v1/data_sources/{id}/query", self.notion_query),
+            web.post("/notion/v1/pages", self.notion_create_page),
+            web.patch("/notion/v1/pages/{id}", self.notion_update_page),
+            web.get("/notion/v1/blocks/{id}/children", self.notion_list_blocks),
+            web.patch("/notion/v1/blocks/{id}/children", self.notion_append_blocks),
+            web.post("/notion/v1/search", self.notion_search),
+            web.post("/openai/v1/chat/completions", self.openai_chat),
+            web.post("/openai/v1/embeddings", self.openai_embeddings),
+            web.route("*", "/slack/api/{method}", self.slack_method),
+        ])
+        return app
+
+    @web.middleware
+    async def _behaviour(self, request, handler):
+        """Apply the upstream's latency, then maybe answer with a 429 or a 500 instead"""
+        name = request.path.split("/")[1]
+        upstream = self.upstreams[name]
+        stats = self.stats[name]
+        stats["requests"] += 1
+        # The transport is the same object for every request over one keep-alive connection
+        latency = upstream.latency(self.rng)
+        if request.transport not in self._connections:
+            self._connections.add(request.transport)
+            stats["connections"] += 1
+            latency += upstream.connect_ms / 1000
+        await asyncio.sleep(latency)
+        outcome = upstream.outcome(self.rng)
+        if outcome == "throttle":
+            stats["throttled"] += 1
+            return self._error(name, 429, {"Retry-After": str(upstream.retry_after)})
+        if outcome == "error":
+            stats["errors"] += 1
+            return self._error(name, 500)
+        return await handler(request)
+
+    @staticmethod
+    def _error(name: str, status: int, headers: dict = None) -> web.Response:
+        if name == "notion":
+            code = "rate_limited" if status == 429 else "internal_server_error"
+            body = {"object": "error", "status": status, "code": code, "message": code}
+        elif name == "openai":
+            body = {"error": {"message": "benchmark error", "type": "server_error",
+                              "code": "rate_limit_exceeded" if status == 429 else None}}
+        else:
+            body = {"ok": False, "error": "ratelimited" if status == 429 else "internal_error"}
+        return web.json_response(body, status=status, headers=headers)
+
+    # Notion
+
+    def _now(self) -> str:
+        return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+    @staticmethod
+    def _plain(rich_text: list) -> list:
+        return [{**t, "plain_text": t.get("text", {}).get("content", "")} for t in rich_text]
+
+    def _page(self, page_id: str, properties: dict, created: str) -> dict:
+        for prop in properties.values():
+            if "title" in prop:
+                prop["title"] = self._plain(prop["title"])
+        return {"object": "page", "id": page_id, "created_time": created, "last_edited_time": created,
+                "in_trash": False, "archived": False, "url": f"https://www.notion.so/{page_id.replace('-', '')}",
+                "properties": properties}
+
+    def _blocks(self, children: list) -> list:
+        blocks = []
+        for child in children:
+            kind = child.get("type", "paragraph")
+            content = child.get(kind, {})
+            blocks.append({"object": "block", "id": f"block-{next(self._ids)}", "type": kind, "has_children": False,
+                           kind: {**content, "rich_text": self._plain(content.get("rich_text", []))}})
+        return blocks
+
+    @staticmethod
+    def _list(results: list, cursor: str, size: int) -> dict:
+        start = int(cursor or 0)
+        end = start + size
+        return {"object": "list", "results": results[start:end], "has_more": end < len(results),
+                "next_cursor": str(end) if end < len(results) else None}
+
+    async def notion_database(self, request):
+        return web.json_response({"object": "database", "id": request.match_info["id"],
+                                  "data_sources": [{"id": "benchmark-data-source", "name": "Second Brain"}]})
+
+    async def notion_query(self, request):
+        body = await request.json() if request.can_read_body else {}
+        pages = sorted(self.pages.values(), key=lambda p: p["created_time"], reverse=True)
+        for sort in body.get("sorts", []):
+            if sort.get("timestamp") == "last_edited_time":
+                pages.sort(key=lambda p: p["last_edited_time"], reverse=sort.get("direction") == "descending")
+        return web.json_response(self._list(pages, body.get("start_cursor"), body.get("page_size", 100)))
+
+    async def notion_create_page(self, request):
+        body = await request.json()
+        page_id = f"00000000-0000-0000-0000-{next(self._ids):012d}"
+        page = self._page(page_id, body.get("properties", {}), self._now())
+        self.pages[page_id] = page
+        self.blocks[page_id] = self._blocks(body.get("children", []))
+        return web.json_response(page)
+
+    async def notion_update_page(self, request):
+        page = self.pages.get(request.match_info["id"])
+        if page is None:
+            return web.json_response({"object": "error", "status": 404, "code": "object_not_found",
+                                      "message": "not found"}, status=404)
+        body = await request.json()
+        page["properties"].update(self._page(page["id"], body.get("properties", {}), "")["properties"])
+        page["last_edited_time"] = self._now()
+        return web.json_response(page)
+
+    async def notion_list_blocks(self, request):
+        blocks = self.blocks.get(request.match_info["id"], [])
+        return web.json_response(self._list(blocks, request.query.get("start_cursor"),
+                                            int(request.query.get("page_size", 100))))
+
+    async def notion_append_blocks(self, request):
+        body = await request.json()
+        added = self._blocks(body.get("children", []))
+        self.blocks.setdefault(request.match_info["id"], []).extend(added)
+        return web.json_response({"object": "list", "results": added, "has_more": False, "next_cursor": None})
+
+    async def notion_search(self, request):
+        body = await request.json()
+        query = (body.get("query") or "").lower()
+        pages = [p for p in self.pages.values()
+                 if query in "".join(t["plain_text"] for t in p["properties"].get("Name", {}).get("title", [])).lower()]
+        return web.json_response(self._list(pages, body.get("start_cursor"), body.get("page_size", 100)))
+
+    # OpenAI
+
+    async def openai_chat(self, request):
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        if body.get("response_format"):
+            words = prompt.split("Note:")[-1].split()
+            content = json.dumps({
+                "title": " ".join(words[:6])[:60] or "Benchmark note", "tags": ["benchmark"],
+                "priority": "medium", "actionable": True, "follow_up_date": None,
+            })
+        else:
+            content = "Here is what your notes say. " + " ".join(self.rng.choice(TOPICS) for _ in range(60))
+        completion = {"id": "chatcmpl-benchmark", "created": int(time.time()), "model": body.get("model", "gpt")}
+        if not body.get("stream"):
+            return web.json_response({
+                **completion, "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                          "total_tokens": (len(prompt) + len(content)) // 4},
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        words = content.split(" ")
+        for i in range(0, len(words), 8):
+            delta = " ".join(words[i:i + 8]) + " "
+            chunk = {**completion, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(0.002)
+        done = {**completion, "object": "chat.completion.chunk",
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        await response.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode())
+        await response.write_eof()
+        return response
+
+    async def openai_embeddings(self, request):
+        body = await request.json()
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        data = []
+        for i, text in enumerate(inputs):
+            rng = random.Random(hash(text))
+            data.append({"object": "embedding", "index": i, "embedding": [rng.uniform(-1, 1) for _ in range(64)]})
+        return web.json_response({"object": "list", "data": data, "model": body.get("model"),
+                                  "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+
+    # Slack
+
+    async def slack_method(self, request):
+        args = dict(request.query)
+        if request.can_read_body:
+            if request.content_type == "application/json":
+                args.update(await request.json())
+            else:
+                args.update(await request.post())
+        method = request.match_info["method"]
+        if method == "auth.test":
+            return web.json_response({"ok": True, "user_id": "UBENCHBOT", "bot_id": "BBENCH", "team_id": "TBENCH",
+                                      "user": "second-brain", "url": "https://benchmark.slack.com/"})
+        if method == "users.info":
+            user = args.get("user", "U0")
+            return web.json_response({"ok": True, "user": {"id": user, "name": user.lower(), "real_name": f"User {user}",
+                                                           "profile": {"display_name": f"User {user}"}}})
+        if method == "users.list":
+            return web.json_response({"ok": True, "members": [], "response_metadata": {"next_cursor": ""}})
+        if method in ("chat.postMessage", "chat.update"):
+            ts = args.get("ts") or f"{time.time():.6f}"
+            return web.json_response({"ok": True, "channel": args.get("channel"), "ts": ts,
+                                      "message": {"text": args.get("text"), "ts": ts}})
+        return web.json_response({"ok": True})
+
+
+@dataclass
+class Result:
+    path: str
+    messages: int
+    concurrency: int
+    latencies: list = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    def percentile(self, p: float) -> float:
+        """Nearest-rank percentile of the latencies, in milliseconds"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))] * 1000
+
+    @property
+    def throughput(self) -> float:
+        return self.messages / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> dict:
+        return {"p50_ms": round(self.percentile(50), 1), "p95_ms": round(self.percentile(95), 1),
+                "p99_ms": round(self.percentile(99), 1), "throughput": round(self.throughput, 1),
+                "errors": self.errors}
+
+
+def median_summary(results: list) -> dict:
+    """Each metric's median over several runs of one path (errors summed), so one run the host stalled
+    doesn't decide the gate"""
+    summaries = [result.summary() for result in results]
+    merged = {key: round(statistics.median(s[key] for s in summaries), 1) for key in summaries[0] if key != "errors"}
+    return {**merged, "errors": sum(s["errors"] for s in summaries)}
+
+
+def environment(url: str, data_dir: str) -> dict:
+    """Environment pointing every client at the stand-ins and keeping all state in a scratch directory"""
+    env = {
+        "NOTION_API_KEY": "secret_benchmark", "NOTION_DATABASE_ID": "benchmark-database",
+        "NOTION_BASE_URL": f"{url}/notion",
+        "OPENAI_API_KEY": "sk-benchmark", "OPENAI_BASE_URL": f"{url}/openai/v1",
+        "SLACK_BOT_TOKEN": "xoxb-benchmark", "SLACK_CHANNEL_ID": "CBENCH", "SLACK_API_URL": f"{url}/slack/api/",
+        "NOTE_INDEX_PATH": os.path.join(data_dir, "notes_index.db"),
+        "BLOCK_CACHE_PATH": os.path.join(data_dir, "block_cache.db"),
+        "VECTOR_INDEX_DIR": os.path.join(data_dir, "vectors"),
+        "LLM_CACHE_PATH": os.path.join(data_dir, "llm_cache.db"),
+        "DEDUP_PATH": os.path.join(data_dir, "dedup.db"),
+        "OUTBOX_PATH": os.path.join(data_dir, "outbox.db"),
+        "TRACE_SLOW_THRESHOLD": "0",
+    }
+    # Measure the code rather than our own client-side limits, unless the environment says otherwise
+    for name, value in {
+        "EMBEDDER": "hashing", "LLM_CACHE_ENABLED": "false", "USER_CACHE_WARM": "false", "CAPTURE_MODE": "inline",
+        "NOTION_RPS": "1000", "NOTION_BURST": "1000", "OPENAI_RPS": "1000", "OPENAI_BURST": "1000",
+        "SLACK_RPS": "1000", "SLACK_BURST": "1000", "SLACK_STREAM_INTERVAL": "0.2",
+    }.items():
+        env[name] = os.environ.get(name, value)
+    return env
+
+
+class Benchmark:
+    """Drives slack_listener's handlers against the stand-ins (one per process: the listener is a module)"""
+    _instance = None
+
+    def __init__(self, seed: int = 0, seed_notes: int = 200, verbose: bool = False):
+        self.rng = random.Random(seed)
+        self.verbose = verbose
+        self.backends = FakeBackends(seed=seed)
+        self.data_dir = tempfile.mkdtemp(prefix="second-brain-bench-")
+        url = self.backends.start()
+        os.environ.update(environment(url, self.data_dir))
+        with self._quiet():
+            import slack_listener
+        self.listener = slack_listener
+        self._seed(seed_notes)
+        # Keep the harness's own setup out of full GC passes, so whether one lands inside a measured run
+        # doesn't decide the gate
+        gc.collect()
+        gc.freeze()
+
+    @classmethod
+    def get(cls, **kwargs) -> "Benchmark":
+        if cls._instance is None:
+            cls._instance = cls(**kwargs)
+        return cls._instance
+
+    @contextlib.contextmanager
+    def _quiet(self):
+        if self.verbose:
+            yield
+            return
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+
+    def _seed(self, count: int):
+        """Notes for questions and digests to find (written with no upstream latency)"""
+        self.backends.configure(INSTANT)
+        with self._quiet(), ThreadPoolExecutor(max_workers=8) as pool:
+            texts = [note_text(self.rng) for _ in range(count)]
+            list(pool.map(lambda text: self.listener.notion.add_note(
+                title=text[:50], content=text, tags=[self.rng.choice(TOPICS)], source="benchmark"), texts))
+            # What the sync thread would do next tick
+            self.listener.notion.embed_pending()
+            self.listener.notion.index.mark_synced()
+
+    def _say(self, replies: list):
+        """Bolt's say(): post to the channel, and remember what was said"""
+        def say(text=None, **kwargs):
+            replies.append(text or "")
+            return self.listener.slack_helper.client.chat_postMessage(channel="CBENCH", text=text, **kwargs)
+        return say
+
+    def _call(self, path: str, text: str, replies: list):
+        say = self._say(replies)
+        if path == "capture":
+            self.listener.handle_capture(f"capture: {text}", "Benchmark", say)
+        elif path == "auto_capture":
+            self.listener.handle_auto_capture(text, "Benchmark", say)
+        elif path == "question":
+            self.listener.handle_question(f"ask: {text}", say)
+        elif path == "digest":
+            self.listener.handle_digest(say)
+        elif path == REFERENCE:
+            self._reference()
+        else:
+            raise ValueError(f"Unknown path: {path}")
+
+    def _reference(self):
+        from transport import http_client
+        http_client("notion").get(f"{self.backends.url}/notion/v1/databases/benchmark-database")
+        http_client("openai").post(f"{self.backends.url}/openai/v1/embeddings", json={"input": "reference"})
+        http_client("slack").post(f"{self.backends.url}/slack/api/auth.test")
+
+    def compare(self, path: str, runs: int = 3, messages: int = 100, concurrency: int = 8, **kwargs) -> tuple:
+        """`runs` runs of a path, each after a run of the reference path under the gate profile so both see the
+        same machine: (the path's median_summary, the reference's)"""
+        results, reference = [], []
+        for _ in range(runs):
+            reference.append(self.run(REFERENCE, messages=messages, concurrency=concurrency))
+            results.append(self.run(path, messages=messages, concurrency=concurrency, **kwargs))
+        return median_summary(results), median_summary(reference)
+
+    def startup(self, runs: int = 3, upstreams: dict = None) -> dict:
+        """Cold-start timings in ms (median of `runs` fresh listener processes, each with an empty data dir)"""
+        self.backends.configure(upstreams or PROFILES["gate"])
+        samples = [self._start_once() for _ in range(runs)]
+        return {key: round(statistics.median(s[key] for s in samples), 1) for key in samples[0]}
+
+    def _start_once(self) -> dict:
+        env = {**os.environ, **environment(self.backends.url, tempfile.mkdtemp(prefix="second-brain-start-")),
+               "PORT": "0", "STARTUP_SPAWNED": repr(time.time())}
+        child = subprocess.run([sys.executable, os.path.abspath(__file__), "--startup-child"], env=env,
+                               capture_output=True, text=True, timeout=120)
+        if child.returncode:
+            raise RuntimeError(f"Startup run failed:\n{child.stderr[-2000:]}")
+        return json.loads(child.stdout.strip().splitlines()[-1])
+
+    def run(self, path: str, messages: int = 100, concurrency: int = 8, upstreams: dict = None,
+            warmup: int = None) -> Result:
+        """Send `messages` through one handler with `concurrency` callers; each latency is one handler call.
+
+        `warmup` messages (default: one per caller) go first, unmeasured, so connection setup and
+        one-off work such as training the tag model don't land in the percentiles.
+        """
+        self.backends.configure(upstreams or PROFILES["gate"])
+        warmup = concurrency if warmup is None else warmup
+        texts = [question_text(self.rng) if path == "question" else note_text(self.rng)
+                 for _ in range(warmup + messages)]
+        result = Result(path, messages, concurrency)
+        lock = threading.Lock()
+
+        def one(text):
+            replies = []
+            start = time.perf_counter()
+            try:
+                self._call(path, text, replies)
+                failed = any(reply.startswith("❌") for reply in replies)
+            except Exception:
+                failed = True
+            latency = time.perf_counter() - start
+            with lock:
+                result.latencies.append(latency)
+                result.errors += failed
+
+        with self._quiet(), ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda text: self._call(path, text, []), texts[:warmup]))
+            started = time.perf_counter()
+            list(pool.map(one, texts[warmup:]))
+            result.elapsed = time.perf_counter() - started
+        return result
+
+
+def _startup_child():
+    """One cold start: import the listener, start its services and handle one capture; prints timings as JSON"""
+    spawned = float(os.environ["STARTUP_SPAWNED"])
+    handled = threading.Event()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import slack_listener
+        imported = time.time()
+        slack_listener.start_services(int(os.environ["PORT"]))
+        started = time.time()
+
+        from slack_bolt.request import BoltRequest
+        from tracing import on_finish
+        on_finish(lambda trace: handled.set())
+        ts = f"{time.time():.6f}"
+        slack_listener.app.dispatch(BoltRequest(mode="socket_mode", body={
+            "type": "event_callback", "team_id": "TBENCH", "api_app_id": "ABENCH", "event_id": "EvStartup",
+            "event": {"type": "message", "user": "UBENCH", "channel": "CBENCH", "ts": ts,
+                      "text": f"capture: {note_text(random.Random(0))}"},
+        }))
+        if not handled.wait(60):
+            raise SystemExit("First event was not handled within 60s")
+        done = time.time()
+    print(json.dumps({"import_ms": round((imported - spawned) * 1000, 1),
+                      "started_ms": round((started - spawned) * 1000, 1),
+                      "first_event_ms": round((done - spawned) * 1000, 1)}))
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def connection_run(bench, messages: int, concurrency: int, runs: int = 3) -> tuple:
+    """The capture path under the "connect" profile: compare()'s summaries and the connections opened per upstream"""
+    before = {name: stats["connections"] for name, stats in bench.backends.stats.items()}
+    summary, reference = bench.compare("capture", runs, messages=messages, concurrency=concurrency,
+                                       upstreams=PROFILES["connect"])
+    return summary, reference, {name: stats["connections"] - before[name] for name, stats in bench.backends.stats.items()}
+
+
+def scaled(expected: dict, reference: dict, recorded: dict) -> dict:
+    """A baseline's p95 and throughput adjusted by how much slower (or faster) the reference path ran now than
+    when the baseline was recorded"""
+    return {**expected, "p95_ms": round(expected["p95_ms"] * reference["p95_ms"] / recorded["p95_ms"], 1),
+            "throughput": round(expected["throughput"] * reference["throughput"] / recorded["throughput"], 1)}
+
+
+def save_baseline(summaries: dict, references: list, messages: int, concurrency: int, runs: int,
+                  startup: dict = None, connections: dict = None, path: str = BASELINE_PATH):
+    """Record each path's median_summary (and the connect profile's capture) as the gate's baseline, with the
+    reference path's median over the same session"""
+    baseline = {
+        "profile": "gate", "messages": messages, "concurrency": concurrency, "runs": runs,
+        "recorded": datetime.now().strftime("%Y-%m-%d"),
+        "reference": {key: round(statistics.median(r[key] for r in references), 1)
+                      for key in ("p50_ms", "p95_ms", "p99_ms", "throughput")},
+        "results": {path: _recorded(summary) for path, summary in summaries.items()},
+    }
+    if startup:
+        baseline["startup"] = startup
+    if connections:
+        baseline["connections"] = {"profile": "connect", "path": "capture", **_recorded(connections)}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2)
+        f.write("\n")
+
+
+def _recorded(summary: dict) -> dict:
+    return {k: v for k, v in summary.items() if k != "errors"}
+
+
+def _upstream(spec: str, base: Upstream) -> Upstream:
+    """MEDIAN[:P99] in milliseconds"""
+    median, _, p99 = spec.partition(":")
+    return replace(base, median_ms=float(median), p99_ms=float(p99) if p99 else None)
+
+
+def add_upstream_arguments(parser: argparse.ArgumentParser):
+    """--profile plus per-upstream overrides (shared with replay.py)"""
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="gate")
+    for name in ("notion", "openai", "slack"):
+        parser.add_argument(f"--{name}-latency", metavar="MS[:P99]", help=f"override the profile's {name} latency")
+    parser.add_argument("--error-rate", type=float, help="share of calls answered with a 500, every upstream")
+    parser.add_argument("--throttle-rate", type=float, help="share of calls answered with a 429, every upstream")
+    parser.add_argument("--connect-ms", type=float, help="setup delay for each new connection, every upstream")
+
+
+def upstreams_from_args(args) -> dict:
+    upstreams = dict(PROFILES[args.profile])
+    for name in upstreams:
+        upstream = upstreams[name]
+        for option in ("error_rate", "throttle_rate", "connect_ms"):
+            if getattr(args, option) is not None:
+                upstream = replace(upstream, **{option: getattr(args, option)})
+        if getattr(args, f"{name}_latency"):
+            upstream = _upstream(getattr(args, f"{name}_latency"), upstream)
+        upstreams[name] = upstream
+    return upstreams
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Slack handlers against local API stand-ins")
+    parser.add_argument("--paths", default=",".join(PATHS), help=f"comma-separated, from: {', '.join(PATHS)}")
+    parser.add_argument("--messages", type=int, default=100, help="messages per path")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=3, help="runs per path; the median of each metric is reported")
+    add_upstream_arguments(parser)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--startup", action="store_true", help="measure cold start instead of the handler paths")
+    parser.add_argument("--startup-runs", type=int, default=3, help="fresh processes to take the median of")
+    parser.add_argument("--startup-child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--update-baseline", action="store_true", help=f"record the gate profile to {os.path.basename(BASELINE_PATH)}")
+    parser.add_argument("--verbose", action="store_true", help="keep the handlers' log output")
+    args = parser.parse_args()
+    if args.startup_child:
+        return _startup_child()
+
+    upstreams = upstreams_from_args(args)
+    if args.update_baseline:
+        upstreams = PROFILES["gate"]
+
+    bench = Benchmark.get(seed=args.seed, verbose=args.verbose)
+    if args.startup or args.update_baseline:
+        startup = bench.startup(runs=args.startup_runs, upstreams=upstreams)
+        print("cold start: " + ", ".join(f"{k.replace('_ms', '')} {v:.0f} ms" for k, v in startup.items()) + "\n")
+        if not args.update_baseline:
+            return
+    print(f"{'path':<14}{'msgs':>6}{'conc':>6}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'msg/s':>9}")
+    summaries, references = {}, []
+    for path in args.paths.split(","):
+        path = path.strip()
+        s, reference = bench.compare(path, args.runs, messages=args.messages, concurrency=args.concurrency,
+                                     upstreams=upstreams)
+        summaries[path] = s
+        references.append(reference)
+        print(f"{path:<14}{args.messages:>6}{args.concurrency:>6}{s['errors']:>8}"
+              f"{s['p50_ms']:>9.1f}{s['p95_ms']:>9.1f}{s['p99_ms']:>9.1f}{s['throughput']:>9.1f}")
+    r = {key: statistics.median(ref[key] for ref in references) for key in ("p50_ms", "p95_ms", "p99_ms", "throughput")}
+    print(f"{REFERENCE:<14}{args.messages:>6}{args.concurrency:>6}{'':>8}"
+          f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['throughput']:>9.1f}")
+    print("\nupstream requests: " + ", ".join(
+        f"{name} {s['requests']} over {s['connections']} connections ({s['throttled']} throttled, {s['errors']} errors)"
+        for name, s in bench.backends.stats.items()))
+
+    if args.update_baseline:
+        connections, reference, opened = connection_run(bench, args.messages, args.concurrency, args.runs)
+        references.append(reference)
+        print(f"capture ({connections['p95_ms']:.1f} ms p95) with connect_ms: "
+              + ", ".join(f"{name} {count} connections" for name, count in opened.items()))
+        save_baseline(summaries, references, args.messages, args.concurrency, args.runs, startup, connections)
+        print(f"✅ Baseline written to {BASELINE_PATH}")
+
+
+if __name__ == "__main__":
+    main()
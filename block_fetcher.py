@@ -0,0 +1,109 @@
+"""
+Concurrent, fully paginated fetching of Notion page blocks with a cache keyed on last_edited_time
+"""
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from notion_client.helpers import iterate_paginated_api
+
+from config import BLOCK_CACHE_PATH, BLOCK_FETCH_WORKERS
+
+
+class BlockCache:
+    """One row per page: the blocks as of a given last_edited_time (a newer edit makes it a miss)"""
+    def __init__(self, path: str = BLOCK_CACHE_PATH):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS page_blocks (
+                    page_id TEXT PRIMARY KEY,
+                    last_edited_time TEXT NOT NULL,
+                    blocks TEXT NOT NULL
+                )""")
+
+    def get(self, page_id: str, last_edited_time: str):
+        """Cached blocks for this version of the page, or None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT blocks FROM page_blocks WHERE page_id = ? AND last_edited_time = ?",
+                (page_id, last_edited_time),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, page_id: str, last_edited_time: str, blocks: list):
+        """Store blocks for this version of the page, replacing any older version"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO page_blocks (page_id, last_edited_time, blocks) VALUES (?, ?, ?)",
+                (page_id, last_edited_time, json.dumps(blocks, ensure_ascii=False)),
+            )
+
+    def delete(self, page_id: str):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM page_blocks WHERE page_id = ?", (page_id,))
+
+    def close(self):
+        self.conn.close()
+
+
+class BlockFetcher:
+    def __init__(self, client, cache: BlockCache = None, workers: int = BLOCK_FETCH_WORKERS):
+        self.client = client
+        self.cache = cache if cache is not None else BlockCache()
+        self.workers = workers
+        self.hits = 0
+        self.misses = 0
+
+    def fetch(self, page_id: str, last_edited_time: str = None) -> list:
+        """All top-level blocks of a page, following pagination; cached when last_edited_time is known"""
+        if last_edited_time:
+            blocks = self.cache.get(page_id, last_edited_time)
+            if blocks is not None:
+                self.hits += 1
+                return blocks
+        self.misses += 1
+        return self._fetch_uncached(page_id, last_edited_time)
+
+    def fetch_many(self, pages: list) -> dict:
+        """Fetch blocks for (page_id, last_edited_time) pairs concurrently; returns {page_id: blocks}.
+
+        Pages that fail to fetch are logged and left out of the result.
+        """
+        results = {}
+        misses = []
+        for page_id, edited in pages:
+            cached = self.cache.get(page_id, edited) if edited else None
+            if cached is not None:
+                self.hits += 1
+                results[page_id] = cached
+            else:
+                misses.append((page_id, edited))
+        if not misses:
+            return results
+        self.misses += len(misses)
+
+        # Parallelism hides per-request latency; the Notion rate limiter still caps the request rate
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(misses)))) as pool:
+            futures = {page_id: pool.submit(self._fetch_uncached, page_id, edited) for page_id, edited in misses}
+        for page_id, future in futures.items():
+            try:
+                results[page_id] = future.result()
+            except Exception as e:
+                print(f"   ⚠️  Could not fetch blocks for {page_id}: {e}")
+        return results
+
+    def _fetch_uncached(self, page_id: str, last_edited_time: str) -> list:
+        blocks = list(iterate_paginated_api(self.client.blocks.children.list, block_id=page_id, page_size=100))
+        if last_edited_time:
+            self.cache.set(page_id, last_edited_time, blocks)
+        return blocks
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,97 @@
+"""
+Bounded in-process job queue so Slack handlers can ack immediately
+while worker threads run enrichment and Notion writes
+"""
+import contextvars
+import queue
+import threading
+import time
+import traceback
+
+from config import CAPTURE_WORKERS, CAPTURE_QUEUE_SIZE, CAPTURE_ENQUEUE_TIMEOUT
+from metrics import STAGE_SECONDS
+from tracing import add_span
+
+
+class CaptureQueue:
+    def __init__(self, workers: int = CAPTURE_WORKERS, max_depth: int = CAPTURE_QUEUE_SIZE,
+                 enqueue_timeout: float = CAPTURE_ENQUEUE_TIMEOUT, name: str = "capture"):
+        self.workers = max(1, workers)
+        self.max_depth = max_depth
+        self.enqueue_timeout = enqueue_timeout
+        self.name = name
+        self._queue = queue.Queue(maxsize=max_depth)
+        self._threads = []
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def start(self):
+        """Start the worker threads (safe to call more than once)"""
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f"{self.name}-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, fn, *args, **kwargs) -> bool:
+        """Enqueue a job; returns False when the queue is full (backpressure)"""
+        self.start()
+        try:
+            if self.enqueue_timeout > 0:
+                self._queue.put(self._job(fn, args, kwargs), timeout=self.enqueue_timeout)
+            else:
+                self._queue.put_nowait(self._job(fn, args, kwargs))
+            return True
+        except queue.Full:
+            self.rejected += 1
+            print(f"   ⚠️  {self.name} queue full ({self.max_depth} jobs), rejecting job")
+            return False
+
+    @staticmethod
+    def _job(fn, args, kwargs) -> tuple:
+        # The submitter's context goes with the job so its trace continues on the worker
+        return fn, args, kwargs, time.perf_counter(), contextvars.copy_context()
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {"depth": self.depth, "max_depth": self.max_depth, "rejected": self.rejected}
+
+    def join(self):
+        """Block until every queued job has been processed"""
+        self._queue.join()
+
+    def stop(self, wait: bool = True):
+        """Signal workers to exit after draining queued jobs"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                fn, args, kwargs, enqueued, context = job
+                context.run(self._run, fn, args, kwargs, enqueued)
+            except Exception as e:
+                print(f"❌ {self.name} worker error: {e}")
+                traceback.print_exc()
+            finally:
+                self._queue.task_done()
+
+    @staticmethod
+    def _run(fn, args, kwargs, enqueued: float):
+        STAGE_SECONDS.labels("queue_wait").observe(time.perf_counter() - enqueued)
+        add_span("queue_wait", enqueued)
+        fn(*args, **kwargs)
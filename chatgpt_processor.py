@@ -1,16 +1,106 @@
 """
 ChatGPT/OpenAI processor for Second Brain intelligence
 """
-import openai
-from config import OPENAI_API_KEY
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
 
-openai.api_key = OPENAI_API_KEY
+from config import OPENAI_API_KEY, OPENAI_BASE_URL, LLM_CACHE_ENABLED
+from llm_cache import LLMCache, cache_key, seconds_until_midnight
+from context_builder import ContextPack, build_context
+from rate_limit import limiters
+from metrics import LLM_SECONDS
+from tracing import add_span, span, traced
+from transport import http_client, async_http_client, timeout
 
+PRIORITIES = ("high", "medium", "low")
 
+# Response cache TTL per method, in seconds (0 = never cache, "today" = until midnight)
+CACHE_TTLS = {
+    "process": 24 * 3600,
+    "analyze_note": "today",  # Prompt embeds today's date for follow-up extraction
+    "summarize_notes": 24 * 3600,
+    "extract_tasks": 7 * 24 * 3600,
+    "generate_daily_summary": 3600,
+    "answer_question": 3600,
+}
+
+# JSON schema for the single structured-output enrichment call
+NOTE_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string", "description": "Short, descriptive title (max 6 words)"},
+        "tags": {"type": "array", "items": {"type": "string"}, "description": "2-3 relevant tags/categories"},
+        "priority": {"type": "string", "enum": list(PRIORITIES)},
+        "actionable": {"type": "boolean"},
+        "follow_up_date": {
+            "type": ["string", "null"],
+            "description": "Follow-up date in YYYY-MM-DD format, or null if none is mentioned",
+        },
+    },
+    "required": ["title", "tags", "priority", "actionable", "follow_up_date"],
+    "additionalProperties": False,
+}
+
+
+@dataclass
+class NoteAnalysis:
+    """Validated result of ChatGPTProcessor.analyze_note"""
+    title: str
+    tags: list = field(default_factory=list)
+    priority: str = "medium"
+    actionable: bool = False
+    follow_up_date: str = None
+
+    @classmethod
+    def from_dict(cls, data: dict, fallback_title: str = "Untitled"):
+        """Build an analysis from model output, coercing anything malformed to safe defaults"""
+        title = str(data.get("title") or "").strip().strip('"').strip("'").strip() or fallback_title
+
+        tags = data.get("tags") or []
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        tags = [str(t).strip() for t in tags if str(t).strip()][:3]
+
+        priority = str(data.get("priority") or "medium").strip().lower()
+        if priority not in PRIORITIES:
+            priority = "medium"
+
+        actionable = data.get("actionable")
+        if not isinstance(actionable, bool):
+            actionable = str(actionable).strip().lower() in ("yes", "true")
+
+        follow_up = data.get("follow_up_date")
+        try:
+            follow_up = date.fromisoformat(str(follow_up).strip()).isoformat() if follow_up else None
+        except ValueError:
+            follow_up = None
+
+        return cls(title=title, tags=tags, priority=priority, actionable=actionable, follow_up_date=follow_up)
+
+    def to_dict(self) -> dict:
+        return {
+            "title": self.title,
+            "tags": list(self.tags),
+            "priority": self.priority,
+            "actionable": self.actionable,
+            "follow_up_date": self.follow_up_date,
+        }
+
+
+@traced
 class ChatGPTProcessor:
-    def __init__(self, model: str = "gpt-4.1"):
+    def __init__(self, model: str = "gpt-4.1", cache: LLMCache = None, cache_ttls: dict = None):
+        # Imported here: openai is the slowest import on the listener's cold start
+        import openai
+
         self.model = model
-        self.client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        # Retries are handled by the shared rate limiter rather than the SDK
+        self.client = openai.OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0,
+                                    http_client=http_client("openai"), timeout=timeout("openai"))
+        self.cache = cache if cache is not None else (LLMCache() if LLM_CACHE_ENABLED else None)
+        self.cache_ttls = {**CACHE_TTLS, **(cache_ttls or {})}
         
         self.system_prompt = """You are a helpful Second Brain assistant. Your role is to:
 1. Help organize and summarize information
@@ -21,8 +111,15 @@ class ChatGPTProcessor:
 
 Always be concise and focus on actionable insights."""
 
-    def process(self, user_input: str, context: str = None) -> str:
+    def process(self, user_input: str, context: str = None, cache_for: str = "process") -> str:
         """Process input through ChatGPT and return response"""
+        return self._chat(self._messages(user_input, context), cache_for=cache_for)
+
+    def process_stream(self, user_input: str, context: str = None, cache_for: str = "process"):
+        """Like process(), but yields the response text as it is generated"""
+        return self._chat_stream(self._messages(user_input, context), cache_for=cache_for)
+
+    def _messages(self, user_input: str, context: str = None) -> list:
         messages = [{"role": "system", "content": self.system_prompt}]
         
         if context:
@@ -32,15 +129,78 @@ Always be concise and focus on actionable insights."""
             })
         else:
             messages.append({"role": "user", "content": user_input})
+        return messages
+
+    def _cache_ttl(self, method: str) -> float:
+        ttl = self.cache_ttls.get(method, 0)
+        return seconds_until_midnight() if ttl == "today" else ttl
+
+    def _cache_lookup(self, cache_for: str, messages: list, temperature: float, max_tokens: int, **kwargs):
+        """Return (key, ttl, cached_response); key is None when this call shouldn't be cached"""
+        ttl = self._cache_ttl(cache_for) if self.cache is not None and cache_for else 0
+        if not ttl:
+            return None, 0, None
+        key = cache_key(self.model, messages, temperature, max_tokens, **kwargs)
+        return key, ttl, self.cache.get(key)
+
+    def _chat(self, messages: list, max_tokens: int = 1000, temperature: float = 0.7,
+              cache_for: str = None, **kwargs) -> str:
+        """Send a chat completion request and return the message text (served from cache when possible)"""
+        start = time.perf_counter()
+        key, ttl, cached = self._cache_lookup(cache_for, messages, temperature, max_tokens, **kwargs)
+        if cached is not None:
+            LLM_SECONDS.labels(cache_for or "chat", "true").observe(time.perf_counter() - start)
+            return cached
+
+        with span("openai chat.completions", upstream="openai"):
+            response = limiters["openai"].call(
+                self.client.chat.completions.create,
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **kwargs
+            )
+        
+        LLM_SECONDS.labels(cache_for or "chat", "false").observe(time.perf_counter() - start)
+
+        content = response.choices[0].message.content
+        if key:
+            self.cache.set(key, content, ttl)
+        return content
 
-        response = self.client.chat.completions.create(
+    def _chat_stream(self, messages: list, max_tokens: int = 1000, temperature: float = 0.7,
+                     cache_for: str = None, **kwargs):
+        """Stream a chat completion, yielding text deltas (a cached response is yielded whole)"""
+        start = time.perf_counter()
+        key, ttl, cached = self._cache_lookup(cache_for, messages, temperature, max_tokens, **kwargs)
+        if cached is not None:
+            LLM_SECONDS.labels(cache_for or "chat", "true").observe(time.perf_counter() - start)
+            yield cached
+            return
+
+        # Only opening the stream is rate limited and retried; a failure mid-stream propagates
+        stream = limiters["openai"].call(
+            self.client.chat.completions.create,
             model=self.model,
             messages=messages,
-            max_tokens=1000,
-            temperature=0.7
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            **kwargs
         )
-        
-        return response.choices[0].message.content
+
+        parts = []
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+        # Whole stream, so it is comparable with the non-streaming calls
+        LLM_SECONDS.labels(cache_for or "chat", "false").observe(time.perf_counter() - start)
+        add_span("openai chat.completions (stream)", start, upstream="openai")
+        if key:
+            self.cache.set(key, "".join(parts), ttl)
 
     def summarize_notes(self, notes: list) -> str:
         """Summarize a list of notes"""
@@ -55,7 +215,7 @@ Provide:
 2. Key themes/topics
 3. Action items (if any)"""
 
-        return self.process(prompt)
+        return self.process(prompt, cache_for="summarize_notes")
 
     def extract_tasks(self, text: str) -> str:
         """Extract actionable tasks from text"""
@@ -63,43 +223,56 @@ Provide:
 
 {text}"""
         
-        return self.process(prompt)
+        return self.process(prompt, cache_for="extract_tasks")
 
-    def categorize_note(self, note_content: str) -> dict:
-        """Suggest categories/tags for a note and extract follow-up date if present"""
-        from datetime import datetime, timedelta
-        
-        prompt = f"""Analyze this note and suggest:
-1. 2-3 relevant tags/categories
-2. A priority level (high/medium/low)
-3. Is it actionable? (yes/no)
-4. Follow-up date (extract if mentioned - like "tomorrow", "next week", "on Friday", etc. Today is {datetime.now().strftime('%Y-%m-%d, %A')}. Return date in YYYY-MM-DD format or "none")
+    def analyze_note(self, note_content: str) -> NoteAnalysis:
+        """Generate title, tags, priority, actionable flag and follow-up date in one structured call"""
+        messages, options = self._analysis_request(note_content)
+        return self._parse_analysis(self._chat(messages, **options), note_content)
+
+    def _analysis_request(self, note_content: str):
+        """Messages and request options for analyze_note"""
+        prompt = f"""Analyze this note and return:
+- title: a short, descriptive title (max 6 words)
+- tags: 2-3 relevant tags/categories
+- priority: high, medium or low
+- actionable: whether the note contains something to act on
+- follow_up_date: extract if mentioned - like "tomorrow", "next week", "on Friday", etc. Today is {datetime.now().strftime('%Y-%m-%d, %A')}. Use YYYY-MM-DD format, or null if none
 
 Note content:
-{note_content}
+{note_content}"""
 
-Respond in this exact format:
-Tags: tag1, tag2, tag3
-Priority: medium
-Actionable: yes
-FollowUp: 2026-01-15"""
+        messages = [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": prompt},
+        ]
+        options = {
+            "max_tokens": 300,
+            "temperature": 0.2,
+            "cache_for": "analyze_note",
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {"name": "note_analysis", "strict": True, "schema": NOTE_ANALYSIS_SCHEMA},
+            },
+        }
+        return messages, options
 
-        response = self.process(prompt)
-        
-        # Parse response
-        result = {"tags": [], "priority": "medium", "actionable": False, "follow_up_date": None}
-        for line in response.split("\n"):
-            if line.startswith("Tags:"):
-                result["tags"] = [t.strip() for t in line.replace("Tags:", "").split(",")]
-            elif line.startswith("Priority:"):
-                result["priority"] = line.replace("Priority:", "").strip().lower()
-            elif line.startswith("Actionable:"):
-                result["actionable"] = "yes" in line.lower()
-            elif line.startswith("FollowUp:"):
-                date_str = line.replace("FollowUp:", "").strip()
-                if date_str and date_str.lower() != "none":
-                    result["follow_up_date"] = date_str
-        
+    @staticmethod
+    def _parse_analysis(response: str, note_content: str) -> NoteAnalysis:
+        """Validate the structured-output JSON into a NoteAnalysis"""
+        fallback_title = note_content[:50] + "..." if len(note_content) > 50 else note_content
+        try:
+            data = json.loads(response or "{}")
+        except json.JSONDecodeError:
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        return NoteAnalysis.from_dict(data, fallback_title=fallback_title)
+
+    def categorize_note(self, note_content: str) -> dict:
+        """Suggest categories/tags for a note and extract follow-up date if present"""
+        result = self.analyze_note(note_content).to_dict()
+        result.pop("title")
         return result
 
     def generate_daily_summary(self, notes: list, tasks: list = None) -> str:
@@ -118,13 +291,108 @@ Include:
 2. Priority items for tomorrow
 3. Any patterns or observations"""
 
-        return self.process(prompt)
+        return self.process(prompt, cache_for="generate_daily_summary")
 
-    def answer_question(self, question: str, relevant_notes: list) -> str:
-        """Answer a question using context from notes"""
-        context = "\n\n".join(relevant_notes) if relevant_notes else "No relevant notes found."
-        
-        return self.process(question, context=context)
+    def answer_question(self, question: str, relevant_notes) -> str:
+        """Answer a question using context from notes (a ContextPack, or notes to pack)"""
+        return self.process(*self._question_request(question, relevant_notes), cache_for="answer_question")
+
+    def answer_question_stream(self, question: str, relevant_notes):
+        """Answer a question using context from notes, yielding the answer as it is generated"""
+        return self.process_stream(*self._question_request(question, relevant_notes), cache_for="answer_question")
+
+    @staticmethod
+    def _question_request(question: str, relevant_notes):
+        """(user_input, context) for answer_question, packing notes into the context token budget"""
+        pack = relevant_notes if isinstance(relevant_notes, ContextPack) else build_context(question, relevant_notes or [])
+        if not pack.text:
+            return question, "No relevant notes found."
+        return f"{question}\n\n(Cite the numbered notes you used, e.g. [1].)", pack.text
+
+
+@traced
+class AsyncChatGPTProcessor(ChatGPTProcessor):
+    """asyncio variant of ChatGPTProcessor built on openai.AsyncOpenAI.
+
+    Every public method returns an awaitable: the text-returning methods pass the
+    coroutine from _chat straight through, and the parsing methods are overridden.
+    The *_stream methods return async generators from _chat_stream.
+    """
+    def __init__(self, model: str = "gpt-4.1", cache: LLMCache = None, cache_ttls: dict = None):
+        import openai
+
+        super().__init__(model=model, cache=cache, cache_ttls=cache_ttls)
+        self.client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0,
+                                         http_client=async_http_client("openai"), timeout=timeout("openai"))
+
+    async def _chat(self, messages: list, max_tokens: int = 1000, temperature: float = 0.7,
+                    cache_for: str = None, **kwargs) -> str:
+        """Send a chat completion request and return the message text (served from cache when possible)"""
+        start = time.perf_counter()
+        key, ttl, cached = self._cache_lookup(cache_for, messages, temperature, max_tokens, **kwargs)
+        if cached is not None:
+            LLM_SECONDS.labels(cache_for or "chat", "true").observe(time.perf_counter() - start)
+            return cached
+
+        with span("openai chat.completions", upstream="openai"):
+            response = await limiters["openai"].call_async(
+                self.client.chat.completions.create,
+                model=self.model,
+                messages=messages,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                **kwargs
+            )
+
+        LLM_SECONDS.labels(cache_for or "chat", "false").observe(time.perf_counter() - start)
+
+        content = response.choices[0].message.content
+        if key:
+            self.cache.set(key, content, ttl)
+        return content
+
+    async def _chat_stream(self, messages: list, max_tokens: int = 1000, temperature: float = 0.7,
+                           cache_for: str = None, **kwargs):
+        """Stream a chat completion, yielding text deltas (a cached response is yielded whole)"""
+        start = time.perf_counter()
+        key, ttl, cached = self._cache_lookup(cache_for, messages, temperature, max_tokens, **kwargs)
+        if cached is not None:
+            LLM_SECONDS.labels(cache_for or "chat", "true").observe(time.perf_counter() - start)
+            yield cached
+            return
+
+        stream = await limiters["openai"].call_async(
+            self.client.chat.completions.create,
+            model=self.model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            **kwargs
+        )
+
+        parts = []
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+        # Whole stream, so it is comparable with the non-streaming calls
+        LLM_SECONDS.labels(cache_for or "chat", "false").observe(time.perf_counter() - start)
+        add_span("openai chat.completions (stream)", start, upstream="openai")
+        if key:
+            self.cache.set(key, "".join(parts), ttl)
+
+    async def analyze_note(self, note_content: str) -> NoteAnalysis:
+        """Generate title, tags, priority, actionable flag and follow-up date in one structured call"""
+        messages, options = self._analysis_request(note_content)
+        return self._parse_analysis(await self._chat(messages, **options), note_content)
+
+    async def categorize_note(self, note_content: str) -> dict:
+        """Suggest categories/tags for a note and extract follow-up date if present"""
+        result = (await self.analyze_note(note_content)).to_dict()
+        result.pop("title")
+        return result
 
 
 if __name__ == "__main__":
@@ -0,0 +1,222 @@
+"""
+Local pre-LLM classification: rules decide capture vs. ignore, a TF-IDF tag model proposes tags
+"""
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+from chatgpt_processor import NoteAnalysis
+from commands import should_skip_auto_capture, fallback_title
+from note_index import STOPWORDS
+from config import (
+    CLASSIFIER_ENABLED, CLASSIFIER_IGNORE_THRESHOLD, CLASSIFIER_TAG_THRESHOLD,
+    CLASSIFIER_MIN_TAG_EXAMPLES, CLASSIFIER_RETRAIN_INTERVAL,
+)
+
+# Words that make up small talk; a short message made only of these is chatter
+CHATTER_WORDS = {
+    "ok", "okay", "k", "kk", "thanks", "thank", "thx", "ty", "yes", "yeah", "yep", "yup", "no", "nope",
+    "lol", "haha", "hehe", "sure", "cool", "nice", "great", "awesome", "perfect", "agreed", "np",
+    "got", "it", "sounds", "good", "see", "you", "later", "bye", "morning", "night", "hi", "hello",
+    "hey", "brb", "omw", "will", "do", "me", "too", "same", "alright", "welcome", "yw", "wow", "oh",
+    "ah", "hmm", "right", "exactly", "true", "fine", "lgtm", "gm", "gn", "cheers", "the", "a", "all",
+}
+
+# Anything matching these is worth keeping, however short or chatty it looks
+CAPTURE_SIGNALS = re.compile(
+    r"https?://|\b(todo|to-do|remind|remember|idea|deadline|need to|have to|should|must|don't forget|"
+    r"follow up|action item|note to self|book|buy|call|email|meeting)\b",
+    re.IGNORECASE,
+)
+
+# Dates/times need the LLM to resolve into a follow-up date
+DATE_HINTS = re.compile(
+    r"\b(today|tonight|tomorrow|yesterday|next (week|month|year)|this (week|weekend|month)|"
+    r"(mon|tues|wednes|thurs|fri|satur|sun)day|eod|eow|"
+    r"jan(uary)?|feb(ruary)?|mar(ch)?|apr(il)?|jun(e)?|jul(y)?|aug(ust)?|sep(tember)?|oct(ober)?|"
+    r"nov(ember)?|dec(ember)?|in \d+ (days|weeks|months))\b|\d{1,4}[/-]\d{1,2}([/-]\d{1,4})?",
+    re.IGNORECASE,
+)
+
+ACTION_HINTS = re.compile(r"\b(todo|to-do|need to|have to|must|should|don't forget|follow up|action item|"
+                          r"remind|book|buy|call|email|send|fix|schedule)\b", re.IGNORECASE)
+URGENT_HINTS = re.compile(r"\b(urgent|asap|important|critical|high priority|immediately)\b", re.IGNORECASE)
+
+# Longer notes get an LLM title; a truncated first line is only good enough for short ones
+LOCAL_MAX_CHARS = 280
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens without stopwords"""
+    return [t for t in re.findall(r"\w+", (text or "").lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+@dataclass
+class Classification:
+    """Result of LocalClassifier.classify"""
+    decision: str  # "capture" or "ignore"
+    confidence: float
+    reason: str
+
+
+class TagModel:
+    """TF-IDF centroid per tag, trained from notes already tagged in the local mirror"""
+    def __init__(self, min_examples: int = CLASSIFIER_MIN_TAG_EXAMPLES):
+        self.min_examples = min_examples
+        self.idf = {}
+        self.centroids = {}  # tag -> sparse unit vector
+        self.trained_on = 0
+
+    def train(self, notes):
+        """Fit on an iterable of (text, tags) pairs"""
+        docs = [(Counter(tokenize(text)), tags) for text, tags in notes]
+        docs = [(tf, tags) for tf, tags in docs if tf and tags]
+        df = Counter(term for tf, _ in docs for term in tf)
+        self.idf = {term: math.log((1 + len(docs)) / (1 + n)) + 1 for term, n in df.items()}
+
+        sums = defaultdict(Counter)
+        counts = Counter()
+        for tf, tags in docs:
+            vector = self._vectorize(tf)
+            for tag in set(tags):
+                sums[tag].update(vector)
+                counts[tag] += 1
+        self.centroids = {
+            tag: _unit(vector) for tag, vector in sums.items() if counts[tag] >= self.min_examples
+        }
+        self.trained_on = len(docs)
+
+    def predict(self, text: str, limit: int = 3) -> list:
+        """(tag, cosine) pairs, best first"""
+        if not self.centroids:
+            return []
+        query = _unit(self._vectorize(Counter(tokenize(text))))
+        if not query:
+            return []
+        scores = [
+            (tag, sum(weight * centroid.get(term, 0.0) for term, weight in query.items()))
+            for tag, centroid in self.centroids.items()
+        ]
+        scores.sort(key=lambda pair: pair[1], reverse=True)
+        return [(tag, score) for tag, score in scores[:limit] if score > 0]
+
+    def _vectorize(self, tf: Counter) -> dict:
+        # Unseen terms carry no tag evidence
+        return {term: (1 + math.log(n)) * self.idf[term] for term, n in tf.items() if term in self.idf}
+
+
+def _unit(vector: dict) -> dict:
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    return {term: w / norm for term, w in vector.items()} if norm else {}
+
+
+class LocalClassifier:
+    """Decides capture vs. ignore and proposes tags locally, so the LLM only sees the hard cases"""
+    def __init__(self, index=None, enabled: bool = CLASSIFIER_ENABLED,
+                 ignore_threshold: float = CLASSIFIER_IGNORE_THRESHOLD,
+                 tag_threshold: float = CLASSIFIER_TAG_THRESHOLD,
+                 retrain_interval: float = CLASSIFIER_RETRAIN_INTERVAL):
+        self.index = index
+        self.enabled = enabled
+        self.ignore_threshold = ignore_threshold
+        self.tag_threshold = tag_threshold
+        self.retrain_interval = retrain_interval
+        self.model = TagModel()
+        self._trained_at = None
+        self._trained_count = None
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def classify(self, text: str) -> Classification:
+        """Decide whether an auto-captured message is worth saving"""
+        if should_skip_auto_capture(text):
+            result = Classification("ignore", 1.0, "too short or common phrase")
+        elif not self.enabled:
+            result = Classification("capture", 0.5, "classifier disabled")
+        elif CAPTURE_SIGNALS.search(text):
+            result = Classification("capture", 1.0, "capture signal")
+        elif not re.search(r"\w", text):
+            result = Classification("ignore", 1.0, "no words")
+        else:
+            words = re.findall(r"[\w']+", text.lower())
+            chatter = sum(word in CHATTER_WORDS for word in words) / len(words)
+            # Chatter only counts in short messages; a long one is worth a note whatever its words
+            confidence = chatter * (1.0 if len(words) <= 6 else 0.5)
+            if confidence >= self.ignore_threshold:
+                result = Classification("ignore", confidence, "chatter")
+            else:
+                result = Classification("capture", 1.0 - confidence, "default")
+        self.counts[result.decision] += 1
+        return result
+
+    def should_ignore(self, text: str) -> bool:
+        """True if an auto-captured message should be dropped"""
+        result = self.classify(text)
+        if result.decision == "ignore":
+            print(f"   ↳ Skipping ({result.reason}, confidence {result.confidence:.2f})")
+            return True
+        return False
+
+    def analyze(self, text: str):
+        """A NoteAnalysis built locally when confident enough, else None (call the LLM)"""
+        if not self.enabled:
+            return None
+        reason = None
+        if len(text) > LOCAL_MAX_CHARS:
+            reason = "long note"
+        elif DATE_HINTS.search(text):
+            reason = "date to resolve"
+        else:
+            self._maybe_train()
+            tags = [tag for tag, score in self.model.predict(text) if score >= self.tag_threshold]
+            if not tags:
+                reason = "no confident tags"
+
+        if reason:
+            self.counts["llm_fallback"] += 1
+            print(f"   🤖 Local classifier deferring to LLM ({reason})")
+            return None
+
+        self.counts["local_analysis"] += 1
+        first_line = re.split(r"(?<=[.!?])\s|\n", text.strip(), maxsplit=1)[0]
+        return NoteAnalysis(
+            title=fallback_title(first_line),
+            tags=tags,
+            priority="high" if URGENT_HINTS.search(text) else "medium",
+            actionable=bool(ACTION_HINTS.search(text)),
+        )
+
+    def _maybe_train(self):
+        """(Re)train the tag model when the mirror has changed and the retrain interval has passed"""
+        if self.index is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._trained_at is not None and now - self._trained_at < self.retrain_interval:
+                return
+            count = self.index.count()
+            self._trained_at = now
+            if count == self._trained_count:
+                return
+            self.model.train(
+                (f"{note['title']}\n{note['body']}", note["tags"]) for note in self.index.tagged_notes()
+            )
+            self._trained_count = count
+        print(f"   🏷️  Tag model trained on {self.model.trained_on} notes ({len(self.model.centroids)} tags)")
+
+    def stats(self) -> dict:
+        """Decision counts and the share of enrichments answered without the LLM"""
+        analyses = self.counts["local_analysis"] + self.counts["llm_fallback"]
+        decisions = self.counts["capture"] + self.counts["ignore"]
+        return {
+            "captured": self.counts["capture"],
+            "ignored": self.counts["ignore"],
+            "local_analyses": self.counts["local_analysis"],
+            "llm_fallbacks": self.counts["llm_fallback"],
+            "ignore_rate": self.counts["ignore"] / decisions if decisions else 0.0,
+            "local_hit_rate": self.counts["local_analysis"] / analyses if analyses else 0.0,
+            "tags_known": len(self.model.centroids),
+        }
@@ -0,0 +1,113 @@
+"""
+Command parsing and reply text shared by the sync and async Slack listeners
+"""
+import re
+
+CAPTURE_PREFIXES = ("capture:", "note:", "save:", "capture ", "note ", "save ")
+QUESTION_PREFIXES = ("ask:", "ask ", "question:", "question ", "?")
+
+# Chat phrases that are never worth auto-capturing
+SKIP_PHRASES = ["hi", "hello", "hey", "ok", "okay", "thanks", "thank you", "yes", "no", "lol", "haha"]
+
+HELP_TEXT = """
+🧠 *Second Brain Commands:*
+
+📝 *Capture Notes:*
+• `capture: your thought here`
+• `note: important idea`
+• `save: meeting notes`
+
+❓ *Ask Questions:*
+• `ask: what did I note about X?`
+• `question: summarize my project notes`
+
+📊 *Get Summaries:*
+• `digest` - Get daily summary
+• `summary` - Same as digest
+
+💡 *Tips:*
+• Any message over 10 chars is auto-saved
+• Short messages (hi, ok, etc.) are ignored
+• All notes are AI-categorized automatically
+"""
+
+
+def route_message(text: str) -> str:
+    """Pick the command for a channel message: capture, question, digest, help or auto"""
+    text_lower = text.lower()
+    if text_lower.startswith(CAPTURE_PREFIXES):
+        return "capture"
+    if text_lower.startswith(QUESTION_PREFIXES):
+        return "question"
+    if "digest" in text_lower or "summary" in text_lower:
+        return "digest"
+    if text_lower in ["help", "commands", "?"]:
+        return "help"
+    return "auto"
+
+
+def route_mention(text: str) -> str:
+    """Pick the command for an @mention (mention already stripped); anything else is a capture"""
+    text_lower = text.lower()
+    if not text or text_lower in ["help", "commands"]:
+        return "help"
+    if text_lower.startswith(QUESTION_PREFIXES):
+        return "question"
+    if "digest" in text_lower or "summary" in text_lower:
+        return "digest"
+    return "capture"
+
+
+def strip_mention(text: str) -> str:
+    """Remove <@U123> mentions from message text"""
+    return re.sub(r'<@[A-Z0-9]+>', '', text).strip()
+
+
+def capture_content(text: str) -> str:
+    """Remove a capture/note/save prefix"""
+    return re.sub(r'^(capture|note|save)[:\s]+', '', text, flags=re.IGNORECASE).strip()
+
+
+def question_text(text: str) -> str:
+    """Remove an ask/question/? prefix"""
+    return re.sub(r'^(ask|question|\?)[:\s]+', '', text, flags=re.IGNORECASE).strip()
+
+
+def should_skip_auto_capture(text: str) -> bool:
+    """Skip very short messages or common chat phrases"""
+    return len(text) < 10 or text.lower() in SKIP_PHRASES
+
+
+def fallback_title(content: str) -> str:
+    """Title used until (or instead of) AI enrichment"""
+    return content[:50] + "..." if len(content) > 50 else content
+
+
+def render_capture_reply(title: str, tags: list, pending: bool = False) -> str:
+    """Confirmation text for an explicit capture"""
+    tags_str = "⏳ enriching..." if pending else ", ".join(tags) or "none"
+    return f"✅ *Captured to Second Brain!*\n📝 *Title:* {title}\n🏷️ *Tags:* {tags_str}"
+
+
+def render_auto_capture_reply(title: str, tags: list, pending: bool = False) -> str:
+    """Confirmation text for an auto-capture"""
+    return f"💾 Auto-saved: *{title}*" + (" ⏳" if pending else "")
+
+
+def render_queued_reply(title: str) -> str:
+    """Reply when Notion didn't take a capture and the outbox will retry it"""
+    return f"📥 Notion is unavailable right now - *{title}* is saved and will be added when it's back."
+
+
+def notion_url(page_id: str) -> str:
+    """Link to a Notion page from its ID"""
+    return f"https://www.notion.so/{page_id.replace('-', '')}"
+
+
+def render_sources(sources: list) -> str:
+    """Numbered source links for an answer (matching the [n] citations)"""
+    links = [
+        f"[{i}] <{notion_url(source['page_id'])}|{source['title']}>" if source.get("page_id") else f"[{i}] {source['title']}"
+        for i, source in enumerate(sources, 1)
+    ]
+    return "\n\n📚 *Sources:* " + "  ".join(links) if links else ""
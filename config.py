@@ -6,10 +6,128 @@ load_dotenv()
 # Notion Configuration
 NOTION_API_KEY = os.getenv("NOTION_API_KEY")
 NOTION_DATABASE_ID = os.getenv("NOTION_DATABASE_ID")
+# API endpoints can point at local stand-ins (see benchmark.py); OPENAI_BASE_URL=None means the SDK default
+NOTION_BASE_URL = os.getenv("NOTION_BASE_URL", "https://api.notion.com")
 
 # Slack Configuration
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN")
 SLACK_CHANNEL_ID = os.getenv("SLACK_CHANNEL_ID")
+SLACK_API_URL = os.getenv("SLACK_API_URL", "https://slack.com/api/")
+# Minimum seconds between chat.update edits while streaming an answer (chat.update is Tier 3, ~50/min)
+SLACK_STREAM_INTERVAL = float(os.getenv("SLACK_STREAM_INTERVAL", "1.0"))
 
 # OpenAI Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+# Capture Queue Configuration
+CAPTURE_WORKERS = int(os.getenv("CAPTURE_WORKERS", "4"))
+CAPTURE_QUEUE_SIZE = int(os.getenv("CAPTURE_QUEUE_SIZE", "100"))
+CAPTURE_ENQUEUE_TIMEOUT = float(os.getenv("CAPTURE_ENQUEUE_TIMEOUT", "0"))
+# "inline" enriches before saving; "deferred" saves the raw note first and enriches in the background
+CAPTURE_MODE = os.getenv("CAPTURE_MODE", "inline")
+# Async listener: max capture/question jobs running on the event loop at once
+ASYNC_MAX_IN_FLIGHT = int(os.getenv("ASYNC_MAX_IN_FLIGHT", "500"))
+# Async listener: threads for its blocking local work (SQLite, the classifier, query embeddings)
+ASYNC_LOCAL_WORKERS = int(os.getenv("ASYNC_LOCAL_WORKERS", "4"))
+
+# Tracing and Profiling (events slower than TRACE_SLOW_THRESHOLD seconds log a span breakdown;
+# ADMIN_TOKEN enables the /admin/profile endpoint, sent as the X-Admin-Token header)
+TRACE_SLOW_THRESHOLD = float(os.getenv("TRACE_SLOW_THRESHOLD", "5"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Append every incoming message/mention event to this JSONL file for replay.py (empty = off; contains message text)
+EVENT_RECORD_PATH = os.getenv("EVENT_RECORD_PATH", "")
+
+# Local Search Index
+NOTE_INDEX_PATH = os.getenv("NOTE_INDEX_PATH", "data/notes_index.db")
+
+# Local Pre-LLM Classifier (ignore chatter, tag obvious notes without calling OpenAI)
+CLASSIFIER_ENABLED = os.getenv("CLASSIFIER_ENABLED", "true").lower() == "true"
+CLASSIFIER_IGNORE_THRESHOLD = float(os.getenv("CLASSIFIER_IGNORE_THRESHOLD", "0.8"))
+CLASSIFIER_TAG_THRESHOLD = float(os.getenv("CLASSIFIER_TAG_THRESHOLD", "0.35"))
+CLASSIFIER_MIN_TAG_EXAMPLES = int(os.getenv("CLASSIFIER_MIN_TAG_EXAMPLES", "3"))
+CLASSIFIER_RETRAIN_INTERVAL = float(os.getenv("CLASSIFIER_RETRAIN_INTERVAL", "3600"))
+
+# Page Block Fetching (concurrent fetches; cache keyed on page last_edited_time)
+BLOCK_FETCH_WORKERS = int(os.getenv("BLOCK_FETCH_WORKERS", "4"))
+BLOCK_CACHE_PATH = os.getenv("BLOCK_CACHE_PATH", "data/block_cache.db")
+
+# Question Answering Context (notes retrieved, then chunked and packed into a token budget)
+CONTEXT_MAX_NOTES = int(os.getenv("CONTEXT_MAX_NOTES", "8"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+CONTEXT_CHUNK_TOKENS = int(os.getenv("CONTEXT_CHUNK_TOKENS", "200"))
+
+# Semantic Retrieval ("openai" in production, "hashing" for offline/tests)
+EMBEDDER = os.getenv("EMBEDDER", "openai")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "data/vectors")
+
+# Notion Sync (seconds between incremental ticks; full reconcile every N ticks)
+SYNC_INTERVAL = float(os.getenv("SYNC_INTERVAL", "60"))
+SYNC_RECONCILE_EVERY = int(os.getenv("SYNC_RECONCILE_EVERY", "60"))
+
+# Event De-duplication ("sqlite" survives restarts, "memory" is per-process)
+DEDUP_BACKEND = os.getenv("DEDUP_BACKEND", "sqlite")
+DEDUP_PATH = os.getenv("DEDUP_PATH", "data/dedup.db")
+DEDUP_TTL = float(os.getenv("DEDUP_TTL", "86400"))
+DEDUP_MAX_ENTRIES = int(os.getenv("DEDUP_MAX_ENTRIES", "10000"))
+
+# Capture Outbox (captures are written here before Notion and retried until they land; see outbox.py)
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", "data/outbox.db")
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+# Retry backoff in seconds (doubling per attempt) and how often the drain loop looks for due entries
+OUTBOX_RETRY_BASE = float(os.getenv("OUTBOX_RETRY_BASE", "5"))
+OUTBOX_RETRY_MAX = float(os.getenv("OUTBOX_RETRY_MAX", "600"))
+OUTBOX_DRAIN_INTERVAL = float(os.getenv("OUTBOX_DRAIN_INTERVAL", "5"))
+# Seconds a capture job may hold an entry before the drain loop takes it over (e.g. after a crash)
+OUTBOX_LEASE = float(os.getenv("OUTBOX_LEASE", "120"))
+# Seconds delivered entries are kept for inspection
+OUTBOX_KEEP_DONE = float(os.getenv("OUTBOX_KEEP_DONE", "86400"))
+
+# Slack User Cache
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "3600"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "5000"))
+USER_CACHE_WARM = os.getenv("USER_CACHE_WARM", "true").lower() == "true"
+
+# LLM Response Cache
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.db")
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1000"))
+# Row cap for the SQLite tier (LLM_CACHE_SIZE only bounds the in-memory LRU)
+LLM_CACHE_DISK_SIZE = int(os.getenv("LLM_CACHE_DISK_SIZE", "50000"))
+
+# Upstream Rate Limits (requests/second and burst size per provider)
+NOTION_RPS = float(os.getenv("NOTION_RPS", "3"))
+NOTION_BURST = int(os.getenv("NOTION_BURST", "3"))
+OPENAI_RPS = float(os.getenv("OPENAI_RPS", "5"))
+OPENAI_BURST = int(os.getenv("OPENAI_BURST", "10"))
+SLACK_RPS = float(os.getenv("SLACK_RPS", "5"))
+SLACK_BURST = int(os.getenv("SLACK_BURST", "10"))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5"))
+RATE_LIMIT_BASE_DELAY = float(os.getenv("RATE_LIMIT_BASE_DELAY", "0.5"))
+RATE_LIMIT_MAX_DELAY = float(os.getenv("RATE_LIMIT_MAX_DELAY", "30"))
+
+# Pooled HTTP Transport (one keep-alive connection pool per upstream, shared by every client; see transport.py)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+# HTTP/2 where the upstream supports it (needs the h2 package; the async Slack client is HTTP/1.1 only)
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true"
+# Connections opened to each upstream at startup, so the first events don't pay for TLS handshakes
+HTTP_WARM_CONNECTIONS = int(os.getenv("HTTP_WARM_CONNECTIONS", "4"))
+# Read timeouts in seconds (LLM answers can take a while)
+NOTION_TIMEOUT = float(os.getenv("NOTION_TIMEOUT", "30"))
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "120"))
+SLACK_TIMEOUT = float(os.getenv("SLACK_TIMEOUT", "15"))
+
+# Backfill Importer (threads per pipeline stage; checkpoints go in BACKFILL_CHECKPOINT_DIR)
+BACKFILL_ENRICH_WORKERS = int(os.getenv("BACKFILL_ENRICH_WORKERS", "4"))
+BACKFILL_WRITE_WORKERS = int(os.getenv("BACKFILL_WRITE_WORKERS", "2"))
+BACKFILL_QUEUE_SIZE = int(os.getenv("BACKFILL_QUEUE_SIZE", "200"))
+BACKFILL_CHECKPOINT_DIR = os.getenv("BACKFILL_CHECKPOINT_DIR", "data")
+
+# Export (pages per concurrent block fetch; JSONL commits every N rows; Parquet rolls files every N rows)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "16"))
+EXPORT_COMMIT_EVERY = int(os.getenv("EXPORT_COMMIT_EVERY", "100"))
+EXPORT_ROWS_PER_FILE = int(os.getenv("EXPORT_ROWS_PER_FILE", "10000"))
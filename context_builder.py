@@ -0,0 +1,130 @@
+"""
+Token-budgeted context packing: chunk notes, rank chunks against the question, keep the best that fit
+"""
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+from config import CONTEXT_TOKEN_BUDGET, CONTEXT_CHUNK_TOKENS
+from note_index import STOPWORDS
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough local token count (~4 characters per token for English)"""
+    return math.ceil(len(text or "") / 4)
+
+
+def _terms(text: str) -> list:
+    return [t for t in re.findall(r"\w+", (text or "").lower()) if t not in STOPWORDS]
+
+
+def chunk_text(text: str, max_tokens: int = CONTEXT_CHUNK_TOKENS) -> list:
+    """Split text into chunks of at most ~max_tokens, breaking on paragraphs, then sentences, then words"""
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n|\n", text or ""):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if estimate_tokens(paragraph) <= max_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            while estimate_tokens(sentence) > max_tokens:
+                cut = sentence[:max_tokens * 4].rsplit(" ", 1)[0] or sentence[:max_tokens * 4]
+                pieces.append(cut)
+                sentence = sentence[len(cut):].strip()
+            if sentence:
+                pieces.append(sentence)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        candidate = f"{current}\n{piece}" if current else piece
+        if current and estimate_tokens(candidate) > max_tokens:
+            chunks.append(current)
+            current = piece
+        else:
+            current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@dataclass
+class Chunk:
+    source: int  # Retrieval rank of the note it came from
+    position: int  # Order within the note
+    text: str
+    tokens: int
+    score: float = 0.0
+
+
+@dataclass
+class ContextPack:
+    """Packed context for a prompt plus the notes it came from"""
+    text: str
+    sources: list = field(default_factory=list)  # [{"page_id", "title"}], numbered [1]..[n] in text
+    tokens: int = 0
+    dropped_chunks: int = 0
+
+
+def build_context(question: str, notes: list, budget: int = CONTEXT_TOKEN_BUDGET,
+                  chunk_tokens: int = CONTEXT_CHUNK_TOKENS) -> ContextPack:
+    """Pack the chunks of `notes` most relevant to `question` into `budget` tokens.
+
+    Notes are note dicts (page_id, title, body) in retrieval order, or plain strings.
+    """
+    candidates = []
+    for rank, note in enumerate(notes):
+        if isinstance(note, str):
+            note = {"page_id": None, "title": "", "body": note}
+        title = note.get("title") or "Untitled"
+        for position, text in enumerate(chunk_text(note.get("body") or "", chunk_tokens) or [title]):
+            candidates.append((rank, title, note.get("page_id"), Chunk(rank, position, text, estimate_tokens(text))))
+
+    # BM25 over chunks (title included so a matching title lifts all of its chunks)
+    query = set(_terms(question))
+    docs = [Counter(_terms(f"{title} {chunk.text}")) for _, title, _, chunk in candidates]
+    avg_len = sum(sum(d.values()) for d in docs) / len(docs) if docs else 0
+    df = Counter(term for d in docs for term in set(d) if term in query)
+    for (rank, _, _, chunk), doc in zip(candidates, docs):
+        length = sum(doc.values())
+        for term in query & doc.keys():
+            idf = math.log(1 + (len(docs) - df[term] + 0.5) / (df[term] + 0.5))
+            tf = doc[term]
+            chunk.score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * length / (avg_len or 1)))
+        # Semantic matches may share no words with the question: keep their opening chunk only
+        if not chunk.score and chunk.position:
+            continue
+        # Retrieval order breaks ties and keeps a little weight on chunks with no word overlap
+        chunk.score += 0.5 / (rank + 1) + 0.1 / (chunk.position + 1)
+
+    selected = []
+    used = 0
+    headers = {}
+    for rank, title, page_id, chunk in sorted(candidates, key=lambda c: c[3].score, reverse=True):
+        if not chunk.score:
+            continue
+        header_cost = 0 if rank in headers else estimate_tokens(f"[{len(headers) + 1}] {title}\n")
+        if used + header_cost + chunk.tokens > budget:
+            continue
+        if rank not in headers:
+            headers[rank] = {"page_id": page_id, "title": title}
+        used += header_cost + chunk.tokens
+        selected.append(chunk)
+
+    # Emit notes in order of their best chunk, and each note's chunks in document order
+    sources = []
+    sections = []
+    for rank, source in headers.items():
+        sources.append(source)
+        body = "\n...\n".join(c.text for c in sorted((c for c in selected if c.source == rank),
+                                                     key=lambda c: c.position))
+        sections.append(f"[{len(sources)}] {source['title']}\n{body}")
+    return ContextPack(
+        text="\n\n".join(sections),
+        sources=sources,
+        tokens=used,
+        dropped_chunks=len(candidates) - len(selected),
+    )
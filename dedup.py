@@ -0,0 +1,111 @@
+"""
+Bounded, persistent de-duplication of Slack events so redeliveries aren't captured twice
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from config import DEDUP_BACKEND, DEDUP_PATH, DEDUP_TTL, DEDUP_MAX_ENTRIES
+
+
+def dedup_key(channel: str, ts: str, event_id: str = None) -> str:
+    """Build the key an event is de-duplicated on"""
+    return f"{channel or ''}:{ts or ''}:{event_id or ''}"
+
+
+class DedupStore:
+    """Interface for dedup backends; implement check_and_add to share state between instances"""
+    def check_and_add(self, key: str) -> bool:
+        """Record `key` and return True if it had not been seen (within the TTL)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class MemoryDedupStore(DedupStore):
+    """In-process store with TTL expiry, evicting the oldest keys beyond max_entries"""
+    def __init__(self, ttl: float = DEDUP_TTL, max_entries: int = DEDUP_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> expiry time, oldest first
+        self._lock = threading.Lock()
+
+    def check_and_add(self, key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            # Expired entries sit at the front because every insert goes to the back
+            while self._entries and next(iter(self._entries.values())) <= now:
+                self._entries.popitem(last=False)
+            if key in self._entries:
+                return False
+            self._entries[key] = now + self.ttl
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SqliteDedupStore(DedupStore):
+    """SQLite-backed store that survives restarts (and can be shared via a common volume)"""
+    def __init__(self, path: str = DEDUP_PATH, ttl: float = DEDUP_TTL, max_entries: int = DEDUP_MAX_ENTRIES,
+                 prune_every: int = 100):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self._inserts = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS seen_events (
+                    key TEXT PRIMARY KEY,
+                    expires_at REAL NOT NULL
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS seen_events_expiry ON seen_events (expires_at)")
+
+    def check_and_add(self, key: str) -> bool:
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM seen_events WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO seen_events (key, expires_at) VALUES (?, ?)", (key, now + self.ttl)
+            )
+            is_new = cursor.rowcount == 1
+            if is_new:
+                self._inserts += 1
+                if self._inserts % self.prune_every == 0:
+                    self._prune(now)
+            return is_new
+
+    def _prune(self, now: float):
+        """Drop expired keys, then the oldest keys beyond max_entries"""
+        self.conn.execute("DELETE FROM seen_events WHERE expires_at <= ?", (now,))
+        self.conn.execute(
+            "DELETE FROM seen_events WHERE key IN ("
+            "SELECT key FROM seen_events ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM seen_events").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+def get_dedup_store(backend: str = DEDUP_BACKEND) -> DedupStore:
+    """Build the configured dedup store ("sqlite" or "memory")"""
+    if backend == "sqlite":
+        return SqliteDedupStore()
+    if backend == "memory":
+        return MemoryDedupStore()
+    raise ValueError(f"Unknown dedup backend: {backend}")
@@ -0,0 +1,195 @@
+"""
+Embedders and a NumPy-backed vector index for semantic note retrieval
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+from config import OPENAI_API_KEY, OPENAI_BASE_URL, EMBEDDER, EMBEDDING_MODEL, VECTOR_INDEX_DIR
+from rate_limit import limiters
+from transport import http_client, timeout
+
+
+class HashingEmbedder:
+    """Deterministic local embedder (feature hashing of words and bigrams) for offline use and tests"""
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def embed(self, texts: list) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"\w+", (text or "").lower())
+            features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+            for feature in features:
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                sign = 1.0 if digest[4] & 1 else -1.0
+                vectors[row, bucket] += sign
+        return vectors
+
+
+class OpenAIEmbedder:
+    """OpenAI embeddings API (production)"""
+    def __init__(self, model: str = EMBEDDING_MODEL, client=None):
+        import openai
+        self.model = model
+        self.name = model
+        self.client = client or openai.OpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0,
+                                              http_client=http_client("openai"), timeout=timeout("openai"))
+
+    def embed(self, texts: list) -> np.ndarray:
+        # The API rejects empty strings
+        response = limiters["openai"].call(
+            self.client.embeddings.create, model=self.model, input=[t or " " for t in texts]
+        )
+        return np.array([item.embedding for item in response.data], dtype=np.float32)
+
+
+def get_embedder(name: str = EMBEDDER):
+    """Build the configured embedder ("openai", "hashing" or "none"); None means keyword-only retrieval"""
+    if name in ("none", ""):
+        return None
+    if name == "hashing":
+        return HashingEmbedder()
+    if name == "openai":
+        if not OPENAI_API_KEY:
+            print("   ⚠️  EMBEDDER=openai needs OPENAI_API_KEY; using keyword-only retrieval")
+            return None
+        return OpenAIEmbedder()
+    raise ValueError(f"Unknown embedder: {name}")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class VectorIndex:
+    """In-memory float32 matrix of unit vectors, persisted as a memory-mapped .npy file"""
+    def __init__(self, embedder=None, path: str = VECTOR_INDEX_DIR, autosave_every: int = 20):
+        self.embedder = embedder if embedder is not None else get_embedder()
+        if self.embedder is None:
+            raise ValueError("VectorIndex needs an embedder (EMBEDDER is none)")
+        self.path = path
+        self.autosave_every = autosave_every
+        self._lock = threading.Lock()
+        self._ids = []
+        self._positions = {}
+        self._matrix = None  # Rows [0, len(self._ids)) are live; extra rows are spare capacity
+        self._pending_saves = 0
+        self._load()
+
+    @property
+    def _vectors_file(self):
+        return os.path.join(self.path, "vectors.npy")
+
+    @property
+    def _meta_file(self):
+        return os.path.join(self.path, "meta.json")
+
+    def _load(self):
+        if not (os.path.exists(self._vectors_file) and os.path.exists(self._meta_file)):
+            return
+        with open(self._meta_file, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("embedder") != self.embedder.name:
+            print(f"   ⚠️  Vector index built with {meta.get('embedder')}, rebuilding for {self.embedder.name}")
+            return
+        # Memory-mapped until the first write copies it into RAM
+        self._matrix = np.load(self._vectors_file, mmap_mode="r")
+        self._ids = meta["ids"]
+        self._positions = {page_id: i for i, page_id in enumerate(self._ids)}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, page_id):
+        return page_id in self._positions
+
+    def add(self, page_id: str, text: str):
+        """Embed and add (or replace) a single note"""
+        self.add_many([(page_id, text)])
+
+    def add_many(self, items: list):
+        """Embed and add (or replace) a batch of (page_id, text) pairs in one embedder call"""
+        if not items:
+            return
+        vectors = _normalize(self.embedder.embed([text for _, text in items]))
+        with self._lock:
+            self._ensure_writable(len(self._ids) + len(items), vectors.shape[1])
+            for (page_id, _), vector in zip(items, vectors):
+                row = self._positions.get(page_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._ids.append(page_id)
+                    self._positions[page_id] = row
+                self._matrix[row] = vector
+            self._pending_saves += len(items)
+            should_save = self._pending_saves >= self.autosave_every
+        if should_save:
+            self.save()
+
+    def remove(self, page_id: str):
+        """Remove a note by moving the last row into its slot"""
+        with self._lock:
+            row = self._positions.pop(page_id, None)
+            if row is None:
+                return
+            self._ensure_writable(len(self._ids), self._matrix.shape[1])
+            last = len(self._ids) - 1
+            if row != last:
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._positions[self._ids[row]] = row
+            self._ids.pop()
+            self._pending_saves += 1
+
+    def search(self, query: str, limit: int = 5) -> list:
+        """Cosine top-k over all notes; returns (page_id, score) pairs"""
+        if not self._ids:
+            return []
+        query_vector = _normalize(self.embedder.embed([query]))[0]
+        # Scored under the lock: remove() and add_many() rewrite rows in place, so the matrix only matches this copy
+        # of the ids until the lock is released (and the scores are the snapshot, without copying the matrix)
+        with self._lock:
+            count = len(self._ids)
+            if not count:
+                return []
+            scores = self._matrix[:count] @ query_vector
+            ids = list(self._ids)
+        k = min(limit, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(ids[i], float(scores[i])) for i in top]
+
+    def save(self):
+        """Persist the matrix and ID list atomically"""
+        with self._lock:
+            if self._matrix is None:
+                return
+            os.makedirs(self.path, exist_ok=True)
+            tmp_vectors = self._vectors_file + ".tmp.npy"
+            tmp_meta = self._meta_file + ".tmp"
+            np.save(tmp_vectors, np.ascontiguousarray(self._matrix[:len(self._ids)]))
+            with open(tmp_meta, "w", encoding="utf-8") as f:
+                json.dump({"embedder": self.embedder.name, "ids": self._ids}, f)
+            os.replace(tmp_vectors, self._vectors_file)
+            os.replace(tmp_meta, self._meta_file)
+            self._pending_saves = 0
+
+    def _ensure_writable(self, rows: int, dim: int):
+        """Copy a memory-mapped matrix into RAM and grow capacity geometrically"""
+        if self._matrix is None:
+            self._matrix = np.zeros((max(rows, 64), dim), dtype=np.float32)
+            return
+        if isinstance(self._matrix, np.memmap) or rows > self._matrix.shape[0]:
+            capacity = max(rows, len(self._ids) * 2, 64)
+            grown = np.zeros((capacity, self._matrix.shape[1]), dtype=np.float32)
+            grown[:len(self._ids)] = self._matrix[:len(self._ids)]
+            self._matrix = grown
@@ -0,0 +1,258 @@
+"""
+Streaming export of the Second Brain database to JSONL or Parquet (incremental and resumable)
+Usage: python export.py notes.jsonl
+       python export.py exports/ --format parquet
+
+Each run appends the pages edited since the previous run, so a page can appear more than
+once: keep the row with the latest last_edited_time per page_id. Database queries leave out
+trashed pages, so a page trashed after it was exported keeps its last row and gets no new one.
+"""
+import argparse
+import glob
+import json
+import os
+
+from notion_client_wrapper import NotionBrain, blocks_to_text, page_tags, page_title
+from commands import notion_url
+from config import EXPORT_BATCH_SIZE, EXPORT_COMMIT_EVERY, EXPORT_ROWS_PER_FILE
+
+COLUMNS = [
+    "page_id", "url", "title", "tags", "source", "status", "created", "follow_up",
+    "created_time", "last_edited_time", "in_trash", "text", "properties",
+]
+
+
+def property_value(prop: dict):
+    """Plain Python value of a Notion page property"""
+    kind = prop.get("type")
+    value = prop.get(kind)
+    if kind in ("title", "rich_text"):
+        return "".join(t.get("plain_text", "") for t in value or [])
+    if kind in ("select", "status"):
+        return value.get("name") if value else None
+    if kind == "multi_select":
+        return [option.get("name") for option in value or []]
+    if kind == "date":
+        return value.get("start") if value else None
+    if kind == "people":
+        return [person.get("name") or person.get("id") for person in value or []]
+    if kind == "formula":
+        return value.get(value.get("type")) if value else None
+    if kind == "relation":
+        return [item.get("id") for item in value or []]
+    # number, checkbox, url, email, phone_number, created_time, last_edited_time, ...
+    return value
+
+
+def page_record(page: dict, blocks: list) -> dict:
+    """Flatten a page and its blocks into one export row"""
+    properties = {name: property_value(prop) for name, prop in page.get("properties", {}).items()}
+    return {
+        "page_id": page["id"],
+        "url": page.get("url") or notion_url(page["id"]),
+        "title": page_title(page),
+        "tags": page_tags(page),
+        "source": properties.get("Source"),
+        "status": properties.get("Status"),
+        "created": properties.get("Created"),
+        "follow_up": properties.get("Follow up"),
+        "created_time": page.get("created_time"),
+        "last_edited_time": page.get("last_edited_time"),
+        "in_trash": bool(page.get("in_trash") or page.get("archived")),
+        "text": blocks_to_text(blocks),
+        "properties": properties,
+    }
+
+
+def iter_records(brain: NotionBrain, since: str = None, batch_size: int = EXPORT_BATCH_SIZE, skip=None):
+    """Yield export rows for pages edited at or after `since`, oldest edit first, a batch of pages at a time"""
+    batch = []
+    for page in brain.iter_changed_pages(since=since):
+        if skip and skip(page):
+            continue
+        batch.append(page)
+        if len(batch) >= batch_size:
+            yield from _records_for(brain, batch)
+            batch = []
+    yield from _records_for(brain, batch)
+
+
+def _records_for(brain: NotionBrain, pages: list):
+    live = [(page["id"], page.get("last_edited_time")) for page in pages
+            if not (page.get("in_trash") or page.get("archived"))]
+    blocks = brain.blocks.fetch_many(live) if live else {}
+    for page in pages:
+        if page["id"] in blocks or page.get("in_trash") or page.get("archived"):
+            yield page_record(page, blocks.get(page["id"], []))
+        else:
+            # Stop here so the cursor doesn't move past a page we couldn't read
+            raise RuntimeError(f"Could not fetch blocks for {page['id']}")
+
+
+class JsonlWriter:
+    """Appends rows to one JSONL file; a commit point is a byte offset"""
+    def __init__(self, path: str, offset: int = 0):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, "ab")
+        # Drop anything written after the last commit of an interrupted run
+        self.file.truncate(offset)
+        self.file.seek(offset)
+
+    def write(self, record: dict):
+        self.file.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+
+    def commit(self) -> dict:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return {"offset": self.file.tell()}
+
+    def close(self) -> dict:
+        state = self.commit()
+        self.file.close()
+        return state
+
+
+class ParquetWriter:
+    """Writes rows into numbered Parquet files in a directory; a commit point is a closed file"""
+    def __init__(self, directory: str, parts: int = 0, rows_per_file: int = EXPORT_ROWS_PER_FILE,
+                 row_group_size: int = 1000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.schema = pyarrow.schema([
+            ("page_id", pyarrow.string()), ("url", pyarrow.string()), ("title", pyarrow.string()),
+            ("tags", pyarrow.list_(pyarrow.string())), ("source", pyarrow.string()), ("status", pyarrow.string()),
+            ("created", pyarrow.string()), ("follow_up", pyarrow.string()), ("created_time", pyarrow.string()),
+            ("last_edited_time", pyarrow.string()), ("in_trash", pyarrow.bool_()), ("text", pyarrow.string()),
+            ("properties", pyarrow.string()),  # JSON, since property sets differ between databases
+        ])
+        self.directory = directory
+        self.parts = parts
+        self.rows_per_file = rows_per_file
+        self.row_group_size = row_group_size
+        os.makedirs(directory, exist_ok=True)
+        # Drop files left unfinished by an interrupted run
+        for path in glob.glob(os.path.join(directory, "notes-*.parquet")):
+            if int(os.path.basename(path)[6:-8]) >= parts:
+                os.remove(path)
+        self._writer = None
+        self._rows = []
+        self._rows_in_file = 0
+
+    def write(self, record: dict):
+        self._rows.append({**record, "properties": json.dumps(record["properties"], ensure_ascii=False)})
+        if len(self._rows) >= self.row_group_size:
+            self._flush_rows()
+
+    def _flush_rows(self):
+        if not self._rows:
+            return
+        if self._writer is None:
+            path = os.path.join(self.directory, f"notes-{self.parts:06d}.parquet")
+            self._writer = self.pq.ParquetWriter(path, self.schema)
+        columns = {name: [row[name] for row in self._rows] for name in COLUMNS}
+        self._writer.write_table(self.pa.table(columns, schema=self.schema))
+        self._rows_in_file += len(self._rows)
+        self._rows = []
+
+    def commit(self):
+        """Close the current file once it is full; returns the new commit point, or None if not at one"""
+        if self._rows_in_file + len(self._rows) < self.rows_per_file:
+            return None
+        return self.close()
+
+    def close(self) -> dict:
+        self._flush_rows()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self.parts += 1
+            self._rows_in_file = 0
+        return {"parts": self.parts}
+
+
+class Export:
+    def __init__(self, output: str, format: str = None, brain: NotionBrain = None,
+                 commit_every: int = EXPORT_COMMIT_EVERY):
+        self.output = output
+        self.format = format or ("jsonl" if output.endswith((".jsonl", ".json")) else "parquet")
+        self.brain = brain if brain is not None else NotionBrain()
+        self.commit_every = commit_every
+        # Kept beside (not inside) a Parquet directory so the directory reads as one dataset
+        self.state_path = output.rstrip("/") + ".state.json"
+
+    def load_state(self) -> dict:
+        if os.path.exists(self.state_path):
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("format") == self.format:
+                return state
+        return {"format": self.format, "cursor": None, "at_cursor": [], "offset": 0, "parts": 0, "exported": 0}
+
+    def save_state(self, state: dict):
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def run(self, full: bool = False) -> int:
+        """Export pages edited since the last committed run; returns the number of rows written"""
+        state = self.load_state()
+        if full:
+            state.update(cursor=None, at_cursor=[], offset=0, parts=0, exported=0)
+        if self.format == "jsonl":
+            writer = JsonlWriter(self.output, offset=state["offset"])
+        else:
+            writer = ParquetWriter(self.output, parts=state["parts"])
+
+        previously_exported = state["exported"]
+        cursor = state["cursor"]
+        at_cursor = set(state["at_cursor"])
+        written = 0
+
+        def already_exported(page):
+            # Cursor filters are inclusive (and minute-granular)
+            edited = page.get("last_edited_time")
+            return bool(cursor) and (edited < cursor or (edited == cursor and page["id"] in at_cursor))
+
+        def commit(point):
+            state.update(point, cursor=cursor, at_cursor=sorted(at_cursor), exported=previously_exported + written)
+            self.save_state(state)
+
+        try:
+            for record in iter_records(self.brain, since=cursor, skip=already_exported):
+                writer.write(record)
+                written += 1
+                if record["last_edited_time"] != cursor:
+                    cursor, at_cursor = record["last_edited_time"], set()
+                at_cursor.add(record["page_id"])
+                if written % self.commit_every == 0:
+                    point = writer.commit()
+                    if point is not None:
+                        commit(point)
+            commit(writer.close())
+        except KeyboardInterrupt:
+            print(f"\n⏸️  Interrupted - re-run to resume from the last commit ({state['exported']} rows)")
+            raise
+        print(f"📦 Exported {written} pages to {self.output} ({state['exported']} in total)")
+        return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the Second Brain database to JSONL or Parquet")
+    parser.add_argument("output", help="a .jsonl file, or a directory for Parquet files")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], help="default: from the output name")
+    parser.add_argument("--full", action="store_true", help="export every page again instead of only changes")
+    args = parser.parse_args()
+
+    Export(args.output, format=args.format).run(full=args.full)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Lazily built shared clients, so importing the listeners doesn't pay for connecting to anything
+"""
+import threading
+
+
+class Lazy:
+    """Stands in for the object `factory()` returns, building it (once, thread-safely) on first attribute access"""
+    def __init__(self, factory):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        """The real object, built now if it hasn't been yet"""
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+
+    @property
+    def built(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, name):
+        return getattr(self.resolve(), name)
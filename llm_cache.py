@@ -0,0 +1,134 @@
+"""
+Content-addressed cache of LLM responses (in-memory LRU in front of a SQLite tier)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from config import LLM_CACHE_PATH, LLM_CACHE_SIZE, LLM_CACHE_DISK_SIZE
+
+
+def cache_key(model: str, messages: list, temperature: float, max_tokens: int, **kwargs) -> str:
+    """Hash everything that determines a completion (messages include the system prompt)"""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens, **kwargs},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def seconds_until_midnight() -> float:
+    """TTL for responses that depend on today's date"""
+    now = datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return (midnight - now).total_seconds()
+
+
+class LLMCache:
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_SIZE,
+                 max_disk_entries: int = LLM_CACHE_DISK_SIZE, prune_every: int = 100):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.prune_every = prune_every
+        self._writes = 0
+        self._memory = OrderedDict()  # key -> (value, expires_at), least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self.conn = None
+        if path:
+            if path != ":memory:" and os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+            with self._lock, self.conn:
+                self.conn.execute("PRAGMA journal_mode=WAL")
+                self.conn.execute("""
+                    CREATE TABLE IF NOT EXISTS llm_responses (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )""")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS llm_responses_expiry ON llm_responses (expires_at)")
+                self._prune(time.time())
+
+    def get(self, key: str):
+        """Return a cached response, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[1] > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self._memory.pop(key, None)
+
+            if self.conn is not None:
+                row = self.conn.execute(
+                    "SELECT value, expires_at FROM llm_responses WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row:
+                    self._remember(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str, ttl: float):
+        """Store a response in both tiers"""
+        if not ttl or ttl <= 0 or value is None:
+            return
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO llm_responses (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, value, expires_at),
+                    )
+                    self._writes += 1
+                    if self._writes % self.prune_every == 0:
+                        self._prune(time.time())
+
+    def _prune(self, now: float):
+        """Drop expired rows, then the soonest-expiring rows beyond max_disk_entries"""
+        self.conn.execute("DELETE FROM llm_responses WHERE expires_at <= ?", (now,))
+        self.conn.execute(
+            "DELETE FROM llm_responses WHERE key IN ("
+            "SELECT key FROM llm_responses ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute("DELETE FROM llm_responses")
@@ -0,0 +1,16 @@
+"""
+The one thread pool the async listener hands its blocking local work to (SQLite reads and writes, the classifier,
+query embeddings), so none of it runs on the event loop and it doesn't take a new thread per call
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from config import ASYNC_LOCAL_WORKERS
+
+local_executor = ThreadPoolExecutor(max_workers=ASYNC_LOCAL_WORKERS, thread_name_prefix="local")
+
+
+async def run_local(fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) run on the local executor"""
+    return await asyncio.get_running_loop().run_in_executor(local_executor, partial(fn, *args, **kwargs))
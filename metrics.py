@@ -0,0 +1,104 @@
+"""
+Prometheus metrics: per-stage latency histograms, event counters, and the stats components already keep
+"""
+import time
+from contextlib import contextmanager
+
+from prometheus_client import REGISTRY, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from rate_limit import limiters
+
+# Seconds; LLM calls and retried upstream calls can take tens of seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+EVENTS = Counter(
+    "second_brain_events", "Slack events received, by type and what happened to them", ["type", "outcome"],
+)
+STAGE_SECONDS = Histogram(
+    "second_brain_stage_seconds", "Time spent in each stage of handling an event", ["stage"], buckets=BUCKETS,
+)
+STAGE_ERRORS = Counter(
+    "second_brain_stage_errors", "Stages that ended with an exception", ["stage"],
+)
+LLM_SECONDS = Histogram(
+    "second_brain_llm_seconds", "LLM call latency per method (cached=true when served from the response cache)",
+    ["method", "cached"], buckets=BUCKETS,
+)
+
+# Stages, roughly in the order an auto-capture passes through them
+STAGES = (
+    "delivery",      # Message posted -> event received (Slack's clock vs ours)
+    "receive",       # Event handler, up to handing the job off
+    "dedup",         # Dedup store check
+    "queue_wait",    # Waiting for a worker
+    "user_lookup",   # User name (cache or users.info)
+    "notion_write",  # pages.create / pages.update, including rate limiting and retries
+    "slack_reply",   # chat.postMessage / chat.update, including rate limiting and retries
+    "job",           # Whole job on the worker, from routing to the last reply
+)
+for _stage in STAGES:
+    STAGE_SECONDS.labels(_stage)
+
+
+@contextmanager
+def timed(stage: str):
+    """Observe the duration of the block under `stage`, counting it as an error if it raises"""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+def observe_delivery(event: dict):
+    """Record how long after it was posted an event reached us"""
+    try:
+        STAGE_SECONDS.labels("delivery").observe(max(0.0, time.time() - float(event["ts"])))
+    except (KeyError, TypeError, ValueError):
+        pass
+
+
+class StatsCollector:
+    """Exposes counters that components already keep (rate limiters, caches, queues) at scrape time"""
+    def __init__(self):
+        self._sources = {}
+
+    def register(self, name: str, stats, gauges=(), labels: dict = None):
+        """Publish the numeric values of `stats()` as second_brain_<name>_<key>; keys in `gauges` can go down"""
+        labels = labels or {}
+        self._sources[(name, tuple(sorted(labels.items())))] = (name, stats, set(gauges), labels)
+
+    def collect(self):
+        families = {}
+        for name, stats, gauges, labels in list(self._sources.values()):
+            try:
+                values = stats()
+            except Exception as e:
+                print(f"   ⚠️  Could not collect {name} metrics: {e}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                metric = f"second_brain_{name}_{key}"
+                if metric not in families:
+                    kind = GaugeMetricFamily if key in gauges else CounterMetricFamily
+                    families[metric] = kind(metric, f"{name} {key.replace('_', ' ')}", labels=list(labels))
+                families[metric].add_metric(list(labels.values()), value)
+        return list(families.values())
+
+
+collector = StatsCollector()
+REGISTRY.register(collector)
+register = collector.register
+
+for _name, _limiter in limiters.items():
+    register("upstream", _limiter.stats, labels={"upstream": _name})
+
+
+def exposition() -> tuple:
+    """(body, content type) for a /metrics response"""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,192 @@
+"""
+Local SQLite FTS5 index of Second Brain notes for fast keyword retrieval
+"""
+import os
+import re
+import sqlite3
+import threading
+
+from config import NOTE_INDEX_PATH
+
+# Common question words that would otherwise match almost every note
+STOPWORDS = {
+    "a", "an", "and", "are", "about", "did", "do", "does", "for", "from", "have", "how",
+    "i", "in", "is", "it", "me", "my", "of", "on", "or", "the", "to", "was", "what",
+    "when", "where", "which", "who", "why", "with", "you",
+}
+
+
+def build_match_query(text: str) -> str:
+    """Turn free text into an FTS5 MATCH expression (OR of quoted terms)"""
+    terms = [t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS]
+    if not terms:
+        terms = re.findall(r"\w+", text.lower())
+    return " OR ".join(f'"{t}"' for t in dict.fromkeys(terms))
+
+
+# Set once a full sync pass has completed; until then the mirror may hold only part of the database
+SYNCED_KEY = "initial_sync_complete"
+
+
+class NoteIndex:
+    def __init__(self, path: str = NOTE_INDEX_PATH):
+        self.path = path
+        self._synced = False
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS notes (
+                    page_id TEXT PRIMARY KEY,
+                    title TEXT NOT NULL DEFAULT '',
+                    body TEXT NOT NULL DEFAULT '',
+                    tags TEXT NOT NULL DEFAULT '',
+                    created TEXT,
+                    last_edited_time TEXT
+                )""")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                )""")
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+                    page_id UNINDEXED, title, body, tags, tokenize='porter unicode61'
+                )""")
+
+    def upsert(self, page_id: str, title: str, body: str = "", tags: list = None,
+               created: str = None, last_edited_time: str = None):
+        """Insert or replace a note in the index"""
+        tags_str = ", ".join(tags or [])
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO notes (page_id, title, body, tags, created, last_edited_time) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (page_id, title or "", body or "", tags_str, created, last_edited_time),
+            )
+            self.conn.execute("DELETE FROM notes_fts WHERE page_id = ?", (page_id,))
+            self.conn.execute(
+                "INSERT INTO notes_fts (page_id, title, body, tags) VALUES (?, ?, ?, ?)",
+                (page_id, title or "", body or "", tags_str),
+            )
+
+    def update(self, page_id: str, title: str = None, tags: list = None,
+               append_body: str = None, last_edited_time: str = None):
+        """Patch fields of an indexed note (no-op if the note isn't indexed)"""
+        note = self.get(page_id)
+        if not note:
+            return
+        body = note["body"]
+        if append_body:
+            body = f"{body}\n{append_body}" if body else append_body
+        self.upsert(
+            page_id,
+            title=title if title is not None else note["title"],
+            body=body,
+            tags=tags if tags is not None else note["tags"],
+            created=note["created"],
+            last_edited_time=last_edited_time or note["last_edited_time"],
+        )
+
+    def delete(self, page_id: str):
+        """Remove a note from the index"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM notes WHERE page_id = ?", (page_id,))
+            self.conn.execute("DELETE FROM notes_fts WHERE page_id = ?", (page_id,))
+
+    def get(self, page_id: str):
+        """Get an indexed note by page ID"""
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM notes WHERE page_id = ?", (page_id,)).fetchone()
+        return self._row_to_note(row) if row else None
+
+    def last_edited(self, page_id: str):
+        """Get the last_edited_time recorded for a page, or None if not indexed"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT last_edited_time FROM notes WHERE page_id = ?", (page_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def search(self, query: str, limit: int = 5) -> list:
+        """BM25-ranked keyword search over titles, bodies and tags"""
+        match = build_match_query(query)
+        if not match:
+            return []
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT n.*, bm25(notes_fts, 0.0, 5.0, 1.0, 2.0) AS score "
+                "FROM notes_fts JOIN notes n ON n.page_id = notes_fts.page_id "
+                "WHERE notes_fts MATCH ? ORDER BY score LIMIT ?",
+                (match, limit),
+            ).fetchall()
+        results = []
+        for row in rows:
+            note = self._row_to_note(row)
+            note["score"] = -row["score"]  # bm25() is lower-is-better
+            results.append(note)
+        return results
+
+    def recent(self, limit: int = 10) -> list:
+        """Most recently created notes"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT * FROM notes ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._row_to_note(row) for row in rows]
+
+    def tagged_notes(self) -> list:
+        """Every note that has at least one tag"""
+        with self._lock:
+            rows = self.conn.execute("SELECT * FROM notes WHERE tags != ''").fetchall()
+        return [self._row_to_note(row) for row in rows]
+
+    def get_state(self, key: str, default: str = None):
+        """Read a persisted sync value (e.g. a cursor)"""
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_state(self, key: str, value: str):
+        """Persist a sync value"""
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value))
+
+    def synced(self) -> bool:
+        """Whether the mirror holds the whole database (a full sync pass has completed)"""
+        if not self._synced:
+            self._synced = self.get_state(SYNCED_KEY) == "1"
+        return self._synced
+
+    def mark_synced(self):
+        """Record that a full sync pass has completed"""
+        self.set_state(SYNCED_KEY, "1")
+        self._synced = True
+
+    def count(self) -> int:
+        """Number of indexed notes"""
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def page_ids(self) -> set:
+        """IDs of every indexed note"""
+        with self._lock:
+            return {row[0] for row in self.conn.execute("SELECT page_id FROM notes")}
+
+    def close(self):
+        self.conn.close()
+
+    @staticmethod
+    def _row_to_note(row) -> dict:
+        return {
+            "page_id": row["page_id"],
+            "title": row["title"],
+            "body": row["body"],
+            "tags": [t.strip() for t in row["tags"].split(",") if t.strip()],
+            "created": row["created"],
+            "last_edited_time": row["last_edited_time"],
+        }
@@ -1,78 +1,258 @@
 """
 Notion API wrapper for Second Brain operations
 """
-from notion_client import Client
-from config import NOTION_API_KEY, NOTION_DATABASE_ID
-from datetime import datetime
+import asyncio
+import threading
+from notion_client import AsyncClient, Client
+from notion_client.helpers import async_collect_paginated_api, async_iterate_paginated_api, iterate_paginated_api
+from config import NOTION_API_KEY, NOTION_DATABASE_ID, NOTION_BASE_URL, NOTION_TIMEOUT
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from note_index import NoteIndex
+from embeddings import VectorIndex, get_embedder
+from block_fetcher import BlockFetcher
+from rate_limit import limiters
+from metrics import timed
+from tracing import span, traced
+from transport import http_client, async_http_client
+from local_executor import run_local
 
 
+_UNBUILT = object()
+
+
+def page_title(page: dict, default: str = "") -> str:
+    """Extract the plain-text title from a Notion page"""
+    title = page.get("properties", {}).get("Name", {}).get("title", [])
+    return "".join(t.get("plain_text") or t.get("text", {}).get("content", "") for t in title) or default
+
+
+def page_tags(page: dict) -> list:
+    """Extract tag names from a Notion page"""
+    tags = page.get("properties", {}).get("Tags", {}).get("multi_select", [])
+    return [t.get("name", "") for t in tags if t.get("name")]
+
+
+def blocks_to_text(blocks: list) -> str:
+    """Flatten Notion blocks into plain text, one line per block"""
+    lines = []
+    for block in blocks:
+        rich_text = block.get(block.get("type", ""), {}).get("rich_text", [])
+        text = "".join(t.get("plain_text") or t.get("text", {}).get("content", "") for t in rich_text)
+        if text:
+            lines.append(text)
+    return "\n".join(lines)
+
+
+def paragraph_block(content: str) -> dict:
+    """A Notion paragraph block containing plain text"""
+    return {
+        "object": "block",
+        "type": "paragraph",
+        "paragraph": {
+            "rich_text": [{"type": "text", "text": {"content": content}}]
+        }
+    }
+
+
+def build_note(title: str, content: str, tags: list = None, source: str = "manual", follow_up_date: str = None,
+               created: str = None):
+    """Properties and child blocks for a new note page (`created` defaults to now)"""
+    properties = {
+        "Name": {"title": [{"text": {"content": title}}]},
+        "Source": {"select": {"name": source}},
+        "Created": {"date": {"start": created or datetime.now().isoformat()}},
+    }
+    
+    if tags:
+        properties["Tags"] = {"multi_select": [{"name": tag} for tag in tags]}
+    
+    # Only add Follow up if date provided (exact name from Notion: lowercase 'u')
+    if follow_up_date:
+        properties["Follow up"] = {"date": {"start": follow_up_date}}
+
+    # Create page with content
+    return properties, [paragraph_block(content)]
+
+
+def enrichment_properties(title: str, tags: list = None, follow_up_date: str = None) -> dict:
+    """Properties that AI enrichment patches onto an already-saved note"""
+    properties = {"Name": {"title": [{"text": {"content": title}}]}}
+    if tags:
+        properties["Tags"] = {"multi_select": [{"name": tag} for tag in tags]}
+    if follow_up_date:
+        properties["Follow up"] = {"date": {"start": follow_up_date}}
+    return properties
+
+
+def _as_utc(timestamp: str) -> datetime:
+    """Parse an ISO timestamp, taking one without an offset to be UTC"""
+    moment = datetime.fromisoformat(timestamp)
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def note_text(title: str, body: str) -> str:
+    """Text used to embed a note"""
+    return f"{title}\n{body}".strip()
+
+
+def digest_text(title: str, body: str, max_body: int = 300) -> str:
+    """Title plus the start of the body, for prompts that cover many notes"""
+    body = " ".join((body or "").split())
+    if len(body) > max_body:
+        body = body[:max_body].rsplit(" ", 1)[0] + "..."
+    return f"{title}: {body}" if body else title
+
+
+def note_filter(title: str, created: str) -> dict:
+    """Query filter for the pages find_note() picks from"""
+    moment = _as_utc(created)
+    return {"and": [
+        {"property": "Name", "title": {"equals": title}},
+        {"property": "Created", "date": {"on_or_after": (moment - timedelta(minutes=1)).isoformat()}},
+    ]}
+
+
+def is_note(page: dict, title: str, created: str) -> bool:
+    """Whether a page is the note with this title created within a minute of `created`"""
+    start = page.get("properties", {}).get("Created", {}).get("date", {}).get("start")
+    # Notion may store the date at coarser precision than we sent it
+    return page_title(page) == title and bool(start) and abs((_as_utc(start) - _as_utc(created)).total_seconds()) < 60
+
+
+def _idempotent(path: str, method: str) -> bool:
+    """Reads: GETs, and the POSTs that query or search. Writes (creating a page, appending blocks) aren't retried
+    after a timeout or 5xx, which may come after the write landed; the outbox retries them once it has checked"""
+    return method.upper() == "GET" or path == "search" or path.endswith("/query")
+
+
+class RateLimitedClient(Client):
+    """Notion client whose every request goes through the shared Notion rate limiter"""
+    def request(self, path: str, method: str, *args, **kwargs):
+        with span(f"notion {method} {path.split('/')[0]}", upstream="notion"):
+            return limiters["notion"].call(super().request, path, method, *args,
+                                           idempotent=_idempotent(path, method), **kwargs)
+
+
+@traced
 class NotionBrain:
-    def __init__(self):
-        self.client = Client(auth=NOTION_API_KEY)
+    def __init__(self, index: NoteIndex = None, vectors: VectorIndex = None, blocks: BlockFetcher = None):
+        self.client = RateLimitedClient(auth=NOTION_API_KEY, base_url=NOTION_BASE_URL, client=http_client("notion"),
+                                        timeout_ms=int(NOTION_TIMEOUT * 1000))
         self.database_id = NOTION_DATABASE_ID
+        self.index = index if index is not None else NoteIndex()
+        self.blocks = blocks if blocks is not None else BlockFetcher(self.client)
+        self._vectors = vectors if vectors is not None else _UNBUILT
+        self._vectors_lock = threading.Lock()
+        # Notes written since the last embed_pending(), embedded by the sync thread rather than on the write path
+        self._unembedded = set()
+
+    @property
+    def vectors(self):
+        """The semantic index, built on first use; None when no embedder is configured (keyword-only retrieval)"""
+        if self._vectors is _UNBUILT:
+            with self._vectors_lock:
+                if self._vectors is _UNBUILT:
+                    embedder = get_embedder()
+                    self._vectors = VectorIndex(embedder) if embedder is not None else None
+        return self._vectors
 
-    def add_note(self, title: str, content: str, tags: list = None, source: str = "manual", follow_up_date: str = None):
+    def add_note(self, title: str, content: str, tags: list = None, source: str = "manual", follow_up_date: str = None,
+                 created: str = None):
         """Add a new note/thought to the Second Brain"""
-        properties = {
-            "Name": {"title": [{"text": {"content": title}}]},
-            "Source": {"select": {"name": source}},
-            "Created": {"date": {"start": datetime.now().isoformat()}},
-        }
-        
-        if tags:
-            properties["Tags"] = {"multi_select": [{"name": tag} for tag in tags]}
-        
-        # Only add Follow up if date provided (exact name from Notion: lowercase 'u')
-        if follow_up_date:
-            properties["Follow up"] = {"date": {"start": follow_up_date}}
-
-        # Create page with content
-        children = [
-            {
-                "object": "block",
-                "type": "paragraph",
-                "paragraph": {
-                    "rich_text": [{"type": "text", "text": {"content": content}}]
-                }
-            }
-        ]
+        properties, children = build_note(title, content, tags, source, follow_up_date, created)
 
-        try:
-            response = self.client.pages.create(
-                parent={"database_id": self.database_id},
-                properties=properties,
-                children=children
-            )
-            return response
-        except Exception as e:
-            # If Follow up field doesn't exist, try without it
-            if "Follow up" in str(e) and "Follow up" in properties:
-                print(f"   ⚠️  Follow up field not found in Notion, saving without it...")
-                properties.pop("Follow up", None)
+        with timed("notion_write"):
+            try:
                 response = self.client.pages.create(
                     parent={"database_id": self.database_id},
                     properties=properties,
                     children=children
                 )
-                return response
-            else:
-                raise  # Re-raise if it's a different error
+            except Exception as e:
+                # If Follow up field doesn't exist, try without it
+                if "Follow up" in str(e) and "Follow up" in properties:
+                    print(f"   ⚠️  Follow up field not found in Notion, saving without it...")
+                    properties.pop("Follow up", None)
+                    response = self.client.pages.create(
+                        parent={"database_id": self.database_id},
+                        properties=properties,
+                        children=children
+                    )
+                else:
+                    raise  # Re-raise if it's a different error
+
+        self._index_note(response, title=title, body=content, tags=tags)
+        return response
+
+    def _index_note(self, page: dict, title: str = None, body: str = "", tags: list = None):
+        """Keep the local search indexes in step with a page we just wrote"""
+        title = title if title is not None else page_title(page)
+        try:
+            self.index.upsert(
+                page["id"],
+                title=title,
+                body=body,
+                tags=tags if tags is not None else page_tags(page),
+                created=page.get("created_time"),
+                last_edited_time=page.get("last_edited_time"),
+            )
+        except Exception as e:
+            print(f"   ⚠️  Local index update failed: {e}")
+        self._queue_embed(page["id"])
+
+    def _queue_embed(self, page_id: str):
+        """Leave (re-)embedding a note to embed_pending() on the sync thread"""
+        with self._vectors_lock:
+            self._unembedded.add(page_id)
+
+    def embed_pending(self, batch_size: int = 64) -> int:
+        """Embed the notes written since the last call from their indexed text; returns how many were embedded"""
+        vectors = self.vectors
+        with self._vectors_lock:
+            page_ids, self._unembedded = self._unembedded, set()
+        if vectors is None or not page_ids:
+            return 0
+        items = []
+        for page_id in page_ids:
+            note = self.index.get(page_id)
+            if note:
+                items.append((page_id, note_text(note["title"], note["body"])))
+        try:
+            for i in range(0, len(items), batch_size):
+                vectors.add_many(items[i:i + batch_size])
+        except Exception as e:
+            with self._vectors_lock:
+                self._unembedded.update(page_ids)
+            print(f"   ⚠️  Vector index update failed (retrying next sync): {e}")
+            return 0
+        vectors.save()
+        return len(items)
+
+    def iter_notes(self, filter: dict = None, sorts: list = None, page_size: int = 100):
+        """Lazily yield every database page matching `filter`, following start_cursor pagination"""
+        kwargs = {"data_source_id": self.data_source_id, "page_size": min(page_size, 100)}
+        if filter:
+            kwargs["filter"] = filter
+        if sorts:
+            kwargs["sorts"] = sorts
+        yield from iterate_paginated_api(self.client.data_sources.query, **kwargs)
 
     def query_notes(self, filter_dict: dict = None, limit: int = 10):
-        """Query notes from the Second Brain database"""
-        # Use search to get pages from the database
-        results = self.client.search(
-            query="",
-            filter={"property": "object", "value": "page"},
-            page_size=limit * 2  # Get more to filter
+        """Query notes from the Second Brain database, newest first"""
+        notes = self.iter_notes(
+            filter=filter_dict,
+            sorts=[{"property": "Created", "direction": "descending"}],
+            page_size=limit,
         )
-        # Filter to only pages in our database (compare without dashes)
-        db_id_no_dashes = self.database_id.replace("-", "")
-        db_pages = [
-            page for page in results.get("results", [])
-            if page.get("parent", {}).get("database_id", "").replace("-", "") == db_id_no_dashes
-        ]
-        return db_pages[:limit]
+        return list(islice(notes, limit))
+
+    def find_note(self, title: str, created: str):
+        """The page with this title whose Created date is within a minute of `created` (None if there isn't one)"""
+        for page in self.iter_notes(filter=note_filter(title, created), page_size=10):
+            if is_note(page, title, created):
+                return page
+        return None
 
     def search_notes(self, query: str):
         """Search for notes containing specific text"""
@@ -82,34 +262,298 @@ class NotionBrain:
         )
         return response.get("results", [])
 
-    def get_page_content(self, page_id: str):
-        """Get the full content of a page"""
-        blocks = self.client.blocks.children.list(block_id=page_id)
-        return blocks.get("results", [])
+    def search_index(self, query: str, limit: int = 5) -> list:
+        """BM25-ranked search of the local note index (no Notion round-trip)"""
+        return self.index.search(query, limit=limit)
+
+    def search_vectors(self, query: str, limit: int = 5) -> list:
+        """Semantic (cosine) search of the local vector index; returns (page_id, score) pairs"""
+        if self.vectors is None:
+            return []
+        return self.vectors.search(query, limit=limit)
+
+    def find_notes(self, query: str, limit: int = 5) -> list:
+        """Find notes relevant to a query, falling back to Notion search until the first full sync"""
+        notes = self.find_local_notes(query, limit)
+        if notes is not None:
+            return notes
+        return self.with_bodies([
+            self._page_to_note(page) for page in self.search_notes(query)[:limit] if page_title(page)
+        ])
+
+    def find_local_notes(self, query: str, limit: int = 5):
+        """Notes relevant to a query, ranked from the local mirror; None until the first full sync has filled it"""
+        if self.index.synced():
+            keyword = [note["page_id"] for note in self.search_index(query, limit=limit * 2)]
+            try:
+                semantic = [page_id for page_id, score in self.search_vectors(query, limit=limit * 2) if score > 0]
+            except Exception as e:
+                print(f"   ⚠️  Semantic search failed (using keyword only): {e}")
+                semantic = []
+
+            # Reciprocal rank fusion of keyword and semantic rankings
+            scores = {}
+            for ranking in (keyword, semantic):
+                for rank, page_id in enumerate(ranking):
+                    scores[page_id] = scores.get(page_id, 0.0) + 1.0 / (60 + rank)
+            notes = []
+            for page_id in sorted(scores, key=scores.get, reverse=True):
+                note = self.index.get(page_id)
+                if note:
+                    note["score"] = scores[page_id]
+                    notes.append(note)
+                if len(notes) == limit:
+                    break
+            return notes
+        return None
+
+    def find_recent_notes(self, limit: int = 10) -> list:
+        """Most recently created notes from the local mirror, falling back to Notion until the first full sync"""
+        notes = self.find_local_recent_notes(limit)
+        if notes is not None:
+            return notes
+        return self.with_bodies([self._page_to_note(page) for page in self.get_recent_notes(limit=limit)])
+
+    def find_local_recent_notes(self, limit: int = 10):
+        """Most recently created notes from the local mirror; None until the first full sync has filled it"""
+        return self.index.recent(limit=limit) if self.index.synced() else None
+
+    def with_bodies(self, notes: list) -> list:
+        """Fill in missing note bodies, fetching the pages' blocks concurrently"""
+        missing = [(note["page_id"], note.get("last_edited_time")) for note in notes if not note.get("body")]
+        if missing:
+            blocks = self.blocks.fetch_many(missing)
+            for note in notes:
+                if note["page_id"] in blocks:
+                    note["body"] = blocks_to_text(blocks[note["page_id"]])
+        return notes
+
+    @staticmethod
+    def _page_to_note(page: dict) -> dict:
+        """A Notion page in the same shape as a local index note (body not yet fetched)"""
+        return {
+            "page_id": page["id"],
+            "title": page_title(page),
+            "body": "",
+            "tags": page_tags(page),
+            "created": page.get("created_time"),
+            "last_edited_time": page.get("last_edited_time"),
+        }
+
+    @property
+    def data_source_id(self) -> str:
+        """ID of the database's (first) data source, which is what Notion queries run against"""
+        if not getattr(self, "_data_source_id", None):
+            database = self.client.databases.retrieve(database_id=self.database_id)
+            self._data_source_id = database["data_sources"][0]["id"]
+        return self._data_source_id
+
+    def iter_changed_pages(self, since: str = None, page_size: int = 100):
+        """Yield database pages edited at or after `since` (ISO timestamp), oldest edit first"""
+        yield from self.iter_notes(
+            filter={"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": since}} if since else None,
+            sorts=[{"timestamp": "last_edited_time", "direction": "ascending"}],
+            page_size=page_size,
+        )
+
+    def get_page_content(self, page_id: str, last_edited_time: str = None):
+        """Get the full content of a page (every block, cached per last_edited_time)"""
+        return self.blocks.fetch(page_id, last_edited_time)
 
     def update_note(self, page_id: str, properties: dict = None, content: str = None):
         """Update an existing note"""
+        page = None
         if properties:
-            self.client.pages.update(page_id=page_id, properties=properties)
+            page = self.client.pages.update(page_id=page_id, properties=properties)
         
         if content:
             # Append new content block
-            self.client.blocks.children.append(
-                block_id=page_id,
-                children=[{
-                    "object": "block",
-                    "type": "paragraph",
-                    "paragraph": {
-                        "rich_text": [{"type": "text", "text": {"content": content}}]
-                    }
-                }]
-            )
+            self.client.blocks.children.append(block_id=page_id, children=[paragraph_block(content)])
+        
+        self._index_update(page_id, page=page, content=content)
+
+    def _index_update(self, page_id: str, page: dict = None, content: str = None):
+        """Apply an update_note change to the local search indexes"""
+        if page:
+            self.index.update(page_id, title=page_title(page), tags=page_tags(page),
+                              last_edited_time=page.get("last_edited_time"))
+        if content:
+            self.index.update(page_id, append_body=content)
+        if page or content:
+            self._queue_embed(page_id)
+
+    def enrich_note(self, page_id: str, title: str, tags: list = None, follow_up_date: str = None):
+        """Patch a previously saved note with AI-generated title, tags and follow-up date"""
+        properties = enrichment_properties(title, tags, follow_up_date)
+        
+        with timed("notion_write"):
+            try:
+                self.update_note(page_id, properties=properties)
+            except Exception as e:
+                # If Follow up field doesn't exist, try without it
+                if "Follow up" in str(e) and "Follow up" in properties:
+                    print(f"   ⚠️  Follow up field not found in Notion, saving without it...")
+                    properties.pop("Follow up", None)
+                    self.update_note(page_id, properties=properties)
+                else:
+                    raise
 
     def get_recent_notes(self, limit: int = 5):
         """Get most recent notes"""
         return self.query_notes(filter_dict=None, limit=limit)
 
 
+class AsyncRateLimitedClient(AsyncClient):
+    """Async Notion client sharing the process-wide Notion rate limiter"""
+    async def request(self, path: str, method: str, *args, **kwargs):
+        with span(f"notion {method} {path.split('/')[0]}", upstream="notion"):
+            return await limiters["notion"].call_async(super().request, path, method, *args,
+                                                       idempotent=_idempotent(path, method), **kwargs)
+
+
+@traced
+class AsyncNotionBrain:
+    """asyncio counterpart of NotionBrain: Notion calls go through the async client, and the local index, block cache
+    and search it shares with a NotionBrain run on the local executor"""
+    def __init__(self, brain: NotionBrain = None):
+        self.client = AsyncRateLimitedClient(auth=NOTION_API_KEY, base_url=NOTION_BASE_URL,
+                                             client=async_http_client("notion"), timeout_ms=int(NOTION_TIMEOUT * 1000))
+        self.brain = brain if brain is not None else NotionBrain()
+        self.database_id = self.brain.database_id
+        self.index = self.brain.index
+
+    async def add_note(self, title: str, content: str, tags: list = None, source: str = "manual", follow_up_date: str = None,
+                       created: str = None):
+        """Add a new note/thought to the Second Brain"""
+        properties, children = build_note(title, content, tags, source, follow_up_date, created)
+
+        with timed("notion_write"):
+            try:
+                response = await self.client.pages.create(
+                    parent={"database_id": self.database_id},
+                    properties=properties,
+                    children=children
+                )
+            except Exception as e:
+                # If Follow up field doesn't exist, try without it
+                if "Follow up" in str(e) and "Follow up" in properties:
+                    print(f"   ⚠️  Follow up field not found in Notion, saving without it...")
+                    properties.pop("Follow up", None)
+                    response = await self.client.pages.create(
+                        parent={"database_id": self.database_id},
+                        properties=properties,
+                        children=children
+                    )
+                else:
+                    raise
+
+        await run_local(self.brain._index_note, response, title=title, body=content, tags=tags)
+        return response
+
+    async def update_note(self, page_id: str, properties: dict = None, content: str = None):
+        """Update an existing note"""
+        page = None
+        if properties:
+            page = await self.client.pages.update(page_id=page_id, properties=properties)
+        if content:
+            await self.client.blocks.children.append(block_id=page_id, children=[paragraph_block(content)])
+        await run_local(self.brain._index_update, page_id, page=page, content=content)
+
+    async def enrich_note(self, page_id: str, title: str, tags: list = None, follow_up_date: str = None):
+        """Patch a previously saved note with AI-generated title, tags and follow-up date"""
+        properties = enrichment_properties(title, tags, follow_up_date)
+        with timed("notion_write"):
+            try:
+                await self.update_note(page_id, properties=properties)
+            except Exception as e:
+                if "Follow up" in str(e) and "Follow up" in properties:
+                    print(f"   ⚠️  Follow up field not found in Notion, saving without it...")
+                    properties.pop("Follow up", None)
+                    await self.update_note(page_id, properties=properties)
+                else:
+                    raise
+
+    async def iter_notes(self, filter: dict = None, sorts: list = None, page_size: int = 100):
+        """Lazily yield every database page matching `filter` (see NotionBrain.iter_notes)"""
+        kwargs = {"data_source_id": await self.data_source_id(), "page_size": min(page_size, 100)}
+        if filter:
+            kwargs["filter"] = filter
+        if sorts:
+            kwargs["sorts"] = sorts
+        async for page in async_iterate_paginated_api(self.client.data_sources.query, **kwargs):
+            yield page
+
+    async def data_source_id(self) -> str:
+        """ID of the database's (first) data source, cached on the NotionBrain"""
+        if not getattr(self.brain, "_data_source_id", None):
+            database = await self.client.databases.retrieve(database_id=self.database_id)
+            self.brain._data_source_id = database["data_sources"][0]["id"]
+        return self.brain._data_source_id
+
+    async def get_page_content(self, page_id: str, last_edited_time: str = None):
+        """Get the full content of a page (every block, cached per last_edited_time)"""
+        blocks = self.brain.blocks
+        if last_edited_time:
+            cached = await run_local(blocks.cache.get, page_id, last_edited_time)
+            if cached is not None:
+                blocks.hits += 1
+                return cached
+        blocks.misses += 1
+        content = await async_collect_paginated_api(self.client.blocks.children.list, block_id=page_id, page_size=100)
+        if last_edited_time:
+            await run_local(blocks.cache.set, page_id, last_edited_time, content)
+        return content
+
+    async def with_bodies(self, notes: list) -> list:
+        """Fill in missing note bodies, fetching the pages' blocks concurrently"""
+        missing = [note for note in notes if not note.get("body")]
+        fetched = await asyncio.gather(*(self.get_page_content(note["page_id"], note.get("last_edited_time"))
+                                         for note in missing), return_exceptions=True)
+        for note, blocks in zip(missing, fetched):
+            if isinstance(blocks, Exception):
+                print(f"   ⚠️  Could not fetch blocks for {note['page_id']}: {blocks}")
+            else:
+                note["body"] = blocks_to_text(blocks)
+        return notes
+
+    async def find_note(self, title: str, created: str):
+        """The page with this title and Created date (see NotionBrain.find_note)"""
+        async for page in self.iter_notes(filter=note_filter(title, created), page_size=10):
+            if is_note(page, title, created):
+                return page
+        return None
+
+    async def search_notes(self, query: str):
+        """Search for notes containing specific text"""
+        response = await self.client.search(query=query, filter={"property": "object", "value": "page"})
+        return response.get("results", [])
+
+    async def get_recent_notes(self, limit: int = 5):
+        """Get most recent notes"""
+        notes = []
+        async for page in self.iter_notes(sorts=[{"property": "Created", "direction": "descending"}],
+                                          page_size=limit):
+            notes.append(page)
+            if len(notes) == limit:
+                break
+        return notes
+
+    async def find_notes(self, query: str, limit: int = 5) -> list:
+        """Find notes relevant to a query, falling back to Notion search until the first full sync"""
+        notes = await run_local(self.brain.find_local_notes, query, limit)
+        if notes is not None:
+            return notes
+        return await self.with_bodies([
+            self.brain._page_to_note(page) for page in (await self.search_notes(query))[:limit] if page_title(page)
+        ])
+
+    async def find_recent_notes(self, limit: int = 10) -> list:
+        """Most recently created notes from the local mirror, falling back to Notion until the first full sync"""
+        notes = await run_local(self.brain.find_local_recent_notes, limit)
+        if notes is not None:
+            return notes
+        return await self.with_bodies([self.brain._page_to_note(page) for page in await self.get_recent_notes(limit)])
+
 if __name__ == "__main__":
     # Test connection
     brain = NotionBrain()
@@ -0,0 +1,135 @@
+"""
+Incremental Notion sync: keeps the local note mirror current using last_edited_time cursors
+"""
+import threading
+import time
+
+from config import SYNC_INTERVAL, SYNC_RECONCILE_EVERY
+from notion_client_wrapper import blocks_to_text, note_text, page_tags, page_title
+
+CURSOR_KEY = "last_edited_cursor"
+
+
+class NotionSync:
+    def __init__(self, brain, interval: float = SYNC_INTERVAL, reconcile_every: int = SYNC_RECONCILE_EVERY,
+                 embed_batch_size: int = 64):
+        self.brain = brain
+        self.index = brain.index
+        self.interval = interval
+        self.reconcile_every = reconcile_every
+        self.embed_batch_size = embed_batch_size
+        self.ticks = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def vectors(self):
+        """The brain's vector index (None when retrieval is keyword-only)"""
+        return self.brain.vectors
+
+    def tick(self) -> int:
+        """Fetch pages edited since the stored cursor into the mirror; returns the number changed"""
+        cursor = self.index.get_state(CURSOR_KEY)
+        changed = 0
+        pending = []
+
+        for page in self.brain.iter_changed_pages(since=cursor):
+            edited = page.get("last_edited_time")
+            if page.get("in_trash") or page.get("archived"):
+                self.index.delete(page["id"])
+                if self.vectors is not None:
+                    self.vectors.remove(page["id"])
+                self.brain.blocks.cache.delete(page["id"])
+                changed += 1
+            # Cursor filters are inclusive (and minute-granular), so skip pages we already have
+            elif self.index.last_edited(page["id"]) != edited:
+                pending.append(page)
+                changed += 1
+
+            if edited and (cursor is None or edited > cursor):
+                cursor = edited
+            if len(pending) >= self.embed_batch_size:
+                self._flush(pending, cursor)
+                pending = []
+
+        self._flush(pending, cursor)
+        # Every page edited up to now is mirrored (ticks pick up where a failed one stopped), so searches can
+        # stop falling back to Notion
+        if not self.index.synced():
+            self.index.mark_synced()
+        # Notes the listener wrote since the last tick
+        self.brain.embed_pending(self.embed_batch_size)
+        self.ticks += 1
+        if self.reconcile_every and self.ticks % self.reconcile_every == 0:
+            self.reconcile()
+        return changed
+
+    def reconcile(self) -> int:
+        """Full listing pass that drops pages deleted in Notion and embeds any the vector index missed"""
+        seen = set()
+        missing = []
+        vectors = self.vectors
+        for page in self.brain.iter_changed_pages():
+            seen.add(page["id"])
+            if vectors is not None and page["id"] not in vectors:
+                note = self.index.get(page["id"])
+                if note:
+                    missing.append((page["id"], note_text(note["title"], note["body"])))
+
+        for i in range(0, len(missing), self.embed_batch_size):
+            vectors.add_many(missing[i:i + self.embed_batch_size])
+
+        removed = self.index.page_ids() - seen
+        for page_id in removed:
+            self.index.delete(page_id)
+            if vectors is not None:
+                vectors.remove(page_id)
+        if vectors is not None:
+            vectors.save()
+        return len(removed)
+
+    def _flush(self, pages: list, cursor: str):
+        """Fetch bodies for a batch of changed pages concurrently, index and embed them, then advance the cursor"""
+        bodies = self.brain.blocks.fetch_many([(page["id"], page.get("last_edited_time")) for page in pages])
+        to_embed = []
+        for page in pages:
+            if page["id"] not in bodies:
+                continue
+            title = page_title(page)
+            body = blocks_to_text(bodies[page["id"]])
+            self.index.upsert(
+                page["id"], title=title, body=body, tags=page_tags(page),
+                created=page.get("created_time"), last_edited_time=page.get("last_edited_time"),
+            )
+            to_embed.append((page["id"], note_text(title, body)))
+
+        if to_embed and self.vectors is not None:
+            self.vectors.add_many(to_embed)
+            self.vectors.save()
+        # Leave the cursor where it was so pages whose blocks failed to fetch are retried next tick
+        if len(to_embed) < len(pages):
+            raise RuntimeError(f"{len(pages) - len(to_embed)} pages could not be fetched")
+        if cursor:
+            self.index.set_state(CURSOR_KEY, cursor)
+
+    def start(self):
+        """Run tick() every `interval` seconds on a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="notion-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                changed = self.tick()
+                if changed:
+                    print(f"🔄 Synced {changed} changed notes ({self.index.count()} in mirror)")
+            except Exception as e:
+                print(f"⚠️  Notion sync failed: {e}")
+            self._stop.wait(max(0.0, self.interval - (time.time() - started)))
@@ -0,0 +1,408 @@
+"""
+Durable capture outbox: every accepted capture is written to local SQLite before it goes to Notion, and
+retried from there until Notion has it, so an outage or a restart mid-capture doesn't lose the message
+Admin: python outbox.py list --state failed
+       python outbox.py retry --id 42
+       python outbox.py purge --state done
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from commands import fallback_title
+from config import (
+    OUTBOX_PATH, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETRY_BASE, OUTBOX_RETRY_MAX, OUTBOX_DRAIN_INTERVAL, OUTBOX_LEASE,
+    OUTBOX_KEEP_DONE,
+)
+from dedup import dedup_key
+from local_executor import run_local
+
+# pending: waiting for a (first or next) attempt; sending: an attempt holds it until lease_until;
+# done: in Notion as page_id; failed: out of attempts, waiting for an admin retry or purge
+STATES = ("pending", "sending", "done", "failed")
+
+# What deliver() returns instead of a page: the write failed and the entry waits for a retry, or another attempt
+# (the drain loop, or the job for another event about the same message) holds the entry or already delivered it
+QUEUED = "queued"
+ELSEWHERE = "elsewhere"
+
+
+def created_at(ts: str = None) -> str:
+    """Notion "Created" for a capture: when the Slack message was posted (now, without one)"""
+    moment = datetime.fromtimestamp(float(ts), tz=timezone.utc) if ts else datetime.now(timezone.utc)
+    return moment.isoformat(timespec="milliseconds")
+
+
+class Outbox:
+    """SQLite (WAL) write-ahead log of captures; Notion writes are idempotent on the entry's Created date and title"""
+    def __init__(self, path: str = OUTBOX_PATH, max_attempts: int = OUTBOX_MAX_ATTEMPTS,
+                 retry_base: float = OUTBOX_RETRY_BASE, retry_max: float = OUTBOX_RETRY_MAX,
+                 lease: float = OUTBOX_LEASE, keep_done: float = OUTBOX_KEEP_DONE,
+                 interval: float = OUTBOX_DRAIN_INTERVAL):
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease = lease
+        self.keep_done = keep_done
+        self.interval = interval
+        self.delivered = 0
+        self.retried = 0
+        self.gave_up = 0
+        # Pages a retry found already in Notion (the earlier attempt landed but its response was lost)
+        self.already_written = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            # Commits survive the process being killed; only an OS crash can lose the last few
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT UNIQUE NOT NULL,
+                    content TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    channel TEXT,
+                    created TEXT NOT NULL,
+                    title TEXT,
+                    tags TEXT,
+                    follow_up TEXT,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt REAL NOT NULL,
+                    lease_until REAL,
+                    last_error TEXT,
+                    page_id TEXT,
+                    added_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )""")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (state, next_attempt)")
+            # How many Slack events recorded the entry: a mention is also delivered as a message, and both share it
+            if "events" not in {row[1] for row in self.conn.execute("PRAGMA table_info(outbox)")}:
+                self.conn.execute("ALTER TABLE outbox ADD COLUMN events INTEGER NOT NULL DEFAULT 1")
+
+    def add(self, content: str, source: str, channel: str = None, ts: str = None, replace: bool = False) -> int:
+        """Record an accepted capture; returns its entry ID (the existing one if this message is already in, in
+        which case `replace` makes this content win, as long as no job has started on the entry)"""
+        key = dedup_key(channel, ts) if ts else uuid.uuid4().hex
+        now = time.time()
+        with self._lock, self.conn:
+            # The capture job that recorded it gets first go (it claims the entry when it starts); the drain loop
+            # only steps in if the job hasn't by the time the lease is up
+            added = self.conn.execute(
+                "INSERT OR IGNORE INTO outbox (key, content, source, channel, created, state, next_attempt, "
+                "added_at, updated_at) VALUES (?, ?, ?, ?, ?, 'pending', ?, ?, ?)",
+                (key, content, source, channel, created_at(ts), now + self.lease, now, now),
+            ).rowcount
+            if not added:
+                self.conn.execute("UPDATE outbox SET events = events + 1 WHERE key = ?", (key,))
+                if replace:
+                    self.conn.execute("UPDATE outbox SET content = ?, source = ?, updated_at = ? "
+                                      "WHERE key = ? AND state = 'pending' AND attempts = 0",
+                                      (content, source, now, key))
+            return self.conn.execute("SELECT id FROM outbox WHERE key = ?", (key,)).fetchone()[0]
+
+    def release(self, entry_id: int):
+        """Leave an entry to the drain loop now (e.g. when the capture queue is full)"""
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE outbox SET next_attempt = ? WHERE id = ? AND state = 'pending'",
+                              (time.time(), entry_id))
+
+    def discard(self, entry_id: int) -> bool:
+        """Drop an entry that turned out not to be worth capturing; False if another event about the same message
+        still wants it (or a job already has it), in which case it's left to that one"""
+        with self._lock, self.conn:
+            if self.conn.execute("DELETE FROM outbox WHERE id = ? AND state = 'pending' AND events = 1",
+                                 (entry_id,)).rowcount:
+                return True
+            self.conn.execute("UPDATE outbox SET events = events - 1 WHERE id = ? AND events > 1", (entry_id,))
+            return False
+
+    def get(self, entry_id: int) -> dict:
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM outbox WHERE id = ?", (entry_id,)).fetchone()
+        return self._entry(row) if row else None
+
+    def claim(self, entry_id: int) -> dict:
+        """Take an entry for a delivery attempt; None if it's done, failed or being sent by someone else"""
+        now = time.time()
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "UPDATE outbox SET state = 'sending', lease_until = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE id = ? AND (state = 'pending' OR (state = 'sending' AND lease_until <= ?))",
+                (now + self.lease, now, entry_id, now),
+            )
+            if cursor.rowcount != 1:
+                return None
+            return self._entry(self.conn.execute("SELECT * FROM outbox WHERE id = ?", (entry_id,)).fetchone())
+
+    def renew(self, entry: dict) -> bool:
+        """Extend a claim for another lease; False if another attempt took the entry over after this one's lapsed"""
+        now = time.time()
+        if entry["lease_until"] - now > self.lease / 2:
+            # Nobody else can claim it before the lease is up, and half a lease is plenty for one Notion write
+            return True
+        with self._lock, self.conn:
+            # Every claim bumps attempts, so an unchanged count means nobody has claimed it since
+            renewed = self.conn.execute(
+                "UPDATE outbox SET lease_until = ?, updated_at = ? WHERE id = ? AND state = 'sending' AND attempts = ?",
+                (now + self.lease, now, entry["id"], entry["attempts"]),
+            ).rowcount == 1
+        if renewed:
+            entry["lease_until"] = now + self.lease
+        return renewed
+
+    def due(self, limit: int = 100) -> list:
+        """IDs of entries waiting for a retry, or whose attempt was abandoned (lease expired), oldest first"""
+        now = time.time()
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id FROM outbox WHERE (state = 'pending' AND next_attempt <= ?) "
+                "OR (state = 'sending' AND lease_until <= ?) ORDER BY id LIMIT ?", (now, now, limit),
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def _fix_note(self, entry: dict, title: str, tags: list, follow_up_date: str) -> dict:
+        # Every attempt has to send the same title: it's half of what a retry looks the page up by
+        if entry["title"] is None:
+            entry.update(title=title or fallback_title(entry["content"]), tags=tags or [], follow_up=follow_up_date)
+            with self._lock, self.conn:
+                self.conn.execute("UPDATE outbox SET title = ?, tags = ?, follow_up = ? WHERE id = ?",
+                                  (entry["title"], json.dumps(entry["tags"]), entry["follow_up"], entry["id"]))
+        return entry
+
+    @staticmethod
+    def _may_exist(entry: dict) -> bool:
+        """Whether an earlier attempt may have created the page (its outcome unknown or lost)"""
+        return entry["attempts"] > 1 or entry["last_error"] is not None
+
+    @staticmethod
+    def _note(entry: dict) -> dict:
+        return {"title": entry["title"], "content": entry["content"], "tags": entry["tags"],
+                "source": entry["source"], "follow_up_date": entry["follow_up"], "created": entry["created"]}
+
+    def complete(self, entry_id: int, page_id: str):
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE outbox SET state = 'done', page_id = ?, lease_until = NULL, updated_at = ? "
+                              "WHERE id = ?", (page_id, now, entry_id))
+            self.delivered += 1
+
+    def fail(self, entry: dict, error: Exception) -> bool:
+        """Schedule the next attempt with exponential backoff; returns False once out of attempts"""
+        now = time.time()
+        retry = entry["attempts"] < self.max_attempts
+        delay = min(self.retry_max, self.retry_base * 2 ** (entry["attempts"] - 1))
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET state = ?, next_attempt = ?, lease_until = NULL, last_error = ?, updated_at = ? "
+                "WHERE id = ?",
+                ("pending" if retry else "failed", now + delay, f"{type(error).__name__}: {error}"[:500], now,
+                 entry["id"]),
+            )
+            if retry:
+                self.retried += 1
+            else:
+                self.gave_up += 1
+        if retry:
+            print(f"   📥 Outbox entry {entry['id']} not saved to Notion ({error}), retrying in {delay:.0f}s")
+        else:
+            print(f"   ❌ Outbox entry {entry['id']} failed {entry['attempts']} times, giving up: {error}")
+        return retry
+
+    def deliver(self, entry_id: int, brain, title: str = None, tags: list = None, follow_up_date: str = None,
+                prepare=None, entry: dict = None):
+        """Write an entry to Notion once; returns the page, QUEUED if the write failed and will be retried, or
+        ELSEWHERE if another attempt has it. Pass `entry` if the caller already claimed it"""
+        entry = entry or self.claim(entry_id)
+        if entry is None:
+            return ELSEWHERE
+        try:
+            if entry["title"] is None and title is None and prepare is not None:
+                title, tags, follow_up_date = prepare(entry["content"])
+            if not self._held(entry):
+                return ELSEWHERE
+            entry = self._fix_note(entry, title, tags, follow_up_date)
+            page = self._may_exist(entry) and self._found(brain.find_note(entry["title"], entry["created"]))
+            page = page or brain.add_note(**self._note(entry))
+        except Exception as e:
+            self.fail(entry, e)
+            return QUEUED
+        self.complete(entry["id"], page.get("id"))
+        return page
+
+    async def deliver_async(self, entry_id: int, brain, title: str = None, tags: list = None,
+                            follow_up_date: str = None, prepare=None, entry: dict = None):
+        """deliver() with an asyncio Notion client (and `prepare` a coroutine function); the SQLite work runs on the
+        local executor"""
+        entry = entry or await run_local(self.claim, entry_id)
+        if entry is None:
+            return ELSEWHERE
+        try:
+            if entry["title"] is None and title is None and prepare is not None:
+                title, tags, follow_up_date = await prepare(entry["content"])
+            if not await run_local(self._held, entry):
+                return ELSEWHERE
+            entry = await run_local(self._fix_note, entry, title, tags, follow_up_date)
+            page = self._may_exist(entry) and self._found(await brain.find_note(entry["title"], entry["created"]))
+            page = page or await brain.add_note(**self._note(entry))
+        except Exception as e:
+            await run_local(self.fail, entry, e)
+            return QUEUED
+        await run_local(self.complete, entry["id"], page.get("id"))
+        return page
+
+    def _held(self, entry: dict) -> bool:
+        # Checked just before the Notion write, so however long the AI call took the write runs under its own lease
+        if self.renew(entry):
+            return True
+        print(f"   ↳ Outbox entry {entry['id']} was taken over by another attempt, leaving it to that one")
+        return False
+
+    def _found(self, page: dict) -> dict:
+        if page:
+            self.already_written += 1
+            print(f"   ↳ Outbox entry already in Notion as {page['id']}, not writing it again")
+        return page
+
+    def drain(self, brain, prepare=None, on_delivered=None) -> int:
+        """Deliver every due entry; returns how many reached Notion"""
+        delivered = 0
+        for entry_id in self.due():
+            if isinstance(self.deliver(entry_id, brain, prepare=prepare), dict):
+                delivered += 1
+                if on_delivered:
+                    try:
+                        on_delivered(self.get(entry_id))
+                    except Exception as e:
+                        print(f"   ⚠️  Could not confirm outbox entry {entry_id}: {e}")
+        self.prune()
+        return delivered
+
+    async def drain_async(self, brain, prepare=None, on_delivered=None) -> int:
+        """drain() with an asyncio Notion client (`prepare` and `on_delivered` coroutine functions)"""
+        delivered = 0
+        for entry_id in await run_local(self.due):
+            if isinstance(await self.deliver_async(entry_id, brain, prepare=prepare), dict):
+                delivered += 1
+                if on_delivered:
+                    try:
+                        await on_delivered(await run_local(self.get, entry_id))
+                    except Exception as e:
+                        print(f"   ⚠️  Could not confirm outbox entry {entry_id}: {e}")
+        await run_local(self.prune)
+        return delivered
+
+    def prune(self) -> int:
+        """Drop delivered entries older than keep_done"""
+        with self._lock, self.conn:
+            return self.conn.execute("DELETE FROM outbox WHERE state = 'done' AND updated_at <= ?",
+                                     (time.time() - self.keep_done,)).rowcount
+
+    def entries(self, state: str = None, limit: int = 50) -> list:
+        """Entries for inspection, newest first"""
+        query, params = "SELECT * FROM outbox", ()
+        if state:
+            query, params = query + " WHERE state = ?", (state,)
+        with self._lock:
+            rows = self.conn.execute(query + " ORDER BY id DESC LIMIT ?", params + (limit,)).fetchall()
+        return [self._entry(row) for row in rows]
+
+    def retry(self, entry_id: int = None, state: str = "failed") -> int:
+        """Make an entry (or every entry in `state`) due now with a fresh set of attempts"""
+        where, params = ("id = ?", (entry_id,)) if entry_id is not None else ("state = ?", (state,))
+        with self._lock, self.conn:
+            return self.conn.execute(
+                f"UPDATE outbox SET state = 'pending', attempts = 0, next_attempt = ?, lease_until = NULL, "
+                f"updated_at = ? WHERE {where} AND state != 'done'", (time.time(), time.time()) + params,
+            ).rowcount
+
+    def purge(self, entry_id: int = None, state: str = None) -> int:
+        """Delete an entry, or every entry in `state`"""
+        if entry_id is None and state is None:
+            raise ValueError("purge needs an entry ID or a state")
+        where, params = ("id = ?", (entry_id,)) if entry_id is not None else ("state = ?", (state,))
+        with self._lock, self.conn:
+            return self.conn.execute(f"DELETE FROM outbox WHERE {where}", params).rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self.conn.execute("SELECT state, COUNT(*) FROM outbox GROUP BY state").fetchall())
+            oldest = self.conn.execute("SELECT MIN(added_at) FROM outbox WHERE state IN ('pending', 'sending')"
+                                       ).fetchone()[0]
+        return {**{state: counts.get(state, 0) for state in STATES},
+                "oldest_pending_seconds": time.time() - oldest if oldest else 0.0,
+                "delivered": self.delivered, "retried": self.retried, "gave_up": self.gave_up,
+                "already_written": self.already_written}
+
+    @staticmethod
+    def _entry(row) -> dict:
+        entry = dict(row)
+        entry["tags"] = json.loads(entry["tags"]) if entry["tags"] else []
+        return entry
+
+    def start(self, brain, prepare=None, on_delivered=None):
+        """Run drain() every `interval` seconds on a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(brain, prepare, on_delivered),
+                                        name="outbox-drain", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, brain, prepare, on_delivered):
+        while not self._stop.is_set():
+            try:
+                delivered = self.drain(brain, prepare=prepare, on_delivered=on_delivered)
+                if delivered:
+                    print(f"📤 Outbox delivered {delivered} captures to Notion")
+            except Exception as e:
+                print(f"⚠️  Outbox drain failed: {e}")
+            self._stop.wait(self.interval)
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect, retry or purge capture outbox entries")
+    parser.add_argument("command", choices=("list", "stats", "retry", "purge"))
+    parser.add_argument("--id", type=int, help="one entry")
+    parser.add_argument("--state", choices=STATES, help="every entry in this state (retry default: failed)")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--path", default=OUTBOX_PATH)
+    args = parser.parse_args()
+
+    outbox = Outbox(args.path)
+    if args.command == "list":
+        for entry in outbox.entries(args.state, args.limit):
+            added = datetime.fromtimestamp(entry["added_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"{entry['id']:>6}  {entry['state']:<8} {added}  attempts {entry['attempts']}  "
+                  f"{entry['title'] or fallback_title(entry['content'])}")
+            if entry["last_error"] and entry["state"] != "done":
+                print(f"        ↳ {entry['last_error']}")
+    elif args.command == "stats":
+        print(json.dumps(outbox.stats(), indent=2))
+    elif args.command == "retry":
+        print(f"🔁 {outbox.retry(args.id, args.state or 'failed')} entries due for retry")
+    else:
+        if args.id is None and args.state is None:
+            parser.error("purge needs --id or --state")
+        print(f"🗑️  Purged {outbox.purge(args.id, args.state)} entries")
+
+
+if __name__ == "__main__":
+    main()
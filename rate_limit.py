@@ -0,0 +1,164 @@
+"""
+Shared per-upstream token-bucket rate limiting with Retry-After-aware backoff
+"""
+import asyncio
+import random
+import sys
+import threading
+import time
+
+import httpx
+from notion_client.errors import RequestTimeoutError
+
+from config import (
+    NOTION_RPS, NOTION_BURST, OPENAI_RPS, OPENAI_BURST, SLACK_RPS, SLACK_BURST,
+    RATE_LIMIT_MAX_RETRIES, RATE_LIMIT_BASE_DELAY, RATE_LIMIT_MAX_DELAY,
+)
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# httpx.TransportError covers connection failures, including a pooled keep-alive connection the server closed
+RETRYABLE_ERRORS = (RequestTimeoutError, httpx.TransportError)
+# Raised before the request went out, so even a write that mustn't be repeated (creating a page, posting a message)
+# is safe to retry; Notion raises RequestTimeoutError from the httpx timeout, so that's checked too
+CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def _retryable_errors() -> tuple:
+    # openai takes ~0.5s to import, so it isn't imported here; its errors can only be raised once something has
+    openai = sys.modules.get("openai")
+    if openai is None:
+        return RETRYABLE_ERRORS
+    return RETRYABLE_ERRORS + (openai.APITimeoutError, openai.APIConnectionError)
+
+
+def _status_and_headers(exc):
+    """Pull the HTTP status and headers off Notion, OpenAI or Slack exceptions"""
+    response = getattr(exc, "response", None)
+    status = getattr(exc, "status", None) or getattr(exc, "status_code", None) \
+        or getattr(response, "status_code", None)
+    headers = getattr(exc, "headers", None) or getattr(response, "headers", None) or {}
+    return status, headers
+
+
+def _never_sent(exc) -> bool:
+    return isinstance(exc, CONNECT_ERRORS) or isinstance(exc.__cause__ or exc.__context__, CONNECT_ERRORS)
+
+
+def classify_error(exc, idempotent: bool = True):
+    """Return (retryable, is_rate_limited, retry_after_seconds) for an exception; a request that isn't idempotent
+    is only retried if it was rate limited or never sent, since a timeout or 5xx may come after the write landed"""
+    if isinstance(exc, _retryable_errors()):
+        return idempotent or _never_sent(exc), False, None
+    status, headers = _status_and_headers(exc)
+    if status not in RETRYABLE_STATUSES or (status != 429 and not idempotent):
+        return False, False, None
+    retry_after = None
+    try:
+        value = headers.get("Retry-After") or headers.get("retry-after")
+        retry_after = float(value) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        pass
+    return True, status == 429, retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _try_take(self) -> float:
+        """Take a token if one is available; otherwise return how long to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if now >= self._paused_until and self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return max(self._paused_until - now, (1 - self._tokens) / self.rate)
+
+    def acquire(self):
+        """Block until a token is available"""
+        while (wait := self._try_take()) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait (without blocking the event loop) until a token is available"""
+        while (wait := self._try_take()) > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold every caller back (e.g. after a 429) and drain accumulated burst"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+
+
+class RateLimiter:
+    def __init__(self, name: str, rate: float, burst: int = None, max_retries: int = RATE_LIMIT_MAX_RETRIES,
+                 base_delay: float = RATE_LIMIT_BASE_DELAY, max_delay: float = RATE_LIMIT_MAX_DELAY):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.errors = 0
+
+    def call(self, fn, *args, idempotent: bool = True, **kwargs):
+        """Run fn under the rate limit, retrying throttled/transient failures with backoff (see classify_error)"""
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            self.calls += 1
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                time.sleep(self._retry_delay(e, attempt, idempotent))
+                attempt += 1
+
+    async def call_async(self, fn, *args, idempotent: bool = True, **kwargs):
+        """Async version of call() for coroutine functions; shares the same bucket"""
+        attempt = 0
+        while True:
+            await self.bucket.acquire_async()
+            self.calls += 1
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                await asyncio.sleep(self._retry_delay(e, attempt, idempotent))
+                attempt += 1
+
+    def _retry_delay(self, exc: Exception, attempt: int, idempotent: bool = True) -> float:
+        """Decide how long to wait before retrying, re-raising if the error isn't retryable"""
+        retryable, throttled, retry_after = classify_error(exc, idempotent)
+        if throttled:
+            self.rate_limited += 1
+        if not retryable or attempt >= self.max_retries:
+            self.errors += 1
+            raise exc
+        # Exponential backoff with full jitter, unless the server told us how long to wait
+        delay = retry_after if retry_after is not None else \
+            random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if throttled:
+            self.bucket.pause(delay)
+        print(f"   ⏳ {self.name} {'rate limited' if throttled else 'error'}, retrying in {delay:.1f}s: {exc}")
+        self.retries += 1
+        return delay
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "retries": self.retries, "rate_limited": self.rate_limited, "errors": self.errors}
+
+
+# One limiter per upstream, shared by every client in the process
+limiters = {
+    "notion": RateLimiter("notion", NOTION_RPS, NOTION_BURST),
+    "openai": RateLimiter("openai", OPENAI_RPS, OPENAI_BURST),
+    "slack": RateLimiter("slack", SLACK_RPS, SLACK_BURST),
+}
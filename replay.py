@@ -0,0 +1,234 @@
+"""
+Replay recorded Slack events (or synthetic bursts) into the Bolt app and report queueing and latency
+Record: set EVENT_RECORD_PATH=events.jsonl on the listener (see tracing.EventRecorder)
+Replay: python replay.py events.jsonl --speed 4
+        python replay.py --synthetic 200 --rate 100              # a 200-message paste
+        python replay.py --synthetic 1000 --poisson 50 --duplicate-rate 0.05 --profile realistic
+
+Replays run slack_listener's real handlers, capture queue and dedup store against the local
+Notion/OpenAI/Slack stand-ins from benchmark.py. Arrivals are open-loop (sent on schedule however
+far behind the handlers fall), so queueing shows up as it would in production.
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+
+OUTCOMES = ("queued", "duplicate", "skipped", "rejected")
+
+
+def load_trace(path: str) -> list:
+    """(time, envelope) pairs from a recorded trace; bare event payloads are wrapped in an envelope"""
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            body = entry.get("body", entry)
+            if "event" not in body:
+                body = {"event": body}
+            # Bolt needs a team to authorize the event against
+            body.setdefault("type", "event_callback")
+            body.setdefault("team_id", "TBENCH")
+            body.setdefault("event_id", f"EvReplay{i:06d}")
+            events.append((entry.get("t"), body))
+    return events
+
+
+def synthetic_trace(count: int, rng: random.Random) -> list:
+    """A paste burst: `count` distinct messages from a handful of users"""
+    from benchmark import note_text
+    now = time.time()
+    users = [f"UBENCH{i}" for i in range(8)]
+    events = []
+    for i in range(count):
+        ts = f"{now + i / 1000:.6f}"
+        events.append((None, {
+            "type": "event_callback", "team_id": "TBENCH", "api_app_id": "ABENCH",
+            "event_id": f"EvSynthetic{i:06d}", "event_time": int(now),
+            "event": {"type": "message", "user": rng.choice(users), "channel": "CBENCH",
+                      "text": note_text(rng), "ts": ts, "event_ts": ts},
+        }))
+    return events
+
+
+def schedule(events: list, rng: random.Random, rate: float = None, speed: float = None, poisson: float = None,
+             duplicate_rate: float = 0.0, duplicate_delay: float = 1.0) -> list:
+    """(offset seconds, envelope, redelivery) in send order"""
+    if speed:
+        if any(t is None for t, _ in events):
+            raise ValueError("--speed needs a recorded trace (synthetic events have no timestamps)")
+        first = events[0][0] if events else 0
+        offsets = [(t - first) / speed for t, _ in events]
+    elif poisson:
+        offsets = list(_poisson_offsets(len(events), poisson, rng))
+    else:
+        offsets = [i / rate for i in range(len(events))]
+
+    sends = [(offset, body, False) for offset, (_, body) in zip(offsets, events)]
+    # Slack redelivers events it thinks we missed, with the same event_id
+    sends += [(offset + duplicate_delay, body, True) for offset, (_, body) in zip(offsets, events)
+              if rng.random() < duplicate_rate]
+    return sorted(sends, key=lambda s: s[0])
+
+
+def _poisson_offsets(count: int, rate: float, rng: random.Random):
+    offset = 0.0
+    for _ in range(count):
+        yield offset
+        offset += rng.expovariate(rate)
+
+
+def _percentile(values: list, p: float) -> float:
+    """Nearest-rank percentile, in milliseconds"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))] * 1000
+
+
+class Replay:
+    """Feeds envelopes to slack_listener's Bolt app on a schedule and times each event via its trace"""
+    def __init__(self, bench):
+        from prometheus_client import REGISTRY
+        from slack_bolt.request import BoltRequest
+        from tracing import on_finish
+
+        self.bench = bench
+        self.listener = bench.listener
+        self._registry = REGISTRY
+        self._request = BoltRequest
+        self.dispatched = {}
+        self.finished = {}
+        self._lock = threading.Lock()
+        on_finish(self._finished)
+
+    def _finished(self, trace):
+        queue_wait = sum(duration for _, duration, _, name, _, _ in trace.spans if name == "queue_wait")
+        with self._lock:
+            self.finished[trace.trace_id] = (trace.started, trace.duration, queue_wait)
+
+    def _outcomes(self) -> dict:
+        counts = dict.fromkeys(OUTCOMES, 0.0)
+        for kind in ("message", "app_mention"):
+            for outcome in OUTCOMES:
+                counts[outcome] += self._registry.get_sample_value(
+                    "second_brain_events_total", {"type": kind, "outcome": outcome}) or 0.0
+        return counts
+
+    def run(self, sends: list, timeout: float = 120.0) -> dict:
+        self.dispatched.clear()
+        self.finished.clear()
+        before = self._outcomes()
+        self.listener.capture_queue.start()
+        lags, failures, peak_depth = [], 0, 0
+
+        started = time.perf_counter()
+        for offset, body, redelivery in sends:
+            delay = started + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            lags.append(max(0.0, -delay))
+            if not redelivery:
+                self.dispatched[body["event_id"]] = time.perf_counter()
+            # Socket Mode semantics: acked right away, the handler runs on Bolt's listener executor
+            response = self.listener.app.dispatch(self._request(body=body, mode="socket_mode"))
+            failures += response.status != 200
+            peak_depth = max(peak_depth, self.listener.capture_queue.depth)
+        sent = time.perf_counter() - started
+
+        # Wait for every event to reach a handler, and every queued one to finish its job
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            outcomes = {k: v - before[k] for k, v in self._outcomes().items()}
+            with self._lock:
+                done = len([i for i in self.dispatched if i in self.finished])
+            if sum(outcomes.values()) >= len(sends) and done >= outcomes["queued"]:
+                break
+            peak_depth = max(peak_depth, self.listener.capture_queue.depth)
+            time.sleep(0.05)
+        outcomes = {k: int(v - before[k]) for k, v in self._outcomes().items()}
+
+        with self._lock:
+            timings = [(self.finished[i], self.dispatched[i]) for i in self.dispatched if i in self.finished]
+        return {
+            "sent": len(sends), "events": len(self.dispatched), "redeliveries": len(sends) - len(self.dispatched),
+            "send_seconds": sent, "max_lag": max(lags, default=0.0), "failures": failures, "peak_depth": peak_depth,
+            **outcomes,
+            # Handed to a handler but never finished (timed out), or never handed to one at all
+            "lost": outcomes["queued"] - len(timings) + max(0, len(sends) - sum(outcomes.values())),
+            "handler_delay": [trace_start - sent_at for (trace_start, _, _), sent_at in timings],
+            "queue_wait": [queue_wait for (_, _, queue_wait), _ in timings],
+            "end_to_end": [trace_start + duration - sent_at for (trace_start, duration, _), sent_at in timings],
+        }
+
+
+def report(result: dict, upstream_stats: dict) -> str:
+    rate = result["sent"] / result["send_seconds"] if result["send_seconds"] else 0.0
+    lines = [
+        f"sent        {result['sent']} ({result['events']} events + {result['redeliveries']} redeliveries) in "
+        f"{result['send_seconds']:.2f}s, {rate:.1f}/s (max send lag {result['max_lag'] * 1000:.1f} ms)",
+        f"outcomes    queued {result['queued']}, duplicate {result['duplicate']}, skipped {result['skipped']}, "
+        f"rejected {result['rejected']}, lost {result['lost']}, dispatch failures {result['failures']}",
+        f"queue       peak depth {result['peak_depth']}",
+        "",
+        f"{'':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}",
+    ]
+    for key, label in (("handler_delay", "handler delay"), ("queue_wait", "queue wait"), ("end_to_end", "end-to-end")):
+        values = result[key]
+        lines.append(f"{label:<16}" + "".join(f"{_percentile(values, p):>10.1f}" for p in (50, 95, 99, 100)))
+    lines.append("\nupstream requests: " + ", ".join(
+        f"{name} {s['requests']} over {s['connections']} connections ({s['throttled']} throttled, {s['errors']} errors)"
+        for name, s in upstream_stats.items()))
+    return "\n".join(lines)
+
+
+def main():
+    from benchmark import Benchmark, add_upstream_arguments, upstreams_from_args
+
+    parser = argparse.ArgumentParser(description="Replay recorded or synthetic Slack events into the listener")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("trace", nargs="?", help="JSONL trace recorded with EVENT_RECORD_PATH")
+    source.add_argument("--synthetic", type=int, metavar="N", help="replay a burst of N generated messages instead")
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument("--rate", type=float, help="events per second, evenly spaced (default for --synthetic: 100)")
+    pacing.add_argument("--speed", type=float, help="recorded arrival times sped up X times (default for traces: 1)")
+    pacing.add_argument("--poisson", type=float, metavar="RATE", help="random (Poisson) arrivals at RATE per second")
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="share of events Slack redelivers")
+    parser.add_argument("--duplicate-delay", type=float, default=1.0, help="seconds before a redelivery")
+    add_upstream_arguments(parser)
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds to wait for queued jobs to finish")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="keep the handlers' log output")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    events = synthetic_trace(args.synthetic, rng) if args.synthetic else load_trace(args.trace)
+    if not (args.rate or args.speed or args.poisson):
+        if args.synthetic:
+            args.rate = 100.0
+        else:
+            args.speed = 1.0
+    try:
+        sends = schedule(events, rng, rate=args.rate, speed=args.speed, poisson=args.poisson,
+                         duplicate_rate=args.duplicate_rate, duplicate_delay=args.duplicate_delay)
+    except ValueError as e:
+        parser.error(str(e))
+
+    bench = Benchmark.get(seed=args.seed, verbose=args.verbose)
+    bench.backends.configure(upstreams_from_args(args))
+    before = {name: dict(stats) for name, stats in bench.backends.stats.items()}
+    replay = Replay(bench)
+    print(f"▶️  Replaying {len(sends)} events over {sends[-1][0] if sends else 0:.1f}s...")
+    with bench._quiet():
+        result = replay.run(sends, timeout=args.timeout)
+    upstream_stats = {name: {k: v - before[name][k] for k, v in stats.items()}
+                      for name, stats in bench.backends.stats.items()}
+    print(report(result, upstream_stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 """
 Second Brain - Main orchestrator connecting Notion, Slack, and ChatGPT
 """
-from notion_client_wrapper import NotionBrain
+from notion_client_wrapper import NotionBrain, digest_text
 from slack_client_wrapper import SlackBrain
 from chatgpt_processor import ChatGPTProcessor
+from notion_sync import NotionSync
+from config import CONTEXT_MAX_NOTES
 
 
 class SecondBrain:
@@ -12,22 +14,26 @@ class SecondBrain:
         self.notion = NotionBrain()
         self.slack = SlackBrain()
         self.ai = ChatGPTProcessor()
+        self.sync = NotionSync(self.notion)
+        self.sync.start()
         print("✅ Second Brain ready!")
 
-    def capture_thought(self, title: str, content: str, tags: list = None, notify_slack: bool = True):
+    def capture_thought(self, title: str, content: str, tags: list = None, notify_slack: bool = True, analysis=None):
         """Capture a new thought/note and optionally notify via Slack"""
-        # Get AI suggestions for categorization
-        ai_suggestions = self.ai.categorize_note(content)
+        # Get AI suggestions for categorization (reuse a prior analysis if given)
+        if analysis is None:
+            analysis = self.ai.analyze_note(content)
         
         # Merge suggested tags with provided tags
-        all_tags = list(set((tags or []) + ai_suggestions.get("tags", [])))
+        all_tags = list(set((tags or []) + analysis.tags))
         
         # Save to Notion
         result = self.notion.add_note(
             title=title,
             content=content,
             tags=all_tags,
-            source="second_brain"
+            source="second_brain",
+            follow_up_date=analysis.follow_up_date
         )
         
         # Notify via Slack
@@ -45,16 +51,10 @@ class SecondBrain:
         context_notes = []
         
         if search_notes:
-            # Search Notion for relevant notes
-            search_results = self.notion.search_notes(question)
-            for result in search_results[:5]:  # Top 5 results
-                try:
-                    title = result.get("properties", {}).get("Name", {}).get("title", [{}])[0].get("text", {}).get("content", "Untitled")
-                    context_notes.append(title)
-                except:
-                    pass
-        
-        # Get AI response with context
+            # Search the local note index for relevant notes
+            context_notes = self.notion.find_notes(question, limit=CONTEXT_MAX_NOTES)
+        
+        # Get AI response with the most relevant chunks packed into the token budget
         response = self.ai.answer_question(question, context_notes)
         
         return response
@@ -62,18 +62,12 @@ class SecondBrain:
     def daily_digest(self, send_to_slack: bool = True):
         """Generate and optionally send daily digest"""
         # Get recent notes
-        recent_notes = self.notion.get_recent_notes(limit=10)
+        recent_notes = self.notion.find_recent_notes(limit=10)
         
-        note_titles = []
-        for note in recent_notes:
-            try:
-                title = note.get("properties", {}).get("Name", {}).get("title", [{}])[0].get("text", {}).get("content", "Untitled")
-                note_titles.append(title)
-            except:
-                pass
+        notes = [digest_text(note["title"] or "Untitled", note["body"]) for note in recent_notes]
         
         # Generate summary
-        summary = self.ai.generate_daily_summary(note_titles)
+        summary = self.ai.generate_daily_summary(notes)
         
         if send_to_slack:
             self.slack.send_ai_summary(summary, "Daily Digest")
@@ -105,11 +99,10 @@ class SecondBrain:
 
     def quick_capture(self, text: str):
         """Quick capture - AI determines title and tags automatically"""
-        # Use AI to generate title
-        title_prompt = f"Generate a short, descriptive title (max 6 words) for this note: {text}"
-        title = self.ai.process(title_prompt).strip('"').strip("'")
+        # One structured call generates title, tags and follow-up together
+        analysis = self.ai.analyze_note(text)
         
-        return self.capture_thought(title, text)
+        return self.capture_thought(analysis.title, text, analysis=analysis)
 
 
 def main():
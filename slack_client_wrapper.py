@@ -1,15 +1,77 @@
 """
 Slack API wrapper for Second Brain notifications and input
 """
+import io
+import time
+from http.client import HTTPMessage
+from urllib.error import HTTPError
+from urllib.request import Request
+
 from slack_sdk import WebClient
+from slack_sdk.web import SlackResponse
+from slack_sdk.web.async_client import AsyncWebClient
 from slack_sdk.errors import SlackApiError
-from config import SLACK_BOT_TOKEN, SLACK_CHANNEL_ID
+from config import SLACK_BOT_TOKEN, SLACK_CHANNEL_ID, SLACK_API_URL, SLACK_STREAM_INTERVAL, SLACK_TIMEOUT
+from user_cache import UserCache
+from rate_limit import limiters
+from metrics import timed
+from tracing import span, traced
+from transport import http_client, aiohttp_session
+
+# Calls that post or edit a reply, timed as the slack_reply stage
+REPLY_METHODS = {"chat.postMessage", "chat.update"}
+# Methods that only read (conversations.history, users.info, auth.test, ...), so any transient failure is retried;
+# everything else is a write that's only retried when rate limited or never sent, so a reply isn't posted twice
+READ_VERBS = {"history", "replies", "info", "list", "test"}
+
+
+def _is_read(api_method: str) -> bool:
+    return api_method.rsplit(".", 1)[-1] in READ_VERBS
+
 
+class RateLimitedWebClient(WebClient):
+    """Slack client whose every API call goes through the shared Slack rate limiter and keep-alive pool"""
+    def api_call(self, api_method: str, *args, **kwargs) -> SlackResponse:
+        with span(f"slack {api_method}", upstream="slack"):
+            if api_method in REPLY_METHODS:
+                with timed("slack_reply"):
+                    return limiters["slack"].call(super().api_call, api_method, *args,
+                                                  idempotent=_is_read(api_method), **kwargs)
+            return limiters["slack"].call(super().api_call, api_method, *args, idempotent=_is_read(api_method),
+                                          **kwargs)
 
+    def _perform_urllib_http_request_internal(self, url: str, req: Request) -> dict:
+        """The SDK's single HTTP round trip, sent over the shared pool rather than a new urllib connection per call.
+        The SDK still builds the request and the SlackResponse and runs its retry handlers"""
+        if self.proxy is not None or self.ssl is not None or not url.lower().startswith("http"):
+            # The pool has its own SSL and proxy settings, so a client with its own keeps the SDK's urllib path
+            return super()._perform_urllib_http_request_internal(url, req)
+        response = http_client("slack").post(url, content=req.data,
+                                             headers={name: str(value) for name, value in req.header_items()})
+        headers = HTTPMessage()
+        for name, value in response.headers.raw:
+            headers[name.decode("latin-1")] = value.decode("latin-1")
+        if response.status_code >= 400:
+            # What urlopen raises, so the SDK handles the error (and Retry-After) as it would its own
+            raise HTTPError(url, response.status_code, response.reason_phrase, headers, io.BytesIO(response.content))
+        if headers.get_content_type() == "application/gzip":
+            # admin.analytics.getFile
+            return {"status": response.status_code, "headers": headers, "body": response.content}
+        return {"status": response.status_code, "headers": headers,
+                "body": response.content.decode(headers.get_content_charset() or "utf-8")}
+
+
+@traced
 class SlackBrain:
     def __init__(self):
-        self.client = WebClient(token=SLACK_BOT_TOKEN)
+        self.client = RateLimitedWebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_URL, timeout=int(SLACK_TIMEOUT))
         self.default_channel = SLACK_CHANNEL_ID
+        self.users = UserCache(self.client)
+
+    def get_user_name(self, user_id: str) -> str:
+        """Resolve a user ID to a display name (cached)"""
+        with timed("user_lookup"):
+            return self.users.get_name(user_id)
 
     def send_message(self, message: str, channel: str = None):
         """Send a message to Slack"""
@@ -65,6 +127,45 @@ class SlackBrain:
             print(f"Slack API Error: {e.response['error']}")
             return []
 
+    def history_pages(self, channel: str = None, oldest: str = None, latest: str = None, cursor: str = None,
+                      limit: int = 200):
+        """Yield (messages, next_cursor) for each page of channel history, starting at `cursor`"""
+        kwargs = {"channel": channel or self.default_channel, "limit": limit, "inclusive": True}
+        if oldest:
+            kwargs["oldest"] = oldest
+        if latest:
+            kwargs["latest"] = latest
+        while True:
+            response = self.client.conversations_history(cursor=cursor, **kwargs)
+            cursor = (response.get("response_metadata") or {}).get("next_cursor") or None
+            yield response.get("messages", []), cursor
+            if not cursor:
+                return
+
+    def thread_replies(self, thread_ts: str, channel: str = None, limit: int = 200) -> list:
+        """Every reply in a thread (excluding the parent message)"""
+        replies = []
+        cursor = None
+        while True:
+            response = self.client.conversations_replies(
+                channel=channel or self.default_channel, ts=thread_ts, cursor=cursor, limit=limit
+            )
+            replies.extend(m for m in response.get("messages", []) if m.get("ts") != thread_ts)
+            cursor = (response.get("response_metadata") or {}).get("next_cursor") or None
+            if not cursor:
+                return replies
+
+    def get_message(self, ts: str, channel: str = None, thread_ts: str = None):
+        """One message by timestamp (a thread reply needs its thread_ts); None if it's gone"""
+        channel = channel or self.default_channel
+        if thread_ts and thread_ts != ts:
+            response = self.client.conversations_replies(channel=channel, ts=thread_ts, oldest=ts, latest=ts,
+                                                         inclusive=True, limit=1)
+        else:
+            response = self.client.conversations_history(channel=channel, oldest=ts, latest=ts, inclusive=True, limit=1)
+        # Replies always start with the thread's parent
+        return next((m for m in response.get("messages", []) if m.get("ts") == ts), None)
+
     def send_ai_summary(self, summary: str, original_query: str = None, channel: str = None):
         """Send an AI-generated summary to Slack"""
         blocks = [
@@ -101,6 +202,95 @@ class SlackBrain:
             return None
 
 
+class SlackMessageStream:
+    """Progressively edits one posted message as text streams in, at most once per `interval` seconds"""
+    # Shown after the text while the answer is still streaming
+    CURSOR = " ▍"
+
+    def __init__(self, client, channel: str, ts: str, prefix: str = "", interval: float = SLACK_STREAM_INTERVAL):
+        self.client = client
+        self.channel = channel
+        self.ts = ts
+        self.prefix = prefix
+        self.interval = interval
+        self.text = ""
+        self.updates = 0
+        self._last_update = 0.0
+
+    def write(self, delta: str):
+        """Append streamed text, editing the message if the last edit was long enough ago"""
+        self.text += delta
+        if time.monotonic() - self._last_update >= self.interval:
+            self._update(self.prefix + self.text + self.CURSOR)
+
+    def close(self, final_text: str = None):
+        """Write the finished message (or `final_text`, e.g. an error) without the cursor"""
+        self._update(final_text if final_text is not None else self.prefix + (self.text or "_(no answer)_"))
+
+    def _update(self, text: str):
+        self._last_update = time.monotonic()
+        self.updates += 1
+        self.client.chat_update(channel=self.channel, ts=self.ts, text=text)
+
+
+class AsyncRateLimitedWebClient(AsyncWebClient):
+    """Async Slack client sharing the process-wide Slack rate limiter"""
+    async def api_call(self, api_method: str, *args, **kwargs):
+        if self.session is None:
+            # Without a session the SDK opens (and closes) a new one, and a new connection, per call
+            self.session = aiohttp_session("slack")
+        with span(f"slack {api_method}", upstream="slack"):
+            if api_method in REPLY_METHODS:
+                with timed("slack_reply"):
+                    return await limiters["slack"].call_async(super().api_call, api_method, *args,
+                                                              idempotent=_is_read(api_method), **kwargs)
+            return await limiters["slack"].call_async(super().api_call, api_method, *args,
+                                                      idempotent=_is_read(api_method), **kwargs)
+
+
+@traced
+class AsyncSlackBrain:
+    """asyncio counterpart of SlackBrain for the async listener"""
+    def __init__(self):
+        self.client = AsyncRateLimitedWebClient(token=SLACK_BOT_TOKEN, base_url=SLACK_API_URL, timeout=int(SLACK_TIMEOUT))
+        self.default_channel = SLACK_CHANNEL_ID
+        self.users = UserCache(self.client)
+
+    async def get_user_name(self, user_id: str) -> str:
+        """Resolve a user ID to a display name (cached)"""
+        with timed("user_lookup"):
+            return await self.users.get_name_async(user_id)
+
+    async def send_message(self, message: str, channel: str = None):
+        """Send a message to Slack"""
+        try:
+            return await self.client.chat_postMessage(
+                channel=channel or self.default_channel,
+                text=message
+            )
+        except SlackApiError as e:
+            print(f"Slack API Error: {e.response['error']}")
+            return None
+
+
+class AsyncSlackMessageStream(SlackMessageStream):
+    """SlackMessageStream for AsyncWebClient; write() and close() are coroutines"""
+    async def write(self, delta: str):
+        """Append streamed text, editing the message if the last edit was long enough ago"""
+        self.text += delta
+        if time.monotonic() - self._last_update >= self.interval:
+            await self._update(self.prefix + self.text + self.CURSOR)
+
+    async def close(self, final_text: str = None):
+        """Write the finished message (or `final_text`, e.g. an error) without the cursor"""
+        await self._update(final_text if final_text is not None else self.prefix + (self.text or "_(no answer)_"))
+
+    async def _update(self, text: str):
+        self._last_update = time.monotonic()
+        self.updates += 1
+        await self.client.chat_update(channel=self.channel, ts=self.ts, text=text)
+
+
 if __name__ == "__main__":
     # Test connection
     slack = SlackBrain()
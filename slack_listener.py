@@ -2,18 +2,33 @@
 Slack Bot Listener - Automatically captures messages to Notion Second Brain
 Run this script to start listening to Slack messages 24/7
 """
+import hmac
 import os
-import re
 import time
 import threading
-from flask import Flask
+from flask import Flask, request
 from slack_bolt import App
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 from dotenv import load_dotenv
 
-from notion_client_wrapper import NotionBrain
+from notion_client_wrapper import NotionBrain, digest_text
 from chatgpt_processor import ChatGPTProcessor
-from slack_client_wrapper import SlackBrain
+from slack_client_wrapper import SlackBrain, SlackMessageStream
+from capture_queue import CaptureQueue
+from notion_sync import NotionSync
+from classifier import LocalClassifier
+from dedup import dedup_key, get_dedup_store
+from outbox import Outbox, QUEUED, ELSEWHERE
+from config import USER_CACHE_WARM, CAPTURE_MODE, CONTEXT_MAX_NOTES, ADMIN_TOKEN, LLM_CACHE_ENABLED
+from commands import (
+    HELP_TEXT, route_message, route_mention, strip_mention, capture_content, question_text, should_skip_auto_capture,
+    fallback_title, render_capture_reply, render_auto_capture_reply, render_queued_reply, render_sources,
+)
+from context_builder import build_context
+from metrics import EVENTS, timed, observe_delivery, register, exposition
+from tracing import trace, finish, profiler, recorder
+from lazy import Lazy
+from transport import warm
 
 load_dotenv()
 
@@ -22,29 +37,123 @@ flask_app = Flask(__name__)
 
 @flask_app.route('/')
 def health_check():
-    return {'status': 'healthy', 'service': 'second-brain-bot'}, 200
+    return {'status': 'healthy', 'service': 'second-brain-bot',
+            'classifier': classifier.stats() if classifier.built else None}, 200
 
 @flask_app.route('/health')
 def health():
     return 'OK', 200
 
-# Initialize components
-notion = NotionBrain()
-ai = ChatGPTProcessor()
+@flask_app.route('/ready')
+def ready_check():
+    """Readiness, as opposed to /health's liveness: 200 only while connected to Slack"""
+    connected = ready.is_set() and (socket_handler is None or socket_handler.client.is_connected())
+    return ('Ready', 200) if connected else ('Not ready', 503)
+
+@flask_app.route('/metrics')
+def metrics():
+    body, content_type = exposition()
+    return body, 200, {'Content-Type': content_type}
+
+def _admin_denied():
+    """The error response for a request without the admin token (None if it has it)"""
+    if not ADMIN_TOKEN:
+        return 'Not found', 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return 'Forbidden', 403
+    return None
+
+@flask_app.route('/admin/profile', methods=['GET', 'POST', 'DELETE'])
+def admin_profile():
+    """POST ?events=N profiles the next N jobs, DELETE stops, GET returns the aggregated cProfile stats"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    try:
+        if request.method == 'POST':
+            profiler.start(int(request.args.get('events', 20)))
+            return profiler.status(), 200
+        if request.method == 'DELETE':
+            profiler.stop()
+            return profiler.status(), 200
+        report = profiler.report(sort=request.args.get('sort', 'cumulative'), limit=int(request.args.get('limit', 40)))
+        return report, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    except (ValueError, KeyError) as e:
+        return f'Bad request: {e}', 400
+
+@flask_app.route('/admin/outbox', methods=['GET', 'POST', 'DELETE'])
+def admin_outbox():
+    """GET lists entries (?state=&limit=), POST retries ?id=N (or every ?state=, default failed), DELETE purges"""
+    denied = _admin_denied()
+    if denied:
+        return denied
+    try:
+        entry_id = int(request.args['id']) if 'id' in request.args else None
+        state = request.args.get('state')
+        if request.method == 'POST':
+            return {'retried': outbox.retry(entry_id, state or 'failed')}, 200
+        if request.method == 'DELETE':
+            return {'purged': outbox.purge(entry_id, state)}, 200
+        return {'stats': outbox.stats(), 'entries': outbox.entries(state, int(request.args.get('limit', 50)))}, 200
+    except ValueError as e:
+        return f'Bad request: {e}', 400
+
+# Shared clients, built on first use (or by warm_up() right after startup) so importing this module is cheap
+notion = Lazy(NotionBrain)
+ai = Lazy(ChatGPTProcessor)
+sync = Lazy(lambda: NotionSync(notion))
+classifier = Lazy(lambda: LocalClassifier(notion.index))
+# Just a WebClient (no network), and Bolt needs it up front
 slack_helper = SlackBrain()
 
-# Initialize Slack Bolt App
-app = App(token=os.getenv("SLACK_BOT_TOKEN"))
+# Initialize Slack Bolt App (its client is the app-level one; events get theirs from use_shared_client below);
+# auth.test runs on the first event instead of at import
+app = App(token=os.getenv("SLACK_BOT_TOKEN"), client=slack_helper.client, token_verification_enabled=False)
+
+
+@app.middleware
+def use_shared_client(context, next):
+    """Bolt builds a plain WebClient per event; give listeners and say() the rate-limited, pooled one instead"""
+    context["client"] = slack_helper.client
+    # Bolt's own middleware has already built say() on the old client; it's rebuilt on next use
+    context.pop("say", None)
+    next()
 
-# Store for tracking processed messages
-processed_messages = set()
+
+# Store for tracking processed events (bounded, survives restarts)
+processed_events = get_dedup_store()
+
+# Worker pool that runs enrichment and Notion writes off the Bolt handler thread
+capture_queue = CaptureQueue()
+
+# Captures are written here before the handler returns, and retried from here until Notion has them
+outbox = Outbox()
+
+# Counters the components keep themselves, published on /metrics
+register("capture_queue", capture_queue.stats, gauges=("depth", "max_depth"))
+register("outbox", outbox.stats, gauges=("pending", "sending", "done", "failed", "oldest_pending_seconds"))
+register("user_cache", slack_helper.users.stats, gauges=("hit_rate", "entries"))
+# Scrapes before the clients are built report nothing rather than building them
+register("block_cache", lambda: notion.blocks.stats() if notion.built else {})
+register("classifier", lambda: classifier.stats() if classifier.built else {},
+         gauges=("ignore_rate", "local_hit_rate", "tags_known"))
+if LLM_CACHE_ENABLED:
+    register("llm_cache", lambda: ai.cache.stats() if ai.built else {}, gauges=("hit_rate", "memory_entries"))
+
+# Set once connected to Slack; /ready reports it
+ready = threading.Event()
+socket_handler = None
 
 
 @app.event("message")
-def handle_message(event, say, client):
+def handle_message(event, say, client, body):
     """Handle all incoming Slack messages with comprehensive error handling"""
+    observe_delivery(event)
+    recorder.record("message", body)
     try:
-        _handle_message_internal(event, say, client)
+        with trace("message", body.get("event_id"), channel=event.get("channel"), ts=event.get("ts")), \
+                timed("receive"):
+            _handle_message_internal(event, say, client, body.get("event_id"))
     except Exception as e:
         print(f"❌ Critical message handler error: {e}")
         import traceback
@@ -54,63 +163,137 @@ def handle_message(event, say, client):
         except:
             pass
 
-def _handle_message_internal(event, say, client):
-    """Handle all incoming messages"""
+def _handle_message_internal(event, say, client, event_id=None):
+    """Filter incoming messages and hand them to the capture queue so the handler returns immediately"""
     print(f"📨 Received message: {event}")
     
     # Ignore bot messages and already processed messages
     if event.get("bot_id") or event.get("subtype"):
         print("   ↳ Skipping (bot message or subtype)")
+        EVENTS.labels("message", "skipped").inc()
         return
     
-    message_ts = event.get("ts")
-    if message_ts in processed_messages:
+    if not _is_new_event(event, event_id):
+        EVENTS.labels("message", "duplicate").inc()
         return
-    processed_messages.add(message_ts)
-    
-    text = event.get("text", "").strip()
-    user_id = event.get("user")
-    channel = event.get("channel")
     
-    if not text:
+    if not event.get("text", "").strip():
+        EVENTS.labels("message", "skipped").inc()
         return
     
-    # Get user info for context
+    entry_id = _record_capture(event, route_message(event["text"].strip()), event["text"].strip())
+    queued = _enqueue(say, _process_message, event, say, client, entry_id, entry_id=entry_id)
+    EVENTS.labels("message", "queued" if queued else "rejected").inc()
+
+
+def _is_new_event(event, event_id=None) -> bool:
+    """Record an event and report whether it is the first delivery"""
     try:
-        user_info = client.users_info(user=user_id)
-        user_name = user_info["user"]["real_name"]
+        with timed("dedup"):
+            is_new = processed_events.check_and_add(dedup_key(event.get("channel"), event.get("ts"), event_id))
+        if is_new:
+            return True
+        print("   ↳ Skipping (duplicate delivery)")
+        return False
+    except Exception as e:
+        # Capturing twice is better than dropping a message
+        print(f"   ⚠️  Dedup store error (processing anyway): {e}")
+        return True
+
+
+def _record_capture(event, command: str, text: str):
+    """Write a capture to the outbox before the handler returns, so it outlives a Notion outage or a restart"""
+    if command == "capture":
+        content, source = capture_content(text), "slack"
+    elif command == "auto" and not should_skip_auto_capture(text):
+        content, source = text, "slack-auto"
+    else:
+        return None
+    if not content:
+        return None
+    try:
+        with timed("outbox"):
+            # A mention is also delivered as a message and both record the same entry; an explicit capture's
+            # content (mention stripped) replaces what an auto-capture of the raw message put there
+            return outbox.add(content, source, channel=event.get("channel"), ts=event.get("ts"),
+                              replace=command == "capture")
+    except Exception as e:
+        print(f"   ⚠️  Outbox write failed (capturing without it): {e}")
+        return None
+
+
+def _enqueue(say, fn, *args, entry_id=None) -> bool:
+    """Submit a job to the worker pool, telling the user if we're backed up"""
+    if capture_queue.submit(_run_job, say, fn, *args):
+        return True
+    if entry_id is not None:
+        # Already safe in the outbox, so the drain loop writes (and confirms) it instead
+        outbox.release(entry_id)
+        print(f"   📥 Left outbox entry {entry_id} to the drain loop")
+        return True
+    try:
+        say("⏳ Second Brain is busy right now - please resend that in a minute.")
     except:
-        user_name = "Unknown"
+        pass
+    return False
+
+
+def _run_job(say, fn, *args):
+    """Run a queued job, reporting unexpected errors back to Slack"""
+    try:
+        with profiler.sample(), timed("job"):
+            fn(*args)
+    except Exception as e:
+        print(f"❌ Critical message handler error: {e}")
+        import traceback
+        traceback.print_exc()
+        try:
+            say(f"❌ An unexpected error occurred: {str(e)}")
+        except:
+            pass
+    finally:
+        # Logs the event's span breakdown if it was slow
+        finish()
+
+
+def _process_message(event, say, client, entry_id=None):
+    """Handle a message on a worker thread"""
+    text = event.get("text", "").strip()
+    user_id = event.get("user")
+    channel = event.get("channel")
+    
+    # Get user info for context (cached)
+    user_name = slack_helper.get_user_name(user_id)
     
-    text_lower = text.lower()
+    command = route_message(text)
     
     # Command: capture / note / save
-    if text_lower.startswith(("capture:", "note:", "save:", "capture ", "note ", "save ")):
-        handle_capture(text, user_name, say)
+    if command == "capture":
+        handle_capture(text, user_name, say, entry_id)
     
     # Command: ask / question / ?
-    elif text_lower.startswith(("ask:", "ask ", "question:", "question ", "?")):
+    elif command == "question":
         handle_question(text, say)
     
     # Command: digest / summary
-    elif "digest" in text_lower or "summary" in text_lower:
+    elif command == "digest":
         handle_digest(say)
     
     # Command: help
-    elif text_lower in ["help", "commands", "?"]:
+    elif command == "help":
         handle_help(say)
     
     # Default: Auto-capture everything else to Notion
     else:
-        handle_auto_capture(text, user_name, say)
+        handle_auto_capture(text, user_name, say, entry_id)
 
 
-def handle_capture(text: str, user_name: str, say):
+def handle_capture(text: str, user_name: str, say, entry_id: int = None):
     """Capture a note explicitly"""
     print(f"🔍 handle_capture called with text: {text}")
     
     # Remove command prefix
-    content = re.sub(r'^(capture|note|save)[:\s]+', '', text, flags=re.IGNORECASE).strip()
+    content = capture_content(text)
     
     if not content:
         say("❌ Please provide content to capture. Example: `capture: my brilliant idea`")
@@ -118,9 +301,19 @@ def handle_capture(text: str, user_name: str, say):
     
     print(f"   Content to save: {content}")
     
+    if CAPTURE_MODE == "deferred":
+        capture_deferred(content, "slack", say, render_capture_reply, "❌ Error capturing note", entry_id)
+        return
+    
     try:
+        # Hold the outbox entry from here, so the drain loop doesn't write it too while the AI call runs
+        entry = claim_capture(entry_id)
+        if entry == ELSEWHERE:
+            return
+        content = entry["content"] if entry else content
+        
         # Save to Notion first (doesn't need AI)
-        title = content[:50] + "..." if len(content) > 50 else content
+        title = fallback_title(content)
         tags = []
         
         print(f"   Saving to Notion: {title}")
@@ -128,28 +321,25 @@ def handle_capture(text: str, user_name: str, say):
         # Try AI categorization, but don't fail if rate limited
         follow_up = None
         try:
-            ai_analysis = ai.categorize_note(content)
-            title_prompt = f"Generate a short, descriptive title (max 6 words) for this note: {content}"
-            title = ai.process(title_prompt).strip('"').strip("'").strip()
-            tags = ai_analysis.get("tags", [])
-            follow_up = ai_analysis.get("follow_up_date")
+            analysis = analyze_note(content)
+            title = analysis.title
+            tags = analysis.tags
+            follow_up = analysis.follow_up_date
             print(f"   AI title: {title}, tags: {tags}, follow_up: {follow_up}")
         except Exception as ai_error:
             print(f"   AI error (using fallback): {ai_error}")
         
-        # Save to Notion
-        result = notion.add_note(
-            title=title,
-            content=content,
-            tags=tags,
-            source="slack",
-            follow_up_date=follow_up
-        )
+        # Save to Notion (or leave it in the outbox for a retry)
+        result = save_note(entry, content, "slack", title, tags, follow_up)
+        if result == ELSEWHERE:
+            return
+        if result == QUEUED:
+            say(render_queued_reply(title))
+            return
         
         print(f"   ✅ Saved to Notion! Page ID: {result.get('id')}")
         
-        tags_str = ", ".join(tags) or "none"
-        say(f"✅ *Captured to Second Brain!*\n📝 *Title:* {title}\n🏷️ *Tags:* {tags_str}")
+        say(render_capture_reply(title, tags))
         
     except Exception as e:
         print(f"   ❌ Error: {e}")
@@ -158,36 +348,84 @@ def handle_capture(text: str, user_name: str, say):
         say(f"❌ Error capturing note: {str(e)}")
 
 
+def claim_capture(entry_id):
+    """Claim a job's outbox entry; ELSEWHERE if the drain loop or the job for another event about the same message
+    (a mention arrives as a message too) already has it, None if the capture isn't in the outbox. The entry's
+    content is what gets captured, which may be the other event's (see _record_capture)"""
+    if entry_id is None:
+        return None
+    entry = outbox.claim(entry_id)
+    if entry is None:
+        print(f"   ↳ Outbox entry {entry_id} is already being captured by another job, leaving it to that one")
+        return ELSEWHERE
+    return entry
+
+
+def save_note(entry, content: str, source: str, title: str, tags: list = None, follow_up_date: str = None):
+    """Write a capture to Notion through its claimed outbox entry (or a new one); returns what Outbox.deliver does"""
+    if entry is None:
+        try:
+            entry_id = outbox.add(content, source)
+        except Exception as e:
+            print(f"   ⚠️  Outbox write failed (saving without it): {e}")
+            return notion.add_note(title=title, content=content, tags=tags, source=source, follow_up_date=follow_up_date)
+        return outbox.deliver(entry_id, notion, title=title, tags=tags, follow_up_date=follow_up_date)
+    return outbox.deliver(entry["id"], notion, title=title, tags=tags, follow_up_date=follow_up_date, entry=entry)
+
+
+def enrich(content: str):
+    """(title, tags, follow-up) for a capture the outbox is retrying, with a plain title if the AI call fails"""
+    try:
+        analysis = analyze_note(content)
+        return analysis.title, analysis.tags, analysis.follow_up_date
+    except Exception as ai_err:
+        print(f"   AI error (using fallback): {ai_err}")
+        return fallback_title(content), [], None
+
+
+def confirm_delivered(entry: dict):
+    """Confirm a capture in its channel once the outbox has written it"""
+    if entry and entry.get("channel"):
+        render = render_auto_capture_reply if entry["source"] == "slack-auto" else render_capture_reply
+        slack_helper.client.chat_postMessage(channel=entry["channel"], text=render(entry["title"], entry["tags"]))
+
+
+def analyze_note(content: str):
+    """Tag locally when the classifier is confident, otherwise ask the LLM"""
+    return classifier.analyze(content) or ai.analyze_note(content)
+
+
 def handle_question(text: str, say):
     """Answer a question using the Second Brain"""
     # Remove command prefix
-    question = re.sub(r'^(ask|question|\?)[:\s]+', '', text, flags=re.IGNORECASE).strip()
+    question = question_text(text)
     
     if not question:
         say("❌ Please ask a question. Example: `ask: what did I note about project X?`")
         return
     
+    stream = None
     try:
-        say("🤔 Thinking...")
-        
-        # Search Notion for context
-        search_results = notion.search_notes(question)
-        context_notes = []
+        reply = say("🤔 Thinking...")
         
-        for result in search_results[:5]:
-            try:
-                title = result.get("properties", {}).get("Name", {}).get("title", [{}])[0].get("text", {}).get("content", "")
-                if title:
-                    context_notes.append(title)
-            except:
-                pass
-        
-        # Get AI answer with context
-        response = ai.answer_question(question, context_notes)
+        # Search the local note index, then pack the most relevant chunks into the token budget
+        context = build_context(question, notion.find_notes(question, limit=CONTEXT_MAX_NOTES))
+        print(f"   Context: {context.tokens} tokens from {len(context.sources)} notes ({context.dropped_chunks} chunks dropped)")
         
-        say(f"🧠 *Answer:*\n{response}")
+        # Stream the answer into the "Thinking..." message as it is generated
+        stream = SlackMessageStream(slack_helper.client, reply["channel"], reply["ts"], prefix="🧠 *Answer:*\n")
+        for delta in ai.answer_question_stream(question, context):
+            stream.write(delta)
+        stream.write(render_sources(context.sources))
+        stream.close()
         
     except Exception as e:
+        if stream:
+            try:
+                stream.close(f"❌ Error processing question: {str(e)}")
+                return
+            except Exception:
+                pass
         say(f"❌ Error processing question: {str(e)}")
 
 
@@ -197,16 +435,8 @@ def handle_digest(say):
         print("📊 Generating digest...")
         say("📊 Generating digest...")
         
-        recent_notes = notion.get_recent_notes(limit=10)
-        note_titles = []
-        
-        for note in recent_notes:
-            try:
-                title = note.get("properties", {}).get("Name", {}).get("title", [{}])[0].get("text", {}).get("content", "")
-                if title:
-                    note_titles.append(title)
-            except:
-                pass
+        recent_notes = notion.find_recent_notes(limit=10)
+        note_titles = [note["title"] for note in recent_notes if note["title"]]
         
         if not note_titles:
             say("📭 No recent notes found in your Second Brain.")
@@ -214,7 +444,9 @@ def handle_digest(say):
         
         # Try AI summary, but fallback to simple list
         try:
-            summary = ai.generate_daily_summary(note_titles)
+            summary = ai.generate_daily_summary([
+                digest_text(note["title"], note["body"]) for note in recent_notes if note["title"]
+            ])
             say(f"📊 *Daily Digest:*\n\n{summary}")
         except Exception as ai_err:
             print(f"   AI failed, using simple list: {ai_err}")
@@ -229,19 +461,29 @@ def handle_digest(say):
         say(f"❌ Error generating digest: {str(e)}")
 
 
-def handle_auto_capture(text: str, user_name: str, say):
+def handle_auto_capture(text: str, user_name: str, say, entry_id: int = None):
     """Auto-capture any message to Notion (default behavior)"""
-    # Skip very short messages or common chat phrases
-    skip_phrases = ["hi", "hello", "hey", "ok", "okay", "thanks", "thank you", "yes", "no", "lol", "haha"]
-    if len(text) < 10 or text.lower() in skip_phrases:
-        print(f"   ↳ Skipping (too short or common phrase)")
+    # Skip short messages, chat phrases and small talk
+    if classifier.should_ignore(text):
+        if entry_id is not None:
+            outbox.discard(entry_id)
         return
     
     print(f"🔍 Auto-capturing: {text}")
     
+    if CAPTURE_MODE == "deferred":
+        capture_deferred(text, "slack-auto", say, render_auto_capture_reply, "❌ Error auto-capturing message",
+                         entry_id)
+        return
+    
     try:
+        entry = claim_capture(entry_id)
+        if entry == ELSEWHERE:
+            return
+        text = entry["content"] if entry else text
+        
         # Use simple title without AI to avoid rate limits
-        title = text[:50] + "..." if len(text) > 50 else text
+        title = fallback_title(text)
         tags = []
         
         print(f"   Saving to Notion...")
@@ -249,29 +491,24 @@ def handle_auto_capture(text: str, user_name: str, say):
         # Try AI only if available
         follow_up = None
         try:
-            ai_analysis = ai.categorize_note(text)
-            title_prompt = f"Generate a short, descriptive title (max 6 words) for this note: {text}"
-            title = ai.process(title_prompt).strip('"').strip("'").strip()
-            tags = ai_analysis.get("tags", [])
-            follow_up = ai_analysis.get("follow_up_date")
+            analysis = analyze_note(text)
+            title = analysis.title
+            tags = analysis.tags
+            follow_up = analysis.follow_up_date
             print(f"   AI title: {title}, tags: {tags}, follow_up: {follow_up}")
         except Exception as ai_err:
             print(f"   AI skipped (using simple title): {ai_err}")
         
-        # Save to Notion
-        result = notion.add_note(
-            title=title,
-            content=text,
-            tags=tags,
-            source="slack-auto",
-            follow_up_date=follow_up
-        )
-        
-        print(f"   ✅ Saved to Notion! Page ID: {result.get('id')}")
+        # Save to Notion (or leave it in the outbox for a retry)
+        result = save_note(entry, text, "slack-auto", title, tags, follow_up)
+        if result == ELSEWHERE:
+            return
+        if result != QUEUED:
+            print(f"   ✅ Saved to Notion! Page ID: {result.get('id')}")
         
         # Try to confirm in Slack (but don't fail if can't)
         try:
-            say(f"💾 Auto-saved: *{title}*")
+            say(render_auto_capture_reply(title, tags) if result != QUEUED else render_queued_reply(title))
         except Exception as slack_err:
             print(f"   ⚠️  Slack confirmation failed (but Notion save succeeded): {slack_err}")
         
@@ -286,40 +523,88 @@ def handle_auto_capture(text: str, user_name: str, say):
             pass  # Don't fail if Slack notification fails
 
 
+def capture_deferred(content: str, source: str, say, render, error_prefix: str, entry_id: int = None):
+    """Phase 1: save the raw note and confirm instantly, then queue AI enrichment"""
+    try:
+        entry = claim_capture(entry_id)
+        if entry == ELSEWHERE:
+            return
+        content = entry["content"] if entry else content
+        title = fallback_title(content)
+        result = save_note(entry, content, source, title)
+        if result == ELSEWHERE:
+            return
+        if result == QUEUED:
+            say(render_queued_reply(title))
+            return
+        print(f"   ✅ Saved raw note to Notion! Page ID: {result.get('id')}")
+    except Exception as e:
+        print(f"   ❌ Error: {e}")
+        import traceback
+        traceback.print_exc()
+        try:
+            say(f"{error_prefix}: {str(e)}")
+        except:
+            pass
+        return
+    
+    reply = None
+    try:
+        reply = say(render(title, [], pending=True))
+    except Exception as slack_err:
+        print(f"   ⚠️  Slack confirmation failed (but Notion save succeeded): {slack_err}")
+    
+    job = (result["id"], content, title, reply, render)
+    if not capture_queue.submit(enrich_saved_note, *job):
+        enrich_saved_note(*job)
+
+
+def enrich_saved_note(page_id: str, content: str, title: str, reply, render):
+    """Phase 2: patch the saved page with AI title/tags/follow-up and edit the confirmation in place"""
+    tags = []
+    try:
+        analysis = analyze_note(content)
+        notion.enrich_note(page_id, analysis.title, tags=analysis.tags, follow_up_date=analysis.follow_up_date)
+        title, tags = analysis.title, analysis.tags
+        print(f"   ✅ Enriched {page_id}: {title}, tags: {tags}, follow_up: {analysis.follow_up_date}")
+    except Exception as ai_err:
+        print(f"   AI enrichment skipped (keeping simple title): {ai_err}")
+    
+    if reply:
+        try:
+            slack_helper.client.chat_update(channel=reply["channel"], ts=reply["ts"], text=render(title, tags))
+        except Exception as slack_err:
+            print(f"   ⚠️  Could not update Slack confirmation: {slack_err}")
+
+
 def handle_help(say):
     """Show help message"""
-    help_text = """
-🧠 *Second Brain Commands:*
-
-📝 *Capture Notes:*
-• `capture: your thought here`
-• `note: important idea`
-• `save: meeting notes`
-
-❓ *Ask Questions:*
-• `ask: what did I note about X?`
-• `question: summarize my project notes`
-
-📊 *Get Summaries:*
-• `digest` - Get daily summary
-• `summary` - Same as digest
-
-💡 *Tips:*
-• Any message over 10 chars is auto-saved
-• Short messages (hi, ok, etc.) are ignored
-• All notes are AI-categorized automatically
-"""
-    say(help_text)
+    say(HELP_TEXT)
 
 
 @app.event("app_mention")
-def handle_mention(event, say):
+def handle_mention(event, say, body):
     """Handle @mentions of the bot"""
+    observe_delivery(event)
+    recorder.record("app_mention", body)
+    with trace("app_mention", body.get("event_id"), channel=event.get("channel"), ts=event.get("ts")), \
+            timed("receive"):
+        if not _is_new_event(event, body.get("event_id")):
+            EVENTS.labels("app_mention", "duplicate").inc()
+            return
+        text = strip_mention(event.get("text", ""))
+        entry_id = _record_capture(event, route_mention(text), text) if text else None
+        queued = _enqueue(say, _process_mention, event, say, entry_id, entry_id=entry_id)
+        EVENTS.labels("app_mention", "queued" if queued else "rejected").inc()
+
+
+def _process_mention(event, say, entry_id=None):
+    """Handle a mention on a worker thread"""
     text = event.get("text", "")
     user_id = event.get("user")
     
     # Remove the mention from text
-    text = re.sub(r'<@[A-Z0-9]+>', '', text).strip()
+    text = strip_mention(text)
     
     print(f"📨 Mention received: {text}")
     
@@ -327,51 +612,86 @@ def handle_mention(event, say):
         handle_help(say)
         return
     
-    # Get user name for capture attribution
-    user_name = "Unknown"
-    try:
-        from slack_client_wrapper import SlackBrain
-        slack = SlackBrain()
-        user_info = slack.client.users_info(user=user_id)
-        user_name = user_info["user"]["real_name"]
-    except:
-        pass
+    # Get user name for capture attribution (cached)
+    user_name = slack_helper.get_user_name(user_id)
     
-    text_lower = text.lower()
+    command = route_mention(text)
     
     # Route to appropriate handler based on command
-    if text_lower.startswith(("ask:", "ask ", "question:", "question ", "?")):
+    if command == "question":
         handle_question(text, say)
-    elif "digest" in text_lower or "summary" in text_lower:
+    elif command == "digest":
         handle_digest(say)
-    elif text_lower in ["help", "commands"]:
+    elif command == "help":
         handle_help(say)
     else:
         # Default: capture anything else (with or without "capture:" prefix)
         # Remove "capture:", "note:", "save:" if present
-        content = re.sub(r'^(capture|note|save)[:\s]+', '', text, flags=re.IGNORECASE).strip()
-        handle_capture(f"capture: {content}", user_name, say)
+        content = capture_content(text)
+        handle_capture(f"capture: {content}", user_name, say, entry_id)
+
+
+def warm_up():
+    """Build the shared clients and start the background jobs that need them, off the startup path"""
+    start = time.perf_counter()
+    try:
+        notion.resolve()
+        ai.resolve()
+        classifier.resolve()
+        print(f"✅ Clients ready in {time.perf_counter() - start:.2f}s")
+        
+        # Keep the local note mirror in sync with Notion
+        sync.start()
+        print(f"✅ Notion sync running every {sync.interval:.0f}s")
+    except Exception as e:
+        # Handlers build whatever is missing on first use
+        print(f"⚠️  Client warm-up failed: {e}")
+    
+    # Warm the user cache so name lookups on the hot path are dictionary hits
+    if USER_CACHE_WARM:
+        try:
+            print(f"✅ User cache warmed ({slack_helper.users.warm()} users)")
+        except Exception as e:
+            print(f"⚠️  User cache warm-up failed: {e}")
+
+
+def warm_connections():
+    """Open keep-alive connections to Notion, OpenAI and Slack before the first event needs them"""
+    try:
+        print(f"✅ {warm()} upstream connections open")
+    except Exception as e:
+        print(f"⚠️  Connection warm-up failed: {e}")
+
+
+def start_services(port: int):
+    """Start the health check server, capture queue and client warm-up without waiting on any of them"""
+    def run_flask():
+        flask_app.run(host='0.0.0.0', port=port, debug=False, use_reloader=False, threaded=True)
+    
+    threading.Thread(target=run_flask, daemon=True).start()
+    print(f"✅ Health check server starting on port {port}")
+    
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    threading.Thread(target=warm_connections, name="warm-connections", daemon=True).start()
+    
+    capture_queue.start()
+    print(f"✅ Capture queue running ({capture_queue.workers} workers, max depth {capture_queue.max_depth})")
+    
+    # Retries captures Notion failed, and picks up any a restart interrupted
+    outbox.start(notion, prepare=enrich, on_delivered=confirm_delivered)
+    print(f"✅ Outbox draining every {outbox.interval:.0f}s ({outbox.stats()['pending']} captures pending)")
 
 
 def main():
     """Start the Slack bot listener with health check server for Cloud Run"""
+    global socket_handler
     print("=" * 50)
     print("🧠 SECOND BRAIN - Slack Listener")
     print("=" * 50)
     print("\n✅ Bot is starting...")
     
-    # Start Flask health check server in background thread FIRST
-    port = int(os.getenv("PORT", 8080))
-    
-    def run_flask():
-        flask_app.run(host='0.0.0.0', port=port, debug=False, use_reloader=False, threaded=True)
-    
-    flask_thread = threading.Thread(target=run_flask, daemon=True)
-    flask_thread.start()
-    
-    # Give Flask time to start accepting connections
-    time.sleep(2)
-    print(f"✅ Health check server running on port {port}")
+    # Health checks answer straight away; /ready stays 503 until Slack is connected
+    start_services(int(os.getenv("PORT", 8080)))
     
     print("📡 Listening for Slack messages...")
     print("\nCommands:")
@@ -389,12 +709,16 @@ def main():
     if app_token:
         # Use Socket Mode (recommended, no public URL needed)
         print("✅ Starting Socket Mode handler...")
-        handler = SocketModeHandler(app, app_token)
-        handler.start()
+        socket_handler = SocketModeHandler(app, app_token)
+        socket_handler.connect()
+        ready.set()
+        print("✅ Connected to Slack")
+        threading.Event().wait()
     else:
         # Fallback: Start with HTTP server (needs ngrok or public URL)
         print("⚠️  No SLACK_APP_TOKEN found. Using HTTP mode.")
         print("   For Socket Mode, add SLACK_APP_TOKEN to your .env file")
+        ready.set()
         app.start(port=3000)
 
 
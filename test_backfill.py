@@ -0,0 +1,22 @@
+"""
+Backfill checkpoints: a resumed run never re-imports a message that already reached Notion
+Run: pytest test_backfill.py
+"""
+
+
+def test_an_import_is_checkpointed_before_the_next_message(tmp_path):
+    # Imported here: importing config at collection time would pin the environment before test_benchmark.py
+    # points it at the stand-ins
+    from backfill import Checkpoint
+    path = str(tmp_path / "backfill.json")
+    checkpoint = Checkpoint(path, "C1")
+    checkpoint.open_page(0, "next", ["1.0", "2.0", "3.0"])
+    checkpoint.finish(0, "1.0", "skipped")
+    checkpoint.finish(0, "2.0", "imported")
+
+    # Killed here, before the page finished or save() ran
+    resumed = Checkpoint(path, "C1")
+    assert resumed.load()
+    assert resumed.is_done("2.0") and resumed.is_done("1.0")
+    assert not resumed.is_done("3.0")
+    assert resumed.state["imported"] == 1
@@ -0,0 +1,108 @@
+"""
+Latency/throughput regression gate for the Slack handlers, run against local API stand-ins (see benchmark.py)
+Run: pytest test_benchmark.py
+Re-record the baseline after an intended change: python benchmark.py --update-baseline
+"""
+import os
+import time
+
+import pytest
+
+from benchmark import Benchmark, PATHS, PROFILES, Upstream, connection_run, load_baseline, scaled
+
+# How much worse than the baseline a path may get before the gate fails
+TOLERANCE = float(os.getenv("BENCHMARK_TOLERANCE", "0.3"))
+# Runs per path; the gate compares their median, so a run the host happened to stall doesn't fail it
+RUNS = int(os.getenv("BENCHMARK_RUNS", "3"))
+
+
+@pytest.fixture(scope="module")
+def bench():
+    return Benchmark.get()
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return load_baseline()
+
+
+@pytest.mark.parametrize("path", PATHS)
+def test_no_regression(bench, baseline, path):
+    summary, reference = bench.compare(path, RUNS, messages=baseline["messages"], concurrency=baseline["concurrency"],
+                                       upstreams=PROFILES[baseline["profile"]])
+    # The baseline as it would have measured on the machine as it is now
+    expected = scaled(baseline["results"][path], reference, baseline["reference"])
+    print(f"{path}: {summary} (baseline {expected}, reference {reference})")
+
+    assert summary["errors"] == 0
+    assert summary["p95_ms"] <= expected["p95_ms"] * (1 + TOLERANCE), \
+        f"{path} p95 {summary['p95_ms']}ms is over baseline {expected['p95_ms']}ms + {TOLERANCE:.0%}"
+    assert summary["throughput"] >= expected["throughput"] * (1 - TOLERANCE), \
+        f"{path} {summary['throughput']} msg/s is under baseline {expected['throughput']} msg/s - {TOLERANCE:.0%}"
+
+
+def test_retries_absorb_throttling_and_errors(bench):
+    flaky = {name: Upstream(5, 10, error_rate=0.05, throttle_rate=0.1, retry_after=0.01)
+             for name in ("notion", "openai", "slack")}
+    # A 500 on a Slack post isn't retried (the message may have gone out), so Slack is only throttled; a Notion
+    # write that fails is left to the outbox and answered with the queued reply
+    flaky["slack"].error_rate = 0.0
+    before = {name: dict(stats) for name, stats in bench.backends.stats.items()}
+    result = bench.run("capture", messages=50, concurrency=4, upstreams=flaky)
+
+    throttled = sum(s["throttled"] - before[name]["throttled"] for name, s in bench.backends.stats.items())
+    assert throttled > 0
+    assert result.errors == 0
+
+
+def test_cold_start(bench, baseline):
+    if "startup" not in baseline:
+        pytest.skip("baseline has no startup timings (python benchmark.py --update-baseline)")
+    startup = bench.startup()
+    expected = baseline["startup"]
+    print(f"startup: {startup} (baseline {expected})")
+
+    assert startup["first_event_ms"] <= expected["first_event_ms"] * (1 + TOLERANCE), \
+        f"first event handled {startup['first_event_ms']}ms after spawn, over baseline {expected['first_event_ms']}ms + {TOLERANCE:.0%}"
+
+
+def test_connection_reuse(bench, baseline):
+    if "connections" not in baseline:
+        pytest.skip("baseline has no connection timings (python benchmark.py --update-baseline)")
+    summary, reference, opened = connection_run(bench, baseline["messages"], baseline["concurrency"], RUNS)
+    expected = scaled(baseline["connections"], reference, baseline["reference"])
+    print(f"connect: {summary} {opened} (baseline {expected}, reference {reference})")
+
+    assert summary["errors"] == 0
+    assert summary["p95_ms"] <= expected["p95_ms"] * (1 + TOLERANCE), \
+        f"capture p95 {summary['p95_ms']}ms with connection setup is over baseline {expected['p95_ms']}ms + {TOLERANCE:.0%}"
+    assert summary["throughput"] >= expected["throughput"] * (1 - TOLERANCE), \
+        f"capture {summary['throughput']} msg/s with connection setup is under baseline {expected['throughput']} msg/s - {TOLERANCE:.0%}"
+    # Callers never need more connections than there are of them; without reuse it's one per request
+    for name, count in opened.items():
+        assert count <= baseline["concurrency"], f"{name}: {count} new connections for {baseline['concurrency']} callers"
+
+
+@pytest.mark.parametrize("chatter", [True, False], ids=["message_ignored", "message_captured"])
+def test_mention_and_message_of_one_post_capture_it_once(bench, monkeypatch, chatter):
+    # Slack delivers a mention as an app_mention and as a message with the same ts; both share one outbox entry
+    from commands import route_mention, route_message, strip_mention
+    listener = bench.listener
+    bench.backends.configure(PROFILES["gate"])
+    monkeypatch.setattr(listener.classifier.resolve(), "should_ignore", lambda text: chatter)
+    text = "<@UBENCH> book the dentist for next month"
+    event = {"channel": "CBENCH", "user": "UBENCH", "ts": f"{time.time():.6f}", "text": text}
+    message_entry = listener._record_capture(event, route_message(text), text)
+    mention_entry = listener._record_capture(event, route_mention(strip_mention(text)), strip_mention(text))
+    assert message_entry == mention_entry
+
+    replies = []
+    say = bench._say(replies)
+    listener._process_message(event, say, None, message_entry)
+    listener._process_mention(event, say, mention_entry)
+
+    entry = listener.outbox.get(mention_entry)
+    assert entry["state"] == "done"
+    assert entry["content"] == "book the dentist for next month"
+    # Whichever job captured it replied; the other stayed quiet rather than report an outage
+    assert len(replies) == 1 and not replies[0].startswith(("❌", "📥"))
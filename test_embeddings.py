@@ -0,0 +1,30 @@
+"""
+Vector index: search results stay paired with the right page ids while notes are removed concurrently
+Run: pytest test_embeddings.py
+"""
+import numpy as np
+
+
+def test_a_remove_during_search_doesnt_mislabel_results(tmp_path):
+    # Imported here: importing config at collection time would pin the environment before test_benchmark.py
+    # points it at the stand-ins
+    from embeddings import HashingEmbedder, VectorIndex, _normalize
+    embedder = HashingEmbedder()
+    index = VectorIndex(embedder, path=str(tmp_path))
+    notes = {"page-a": "dentist appointment", "page-b": "quarterly budget review", "page-c": "dentist bill budget"}
+    index.add_many(list(notes.items()))
+
+    embed = embedder.embed
+
+    def remove_while_embedding(texts):
+        # Another thread removes a note while this search embeds its query; the last row moves into its slot
+        index.remove("page-a")
+        return embed(texts)
+    embedder.embed = remove_while_embedding
+
+    results = index.search("dentist budget", limit=3)
+
+    query = _normalize(embed(["dentist budget"]))[0]
+    for page_id, score in results:
+        assert np.isclose(score, _normalize(embed([notes[page_id]]))[0] @ query)
+    assert {page_id for page_id, score in results} == {"page-b", "page-c"}
@@ -0,0 +1,113 @@
+"""
+Search and digest read the local mirror only once a full sync pass has filled it, and Notion until then (the async
+brain through its async client)
+Run: pytest test_notion_sync.py
+"""
+import pytest
+
+
+def page(page_id: str, title: str, edited: str) -> dict:
+    return {"id": page_id, "created_time": edited, "last_edited_time": edited,
+            "properties": {"Name": {"title": [{"plain_text": title}]}, "Tags": {"multi_select": []},
+                           "Created": {"date": {"start": edited}}}}
+
+
+NOTION = [page(f"page-{i}", f"dentist appointment {i}", f"2026-01-01T00:{i:02d}:00.000Z") for i in range(5)]
+
+
+@pytest.fixture
+def brain(monkeypatch, tmp_path):
+    """A NotionBrain over a fresh on-disk index whose Notion calls return NOTION, keyword-only"""
+    # Imported here: importing config at collection time would pin the environment before test_benchmark.py
+    # points it at the stand-ins
+    from note_index import NoteIndex
+    from notion_client_wrapper import NotionBrain
+    brain = NotionBrain(index=NoteIndex(str(tmp_path / "notes.db")))
+    monkeypatch.setattr(NotionBrain, "vectors", property(lambda self: None))
+    monkeypatch.setattr(brain, "search_notes", lambda query: NOTION)
+    monkeypatch.setattr(brain, "get_recent_notes", lambda limit=5: NOTION[::-1][:limit])
+    monkeypatch.setattr(brain, "iter_changed_pages", lambda since=None: iter(NOTION))
+    monkeypatch.setattr(brain, "with_bodies", lambda notes: notes)
+    monkeypatch.setattr(brain.blocks, "fetch_many", lambda pages: {page_id: [] for page_id, edited in pages})
+    yield brain
+    brain.index.close()
+
+
+def test_a_partial_mirror_falls_back_to_notion(brain):
+    # A note the listener just wrote, before the first sync has run
+    brain.index.upsert("page-new", title="dentist follow-up")
+
+    assert len(brain.find_notes("dentist", limit=5)) == 5
+    assert [note["page_id"] for note in brain.find_recent_notes(limit=2)] == ["page-4", "page-3"]
+
+
+def test_the_mirror_answers_once_a_full_sync_completes(brain):
+    from note_index import NoteIndex
+    from notion_sync import NotionSync
+    NotionSync(brain).tick()
+    brain.index.upsert("page-new", title="dentist follow-up", created="2026-02-01T00:00:00.000Z")
+
+    assert "page-new" in {note["page_id"] for note in brain.find_notes("dentist", limit=10)}
+    assert brain.find_recent_notes(limit=1)[0]["page_id"] == "page-new"
+    # The marker outlives a restart
+    assert NoteIndex(brain.index.path).synced()
+
+
+def test_an_interrupted_first_sync_doesnt_count(brain, monkeypatch):
+    from notion_sync import NotionSync
+    sync = NotionSync(brain, embed_batch_size=2)
+    fetch_many = brain.blocks.fetch_many
+    calls = []
+
+    def fail_second_batch(pages):
+        calls.append(pages)
+        return {} if len(calls) == 2 else fetch_many(pages)
+    monkeypatch.setattr(brain.blocks, "fetch_many", fail_second_batch)
+
+    with pytest.raises(RuntimeError):
+        sync.tick()
+    assert brain.index.count() == 2
+    assert not brain.index.synced()
+
+
+@pytest.fixture
+def async_brain(brain, monkeypatch):
+    """An AsyncNotionBrain over `brain` whose async client answers from NOTION; the sync client mustn't be used"""
+    import httpx
+    from notion_client_wrapper import AsyncNotionBrain, AsyncRateLimitedClient
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.path)
+        if request.url.path.endswith("/search"):
+            return httpx.Response(200, json={"object": "list", "results": NOTION, "has_more": False})
+        if request.url.path.endswith("/databases/db"):
+            return httpx.Response(200, json={"object": "database", "id": "db", "data_sources": [{"id": "ds"}]})
+        if request.url.path.endswith("/query"):
+            return httpx.Response(200, json={"object": "list", "results": NOTION[::-1], "has_more": False})
+        return httpx.Response(200, json={"object": "list", "results": [
+            {"type": "paragraph", "paragraph": {"rich_text": [{"plain_text": "body"}]}}], "has_more": False})
+
+    def sync_call(*args, **kwargs):
+        raise AssertionError("the async brain called Notion through the sync client")
+    for name in ("search_notes", "get_recent_notes", "find_note", "with_bodies"):
+        monkeypatch.setattr(brain, name, sync_call)
+    async_brain = AsyncNotionBrain(brain)
+    async_brain.database_id = "db"
+    async_brain.client = AsyncRateLimitedClient(auth="secret", base_url="https://notion.test",
+                                                client=httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return async_brain, requests
+
+
+def test_the_async_brain_reads_notion_through_its_async_client(async_brain):
+    import asyncio
+    async_brain, requests = async_brain
+
+    notes = asyncio.run(async_brain.find_notes("dentist", limit=2))
+    recent = asyncio.run(async_brain.find_recent_notes(limit=2))
+    found = asyncio.run(async_brain.find_note("dentist appointment 3", "2026-01-01T00:03:00.000Z"))
+
+    assert [note["body"] for note in notes] == ["body", "body"]
+    assert [note["page_id"] for note in recent] == ["page-4", "page-3"]
+    assert found["id"] == "page-3"
+    assert any(path.endswith("/search") for path in requests)
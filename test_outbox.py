@@ -0,0 +1,136 @@
+"""
+Outbox claims and leases: one attempt writes each capture, whoever holds it, and retries don't duplicate pages
+Run: pytest test_outbox.py
+"""
+import threading
+import time
+
+import pytest
+
+
+class FakeNotion:
+    """add_note/find_note over a dict; `lose_response` makes the next write land but raise as if the reply was lost"""
+    def __init__(self):
+        self.pages = {}
+        self.writes = 0
+        self.lose_response = False
+
+    def add_note(self, title, content, tags=None, source=None, follow_up_date=None, created=None):
+        self.writes += 1
+        page = {"id": f"page-{self.writes}", "title": title, "created": created}
+        self.pages[(title, created)] = page
+        if self.lose_response:
+            self.lose_response = False
+            raise TimeoutError("read timed out")
+        return page
+
+    def find_note(self, title, created):
+        return self.pages.get((title, created))
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    # Imported here: importing config at collection time would pin the environment before test_benchmark.py
+    # points it at the stand-ins
+    import outbox as module
+    box = module.Outbox(path=str(tmp_path / "outbox.db"), lease=0.2, retry_base=0, interval=0.01)
+    yield module, box
+    box.close()
+
+
+def test_drain_takes_over_an_expired_lease_and_the_late_job_stands_down(outbox):
+    module, box = outbox
+    brain = FakeNotion()
+    entry_id = box.add("remember the milk", "slack", channel="C1", ts="1718000000.000100")
+    job = box.claim(entry_id)
+
+    assert box.due() == []  # the job's lease keeps the drain off it
+    time.sleep(0.25)
+    assert box.due() == [entry_id]
+    assert box.drain(brain, prepare=lambda content: ("Milk", [], None)) == 1
+
+    # The job finishes its AI call after the drain wrote the page: it mustn't write again or report an outage
+    assert box.deliver(entry_id, brain, title="Milk", entry=job) == module.ELSEWHERE
+    assert brain.writes == 1
+    assert box.get(entry_id)["state"] == "done"
+
+
+def test_a_job_keeps_its_claim_through_a_slow_ai_call(outbox):
+    module, box = outbox
+    brain = FakeNotion()
+    entry_id = box.add("remember the milk", "slack", channel="C1", ts="1718000000.000100")
+    job = box.claim(entry_id)
+    time.sleep(0.25)  # longer than the lease, but nobody else claimed it
+
+    page = box.deliver(entry_id, brain, title="Milk", entry=job)
+
+    assert page["id"] == "page-1"
+    assert box.get(entry_id)["page_id"] == "page-1"
+
+
+def test_only_one_concurrent_claim_wins(outbox):
+    module, box = outbox
+    brain = FakeNotion()
+    # A message and a mention of the same post record the same entry
+    entry_id = box.add("remember the milk", "slack", channel="C1", ts="1718000000.000100")
+    assert box.add("remember the milk", "slack", channel="C1", ts="1718000000.000100") == entry_id
+
+    claims, start = [], threading.Barrier(8)
+
+    def claim():
+        start.wait()
+        claims.append(box.claim(entry_id))
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    winners = [entry for entry in claims if entry is not None]
+    assert len(winners) == 1
+    assert box.deliver(entry_id, brain, title="Milk") == module.ELSEWHERE
+    assert box.deliver(entry_id, brain, title="Milk", entry=winners[0])["id"] == "page-1"
+    assert box.deliver(entry_id, brain, title="Milk") == module.ELSEWHERE  # done now
+    assert brain.writes == 1
+
+
+def test_retry_finds_the_page_a_lost_response_created(outbox):
+    module, box = outbox
+    brain = FakeNotion()
+    brain.lose_response = True
+    entry_id = box.add("remember the milk", "slack", channel="C1", ts="1718000000.000100")
+
+    assert box.deliver(entry_id, brain, title="Milk", tags=["errand"]) == module.QUEUED
+    assert box.get(entry_id)["state"] == "pending"
+
+    # The drain's retry looks the page up by title and Created time instead of writing it again
+    assert box.drain(brain, prepare=lambda content: ("A different title", [], None)) == 1
+    assert brain.writes == 1
+    assert box.get(entry_id)["page_id"] == "page-1"
+    assert box.stats()["already_written"] == 1
+
+
+def test_an_explicit_capture_replaces_the_raw_message_it_shares_an_entry_with(outbox):
+    module, box = outbox
+    message = box.add("<@UBOT> remember the milk", "slack-auto", channel="C1", ts="1718000000.000100")
+    mention = box.add("remember the milk", "slack", channel="C1", ts="1718000000.000100", replace=True)
+
+    assert mention == message
+    assert box.get(mention)["content"] == "remember the milk"
+    assert box.get(mention)["source"] == "slack"
+
+
+def test_discarding_one_event_leaves_the_entry_to_the_other(outbox):
+    module, box = outbox
+    brain = FakeNotion()
+    message = box.add("<@UBOT> ok", "slack-auto", channel="C1", ts="1718000000.000100")
+    mention = box.add("ok", "slack", channel="C1", ts="1718000000.000100", replace=True)
+
+    # The message job finds it's chatter; the mention job still captures it
+    assert box.discard(message) is False
+    assert box.deliver(mention, brain, title="Ok")["id"] == "page-1"
+
+    # With no other event on it, the entry goes
+    lone = box.add("<@UBOT> thanks", "slack-auto", channel="C1", ts="1718000000.000200")
+    assert box.discard(lone) is True
+    assert box.get(lone) is None
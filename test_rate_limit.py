@@ -0,0 +1,80 @@
+"""
+Rate limiter retries against a mocked Notion API: reads retry transient failures, writes only when they never landed
+Run: pytest test_rate_limit.py
+"""
+import httpx
+import pytest
+from notion_client.errors import APIResponseError, RequestTimeoutError
+
+
+@pytest.fixture
+def notion_api(monkeypatch):
+    """A RateLimitedClient whose transport answers from a list of responses (or exceptions to raise)"""
+    # Imported here: importing config at collection time would pin the environment before test_benchmark.py
+    # points it at the stand-ins
+    from notion_client_wrapper import RateLimitedClient
+    from rate_limit import limiters
+    monkeypatch.setattr(limiters["notion"], "base_delay", 0.01)
+    requests, responses = [], []
+
+    def handler(request):
+        requests.append(request)
+        response = responses.pop(0) if responses else (200, {"object": "page", "id": "page-1"})
+        if isinstance(response, Exception):
+            raise response
+        status, body = response
+        return httpx.Response(status, json=body)
+
+    client = RateLimitedClient(auth="secret", base_url="https://notion.test",
+                               client=httpx.Client(transport=httpx.MockTransport(handler)))
+    return requests, responses, client
+
+
+def server_error(status=502):
+    return status, {"object": "error", "status": status, "code": "internal_server_error", "message": "try again"}
+
+
+def test_queries_retry_server_errors(notion_api):
+    requests, responses, client = notion_api
+    responses.append(server_error())
+
+    client.request("databases/db1/query", "POST", body={})
+
+    assert len(requests) == 2
+
+
+def test_page_create_isnt_retried_after_a_server_error(notion_api):
+    requests, responses, client = notion_api
+    responses.append(server_error())
+
+    with pytest.raises(APIResponseError):
+        client.request("pages", "POST", body={"properties": {}})
+
+    assert len(requests) == 1
+
+
+def test_page_create_isnt_retried_after_a_read_timeout(notion_api):
+    requests, responses, client = notion_api
+    responses.append(httpx.ReadTimeout("timed out"))
+
+    with pytest.raises(RequestTimeoutError):
+        client.request("pages", "POST", body={"properties": {}})
+
+    assert len(requests) == 1
+
+
+@pytest.mark.parametrize("error", [httpx.ConnectTimeout("timed out"), httpx.ConnectError("refused")])
+def test_page_create_is_retried_when_it_never_connected(notion_api, error):
+    requests, responses, client = notion_api
+    responses.append(error)
+
+    assert client.request("pages", "POST", body={"properties": {}})["id"] == "page-1"
+    assert len(requests) == 2
+
+
+def test_page_create_is_retried_when_rate_limited(notion_api):
+    requests, responses, client = notion_api
+    responses.append((429, {"object": "error", "status": 429, "code": "rate_limited", "message": "slow down"}))
+
+    assert client.request("pages", "POST", body={"properties": {}})["id"] == "page-1"
+    assert len(requests) == 2
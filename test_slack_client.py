@@ -0,0 +1,119 @@
+"""
+RateLimitedWebClient against a mocked Slack API: requests go over the shared pool and 429s are retried
+Run: pytest test_slack_client.py
+"""
+import json
+import ssl
+import time
+
+import httpx
+import pytest
+from slack_sdk import WebClient
+from slack_sdk.errors import SlackApiError
+
+
+@pytest.fixture
+def slack_api(monkeypatch):
+    """A client factory whose shared Slack pool is a mock transport answering from a list of (status, headers, body)"""
+    # Imported here: importing config at collection time would pin the environment before test_benchmark.py
+    # points it at the stand-ins
+    import slack_client_wrapper
+    requests, responses = [], []
+
+    def handler(request):
+        requests.append(request)
+        status, headers, body = responses.pop(0) if responses else (200, {}, {"ok": True})
+        return httpx.Response(status, headers=headers, json=body)
+
+    pool = httpx.Client(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(slack_client_wrapper, "http_client", lambda upstream: pool)
+
+    def client(**kwargs):
+        return slack_client_wrapper.RateLimitedWebClient(token="xoxb-test", base_url="https://slack.test/api/", **kwargs)
+    return requests, responses, client
+
+
+def test_429_is_retried_after_retry_after(slack_api):
+    requests, responses, client = slack_api
+    responses.append((429, {"Retry-After": "0.2"}, {"ok": False, "error": "ratelimited"}))
+    responses.append((200, {}, {"ok": True, "channel": "C1", "ts": "1718000000.000100"}))
+
+    started = time.monotonic()
+    response = client().chat_postMessage(channel="C1", text="hello")
+
+    assert response["ts"] == "1718000000.000100"
+    assert response.status_code == 200
+    assert time.monotonic() - started >= 0.2
+    assert len(requests) == 2
+    for request in requests:
+        assert str(request.url) == "https://slack.test/api/chat.postMessage"
+        assert request.headers["Authorization"] == "Bearer xoxb-test"
+        assert json.loads(request.content) == {"channel": "C1", "text": "hello"}
+
+
+def test_form_calls_encode_params_like_the_sdk(slack_api):
+    requests, responses, client = slack_api
+    responses.append((200, {}, {"ok": True, "messages": []}))
+
+    client().conversations_history(channel="C1", inclusive=True, limit=1)
+
+    assert requests[0].method == "POST"
+    assert requests[0].headers["Content-Type"] == "application/x-www-form-urlencoded"
+    assert dict(httpx.QueryParams(requests[0].content.decode())) == {"channel": "C1", "inclusive": "1", "limit": "1"}
+
+
+def test_api_errors_raise_without_retrying(slack_api):
+    requests, responses, client = slack_api
+    responses.append((200, {}, {"ok": False, "error": "channel_not_found"}))
+
+    with pytest.raises(SlackApiError) as error:
+        client().chat_postMessage(channel="C404", text="hello")
+
+    assert error.value.response["error"] == "channel_not_found"
+    assert len(requests) == 1
+
+
+def test_custom_ssl_context_uses_the_sdk_transport(slack_api, monkeypatch):
+    requests, _, client = slack_api
+    sent = []
+    monkeypatch.setattr(WebClient, "_perform_urllib_http_request_internal",
+                        lambda self, url, req: sent.append(url) or {"status": 200, "headers": {}, "body": '{"ok": true}'})
+    client(ssl=ssl.create_default_context()).chat_postMessage(channel="C1", text="hello")
+
+    assert sent == ["https://slack.test/api/chat.postMessage"]
+    assert requests == []
+
+
+def test_posts_arent_retried_after_a_server_error(slack_api):
+    requests, responses, client = slack_api
+    responses.append((503, {}, {"ok": False, "error": "service_unavailable"}))
+
+    with pytest.raises(SlackApiError):
+        client().chat_postMessage(channel="C1", text="hello")
+
+    assert len(requests) == 1
+
+
+def test_reads_retry_server_errors(slack_api, monkeypatch):
+    import rate_limit
+    monkeypatch.setattr(rate_limit.limiters["slack"], "base_delay", 0.01)
+    requests, responses, client = slack_api
+    responses.append((503, {}, {"ok": False, "error": "service_unavailable"}))
+
+    assert client().conversations_history(channel="C1")["ok"]
+    assert len(requests) == 2
+
+
+def test_sdk_retry_handlers_see_pooled_responses(slack_api):
+    from rate_limit import limiters
+    from slack_sdk.http_retry import RateLimitErrorRetryHandler
+    requests, responses, client = slack_api
+    responses.append((429, {"Retry-After": "0"}, {"ok": False, "error": "ratelimited"}))
+    rate_limited = limiters["slack"].rate_limited
+
+    response = client(retry_handlers=[RateLimitErrorRetryHandler(max_retry_count=1)]).conversations_history(channel="C1")
+
+    # The SDK's handler retried inside one api_call, so the rate limiter never saw the 429
+    assert response["ok"]
+    assert len(requests) == 2
+    assert limiters["slack"].rate_limited == rate_limited
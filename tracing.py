@@ -0,0 +1,295 @@
+"""
+Per-event tracing (a trace ID plus timed spans, logged when slow), on-demand cProfile sampling,
+and recording of incoming events for replay.py
+"""
+import contextvars
+import cProfile
+import functools
+import inspect
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from config import TRACE_SLOW_THRESHOLD, EVENT_RECORD_PATH
+
+# The trace of the event being handled; copied into capture-queue jobs and asyncio tasks
+_current = contextvars.ContextVar("trace", default=None)
+_depth = contextvars.ContextVar("trace_depth", default=0)
+
+# Called with every finished trace (e.g. by replay.py to time each event)
+_finish_hooks = []
+
+
+class Trace:
+    """Timeline of one Slack event: spans as (offset, duration, depth, name, upstream, error)"""
+    def __init__(self, name: str, trace_id: str = None, **attrs):
+        self.name = name
+        self.trace_id = trace_id or uuid.uuid4().hex[:12]
+        self.attrs = attrs
+        self.started = time.perf_counter()
+        self.duration = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, end: float, depth: int = 0, upstream: str = None, error: str = None):
+        with self._lock:
+            self.spans.append((start - self.started, end - start, depth, name, upstream, error))
+
+    def upstream_totals(self) -> dict:
+        """Seconds spent waiting on each upstream (Notion, OpenAI, Slack), including rate limiting"""
+        totals = {}
+        for _, duration, _, _, upstream, _ in self.spans:
+            if upstream:
+                totals[upstream] = totals.get(upstream, 0.0) + duration
+        return totals
+
+    def breakdown(self) -> str:
+        elapsed = self.duration if self.duration is not None else time.perf_counter() - self.started
+        attrs = " ".join(f"{k}={v}" for k, v in self.attrs.items() if v is not None)
+        totals = ", ".join(f"{k} {v:.2f}s" for k, v in sorted(self.upstream_totals().items(), key=lambda i: -i[1]))
+        lines = [f"🐢 Slow {self.name} [{self.trace_id}] {elapsed:.2f}s {attrs}".rstrip(),
+                 f"   upstream: {totals or 'none'}"]
+        with self._lock:
+            spans = sorted(self.spans)
+        for offset, duration, depth, name, _, error in spans:
+            lines.append(f"   +{offset:6.3f}s {duration:7.3f}s  {'  ' * depth}{name}{f'  ❌ {error}' if error else ''}")
+        return "\n".join(lines)
+
+
+def current() -> Trace:
+    """The active trace, or None outside a traced event"""
+    return _current.get()
+
+
+@contextmanager
+def trace(name: str, trace_id: str = None, **attrs):
+    """Make a new trace current for the block; jobs queued inside it carry it along until finish()"""
+    new = Trace(name, trace_id, **attrs)
+    token = _current.set(new)
+    try:
+        yield new
+    finally:
+        _current.reset(token)
+
+
+def finish(slow_threshold: float = TRACE_SLOW_THRESHOLD):
+    """End the current trace, logging its breakdown if it took longer than the threshold"""
+    active = _current.get()
+    if active is None or active.duration is not None:
+        return None
+    active.duration = time.perf_counter() - active.started
+    if slow_threshold and active.duration >= slow_threshold:
+        print(active.breakdown())
+    for hook in _finish_hooks:
+        try:
+            hook(active)
+        except Exception as e:
+            print(f"   ⚠️  Trace hook failed: {e}")
+    return active
+
+
+def on_finish(hook):
+    """Call hook(trace) whenever a trace finishes"""
+    _finish_hooks.append(hook)
+
+
+def add_span(name: str, start: float, end: float = None, upstream: str = None, error: str = None):
+    """Record an already-timed span on the current trace"""
+    active = _current.get()
+    if active is not None:
+        active.add(name, start, end if end is not None else time.perf_counter(), _depth.get(), upstream, error)
+
+
+@contextmanager
+def span(name: str, upstream: str = None):
+    """Time the block as a span of the current trace (spans opened inside it nest under it)"""
+    active = _current.get()
+    if active is None:
+        yield
+        return
+    depth = _depth.get()
+    _depth.set(depth + 1)
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        # set() rather than reset(): a span may close in a different context than it opened in
+        _depth.set(depth)
+        active.add(name, start, time.perf_counter(), depth, upstream, error)
+
+
+def _traced_method(fn):
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        if _current.get() is None:
+            return fn(self, *args, **kwargs)
+        name = f"{type(self).__name__}.{fn.__name__}"
+        depth = _depth.get()
+        _depth.set(depth + 1)
+        start = time.perf_counter()
+        try:
+            result = fn(self, *args, **kwargs)
+        except BaseException as e:
+            _depth.set(depth)
+            add_span(name, start, error=type(e).__name__)
+            raise
+        _depth.set(depth)
+        # Coroutines and generators do their work after we return, so time that instead
+        if inspect.isawaitable(result):
+            return _traced_awaitable(name, result)
+        if inspect.isgenerator(result):
+            return _traced_generator(name, result)
+        if inspect.isasyncgen(result):
+            return _traced_async_generator(name, result)
+        add_span(name, start)
+        return result
+    return wrapper
+
+
+async def _traced_awaitable(name: str, awaitable):
+    with span(name):
+        return await awaitable
+
+
+def _traced_generator(name: str, generator):
+    # Doesn't nest: between yields the consumer's own spans would land under this one
+    start = time.perf_counter()
+    try:
+        yield from generator
+    finally:
+        add_span(name, start)
+
+
+async def _traced_async_generator(name: str, generator):
+    start = time.perf_counter()
+    try:
+        async for item in generator:
+            yield item
+    finally:
+        add_span(name, start)
+
+
+def traced(cls):
+    """Class decorator: every public method becomes a span of the current trace (a no-op outside one)"""
+    for name, attr in list(vars(cls).items()):
+        if not name.startswith("_") and inspect.isfunction(attr):
+            setattr(cls, name, _traced_method(attr))
+    return cls
+
+
+class Profiler:
+    """Runs cProfile over the next N jobs and aggregates their stats"""
+    def __init__(self):
+        self.remaining = 0
+        self.profiled = 0
+        self.skipped = 0
+        self._stats = None
+        self._lock = threading.Lock()
+        # cProfile can only run one profile per process at a time (Python 3.12+)
+        self._running = threading.Lock()
+
+    def start(self, events: int):
+        """Profile the next `events` jobs, discarding earlier results"""
+        with self._lock:
+            self.remaining = max(0, events)
+            self.profiled = 0
+            self.skipped = 0
+            self._stats = None
+
+    def stop(self):
+        with self._lock:
+            self.remaining = 0
+
+    def _claim(self) -> bool:
+        if not self.remaining:
+            return False
+        if not self._running.acquire(blocking=False):
+            # Another job is being profiled; this one runs unprofiled
+            self.skipped += 1
+            return False
+        with self._lock:
+            if self.remaining > 0:
+                self.remaining -= 1
+                return True
+        self._running.release()
+        return False
+
+    @contextmanager
+    def sample(self):
+        """Profile the block if sampling is on and no other job is being profiled"""
+        if not self._claim():
+            yield
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            print(f"   ⚠️  Could not start profiler: {e}")
+            self._running.release()
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._running.release()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+                self.profiled += 1
+
+    def status(self) -> dict:
+        return {"profiling": self.remaining > 0, "remaining": self.remaining,
+                "profiled": self.profiled, "skipped": self.skipped}
+
+    def report(self, sort: str = "cumulative", limit: int = 40) -> str:
+        """Aggregated stats of the profiled jobs, as pstats text"""
+        with self._lock:
+            if self._stats is None:
+                return "No jobs profiled yet\n"
+            out = io.StringIO()
+            self._stats.stream = out
+            self._stats.sort_stats(sort).print_stats(limit)
+        return f"{self.profiled} jobs profiled ({self.remaining} remaining)\n{out.getvalue()}"
+
+
+profiler = Profiler()
+
+
+class EventRecorder:
+    """Appends each event envelope the handlers see to a JSONL trace (a no-op when no path is set)"""
+    def __init__(self, path: str = EVENT_RECORD_PATH):
+        self.path = path
+        self.recorded = 0
+        self._file = None
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, body: dict):
+        if not self.path:
+            return
+        try:
+            line = json.dumps({"t": time.time(), "type": kind,
+                               "body": {k: v for k, v in body.items() if k != "token"}})
+            with self._lock:
+                if self._file is None:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                    self._file = open(self.path, "a", encoding="utf-8")
+                self._file.write(line + "\n")
+                self._file.flush()
+                self.recorded += 1
+        except Exception as e:
+            print(f"   ⚠️  Could not record event: {e}")
+
+
+recorder = EventRecorder()
@@ -0,0 +1,269 @@
+"""
+Pooled keep-alive HTTP transport: one connection pool per upstream, shared by every Notion, OpenAI and Slack client
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from config import (
+    NOTION_BASE_URL, OPENAI_BASE_URL, SLACK_API_URL,
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY, HTTP_CONNECT_TIMEOUT, HTTP2_ENABLED,
+    HTTP_WARM_CONNECTIONS, NOTION_TIMEOUT, OPENAI_TIMEOUT, SLACK_TIMEOUT,
+)
+from metrics import register
+
+UPSTREAMS = ("notion", "openai", "slack")
+TIMEOUTS = {"notion": NOTION_TIMEOUT, "openai": OPENAI_TIMEOUT, "slack": SLACK_TIMEOUT}
+# What warm() connects to; any response will do, so no API call (or rate limit token) is spent
+URLS = {"notion": NOTION_BASE_URL, "openai": OPENAI_BASE_URL or "https://api.openai.com/v1", "slack": SLACK_API_URL}
+GAUGES = ("in_flight", "waiting")
+
+
+def _http2() -> bool:
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        print("   ⚠️  HTTP/2 needs the h2 package (pip install h2); using HTTP/1.1")
+        return False
+
+
+HTTP2 = _http2()
+
+
+def timeout(upstream: str) -> httpx.Timeout:
+    return httpx.Timeout(TIMEOUTS[upstream], connect=HTTP_CONNECT_TIMEOUT)
+
+
+class _Counted(httpx.BaseTransport):
+    """Transport wrapper keeping a pool's count of requests in flight (sent, and their response not yet closed)"""
+    def __init__(self, transport: httpx.BaseTransport, pool: "Pool"):
+        self.transport = transport
+        self.pool = pool
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self.pool._started()
+        try:
+            response = self.transport.handle_request(request)
+        except BaseException:
+            self.pool._finished()
+            raise
+        response.stream = _CountedStream(response.stream, self.pool._finished)
+        return response
+
+    def close(self):
+        self.transport.close()
+
+
+class _AsyncCounted(httpx.AsyncBaseTransport):
+    """_Counted for httpx.AsyncClient"""
+    def __init__(self, transport: httpx.AsyncBaseTransport, pool: "Pool"):
+        self.transport = transport
+        self.pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.pool._started()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            self.pool._finished()
+            raise
+        response.stream = _CountedStream(response.stream, self.pool._finished)
+        return response
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class _CountedStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """A response body that calls `done` once when it's closed (which is when httpx releases the connection)"""
+    def __init__(self, stream, done):
+        self.stream = stream
+        self.done = done
+        self.closed = False
+
+    def __iter__(self):
+        yield from self.stream
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            self._done()
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            self._done()
+
+    def _done(self):
+        if not self.closed:
+            self.closed = True
+            self.done()
+
+
+class Pool:
+    """Shared httpx client for one upstream, counting requests, requests in flight and new connections for /metrics"""
+    def __init__(self, upstream: str, asynchronous: bool = False):
+        self.upstream = upstream
+        self.requests = 0
+        self.in_flight = 0
+        self.connections_opened = 0
+        self.tls_handshakes = 0
+        self._lock = threading.Lock()
+        limits = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                              keepalive_expiry=HTTP_KEEPALIVE_EXPIRY)
+        if asynchronous:
+            kind, hook = httpx.AsyncClient, self._on_request_async
+            transport = _AsyncCounted(httpx.AsyncHTTPTransport(http2=HTTP2, limits=limits), self)
+        else:
+            kind, hook = httpx.Client, self._on_request
+            transport = _Counted(httpx.HTTPTransport(http2=HTTP2, limits=limits), self)
+        self.client = kind(transport=transport, timeout=timeout(upstream), event_hooks={"request": [hook]})
+        register("http_pool", self.stats, gauges=GAUGES,
+                 labels={"upstream": upstream, "client": "async" if asynchronous else "sync"})
+
+    def _count(self, event: str):
+        if event == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+        elif event == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def _on_request(self, request: httpx.Request):
+        self.requests += 1
+        request.extensions["trace"] = lambda event, info: self._count(event)
+
+    async def _on_request_async(self, request: httpx.Request):
+        async def trace(event, info):
+            self._count(event)
+        self.requests += 1
+        request.extensions["trace"] = trace
+
+    def _started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def _finished(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        # httpcore doesn't publish pool occupancy; past max_connections, requests queue for a connection
+        return {"requests": self.requests, "connections_opened": self.connections_opened,
+                "tls_handshakes": self.tls_handshakes, "in_flight": self.in_flight,
+                "waiting": max(0, self.in_flight - HTTP_MAX_CONNECTIONS)}
+
+
+class AioHttpPool:
+    """Shared aiohttp session for one upstream (the async Slack SDK client only speaks aiohttp)"""
+    def __init__(self, upstream: str):
+        import aiohttp
+
+        self.upstream = upstream
+        self.requests = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.connections_opened = 0
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_request)
+        trace.on_request_end.append(self._on_response)
+        trace.on_request_exception.append(self._on_response)
+        trace.on_connection_queued_start.append(self._on_queued)
+        trace.on_connection_queued_end.append(self._on_dequeued)
+        trace.on_connection_create_end.append(self._on_connection)
+        self.connector = aiohttp.TCPConnector(limit=HTTP_MAX_CONNECTIONS, keepalive_timeout=HTTP_KEEPALIVE_EXPIRY)
+        self.client = aiohttp.ClientSession(
+            connector=self.connector, trace_configs=[trace],
+            timeout=aiohttp.ClientTimeout(total=TIMEOUTS[upstream], connect=HTTP_CONNECT_TIMEOUT),
+        )
+        register("http_pool", self.stats, gauges=GAUGES, labels={"upstream": upstream, "client": "async"})
+
+    # All on the event loop, so the counts need no lock
+    async def _on_request(self, session, context, params):
+        self.requests += 1
+        self.in_flight += 1
+
+    async def _on_response(self, session, context, params):
+        self.in_flight -= 1
+
+    async def _on_queued(self, session, context, params):
+        self.waiting += 1
+
+    async def _on_dequeued(self, session, context, params):
+        self.waiting -= 1
+
+    async def _on_connection(self, session, context, params):
+        self.connections_opened += 1
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "connections_opened": self.connections_opened,
+                "in_flight": self.in_flight, "waiting": self.waiting}
+
+
+_pools = {}
+_lock = threading.Lock()
+
+
+def _pool(upstream: str, kind: str):
+    with _lock:
+        if (upstream, kind) not in _pools:
+            _pools[(upstream, kind)] = AioHttpPool(upstream) if kind == "aiohttp" else Pool(upstream, kind == "async")
+        return _pools[(upstream, kind)]
+
+
+def http_client(upstream: str) -> httpx.Client:
+    """The process-wide httpx client for "notion", "openai" or "slack" """
+    return _pool(upstream, "sync").client
+
+
+def async_http_client(upstream: str) -> httpx.AsyncClient:
+    """http_client() for asyncio code"""
+    return _pool(upstream, "async").client
+
+
+def aiohttp_session(upstream: str):
+    """The process-wide aiohttp session for an upstream (call from the event loop that will use it)"""
+    return _pool(upstream, "aiohttp").client
+
+
+def warm(upstreams=UPSTREAMS, connections: int = HTTP_WARM_CONNECTIONS) -> int:
+    """Open `connections` keep-alive connections to each upstream (concurrently, so they're distinct ones)"""
+    def touch(upstream):
+        try:
+            http_client(upstream).head(URLS[upstream])
+            return 1
+        except httpx.HTTPError as e:
+            print(f"   ⚠️  Could not pre-connect to {upstream}: {e}")
+            return 0
+
+    jobs = [upstream for upstream in upstreams for _ in range(connections)]
+    if not jobs:
+        return 0
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        return sum(pool.map(touch, jobs))
+
+
+async def warm_async(upstreams=UPSTREAMS, connections: int = HTTP_WARM_CONNECTIONS) -> int:
+    """warm() for the async pools: httpx for Notion and OpenAI, aiohttp for Slack"""
+    async def touch(upstream):
+        try:
+            if upstream == "slack":
+                async with aiohttp_session(upstream).head(URLS[upstream]):
+                    pass
+            else:
+                await async_http_client(upstream).head(URLS[upstream])
+            return 1
+        except Exception as e:
+            print(f"   ⚠️  Could not pre-connect to {upstream}: {e}")
+            return 0
+
+    return sum(await asyncio.gather(*(touch(upstream) for upstream in upstreams for _ in range(connections))))
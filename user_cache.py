@@ -0,0 +1,116 @@
+"""
+TTL cache of Slack user display names so the hot path doesn't call users_info per message
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from config import USER_CACHE_TTL, USER_CACHE_SIZE
+
+
+def user_display_name(user: dict) -> str:
+    """Best available human-readable name for a Slack user object"""
+    profile = user.get("profile", {})
+    return user.get("real_name") or profile.get("real_name") or profile.get("display_name") or user.get("name") or "Unknown"
+
+
+class UserCache:
+    def __init__(self, client, ttl: float = USER_CACHE_TTL, max_size: int = USER_CACHE_SIZE):
+        self.client = client
+        self.ttl = ttl
+        self.max_size = max_size
+        self._names = OrderedDict()  # user_id -> (name, expires_at), least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_name(self, user_id: str) -> str:
+        """Resolve a user ID to a display name, calling users_info only on a cache miss"""
+        if not user_id:
+            return "Unknown"
+        name = self._lookup(user_id)
+        if name is not None:
+            return name
+        try:
+            user_info = self.client.users_info(user=user_id)
+        except Exception as e:
+            print(f"   ⚠️  User lookup failed for {user_id}: {e}")
+            return "Unknown"
+        return self._put(user_id, user_display_name(user_info["user"]))
+
+    async def get_name_async(self, user_id: str) -> str:
+        """get_name() for a cache backed by an AsyncWebClient"""
+        if not user_id:
+            return "Unknown"
+        name = self._lookup(user_id)
+        if name is not None:
+            return name
+        try:
+            user_info = await self.client.users_info(user=user_id)
+        except Exception as e:
+            print(f"   ⚠️  User lookup failed for {user_id}: {e}")
+            return "Unknown"
+        return self._put(user_id, user_display_name(user_info["user"]))
+
+    def warm(self, page_size: int = 200) -> int:
+        """Bulk-load every workspace member via paginated users_list; returns the number cached"""
+        loaded = 0
+        cursor = None
+        while True:
+            response = self.client.users_list(limit=page_size, cursor=cursor)
+            loaded += self._put_members(response)
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                return loaded
+
+    async def warm_async(self, page_size: int = 200) -> int:
+        """warm() for a cache backed by an AsyncWebClient"""
+        loaded = 0
+        cursor = None
+        while True:
+            response = await self.client.users_list(limit=page_size, cursor=cursor)
+            loaded += self._put_members(response)
+            cursor = response.get("response_metadata", {}).get("next_cursor")
+            if not cursor:
+                return loaded
+
+    def _lookup(self, user_id: str):
+        """Cached name for a user, or None on a miss"""
+        with self._lock:
+            entry = self._names.get(user_id)
+            if entry and entry[1] > time.time():
+                self._names.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def _put_members(self, response) -> int:
+        loaded = 0
+        for user in response.get("members", []):
+            if user.get("deleted"):
+                continue
+            self._put(user["id"], user_display_name(user))
+            loaded += 1
+        return loaded
+
+    def _put(self, user_id: str, name: str) -> str:
+        with self._lock:
+            self._names[user_id] = (name, time.time() + self.ttl)
+            self._names.move_to_end(user_id)
+            while len(self._names) > self.max_size:
+                self._names.popitem(last=False)
+        return name
+
+    def stats(self) -> dict:
+        """Hit/miss counters"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._names),
+        }
+
+    def __len__(self):
+        return len(self._names)